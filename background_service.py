@@ -89,11 +89,11 @@ class BackgroundService:
         self.is_running = True
         self.start_time = time.time()
         
+        # خدمة العقدة الموحّدة تحل محل peer_server و rpc_server و main.py
+        # (كانت تتنافس على المنفذ 7520) وتعلن العقدة عبر Zeroconf بنفسها
         services_to_start = [
-            ('peer_server', 'peer_server.py'),
-            ('rpc_server', 'rpc_server.py'),
-            ('load_balancer', 'load_balancer.py'),
-            ('distributed_executor', 'main.py')
+            ('worker_service', 'worker_service.py'),
+            ('load_balancer', 'load_balancer.py')
         ]
         
         for service_name, script_file in services_to_start:
@@ -0,0 +1,188 @@
+# cost_model.py
+"""
+نموذج تكلفة مُتعلَّم لكل دالة بدلاً من سلالم if func.__name__ == ... الثابتة.
+
+كل تنفيذ يُسجَّل كـ (الدالة، خصائص الوسائط، زمن التنفيذ المحلي أو البعيد،
+حجم النقل)، ويُلاءَم لكل دالة انحدار خطي على اللوغاريتمات
+    log(t) = b0 + Σ bi·log(1 + xi)
+(فيلتقط علاقات القوى مثل size³ لضرب المصفوفات) بمعادلات طبيعية تراكمية مع
+نسيان أسّي، فيتكيّف النموذج مع تغيّر الأجهزة. يُحفظ النموذج على القرص
+ويُستعلم منه لتوقّع زمن الإكمال محلياً وبعيداً.
+"""
+
+import os
+import json
+import math
+import time
+import atexit
+import logging
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+MODEL_PATH = os.getenv("DTS_COST_MODEL_PATH",
+                       os.path.join(os.path.expanduser("~"), ".dts", "cost_model.json"))
+MAX_FEATURES = 4        # عدد الخصائص العددية المأخوذة من الوسائط
+MIN_SAMPLES = MAX_FEATURES + 1   # أقل عدد عينات قبل الوثوق بالتوقع (= عدد المعاملات)
+FORGET = 0.98           # معامل النسيان الأسّي لكل عينة جديدة
+RIDGE = 1e-3            # تنظيم لتفادي المصفوفات المفردة
+SAVE_INTERVAL = 30.0    # ثوانٍ بين عمليات الحفظ على القرص
+
+Prediction = namedtuple("Prediction", ["local", "remote", "transfer_bytes", "samples"])
+
+TARGETS = ("local", "remote", "bytes")
+
+
+def extract_features(args, kwargs):
+    """خصائص عددية من الوسائط: الأعداد كما هي، والتسلسلات والمصفوفات بأحجامها"""
+    values = []
+    for value in list(args) + [kwargs[k] for k in sorted(kwargs)]:
+        if isinstance(value, bool):
+            continue
+        if isinstance(value, (int, float)):
+            values.append(abs(float(value)))
+        elif isinstance(value, np.ndarray):
+            values.append(float(value.size))
+        elif hasattr(value, "nbytes"):          # GeneratorSpec وما شابه
+            values.append(float(value.nbytes) / 8)
+        elif isinstance(value, (list, tuple, dict, str, bytes)):
+            values.append(float(len(value)))
+        if len(values) == MAX_FEATURES:
+            break
+    values += [0.0] * (MAX_FEATURES - len(values))
+    return values
+
+
+def _design(features):
+    return np.array([1.0] + [math.log1p(x) for x in features])
+
+
+class _Regression:
+    """انحدار خطي تراكمي مع نسيان أسّي (X'X و X'y فقط)"""
+
+    def __init__(self, xtx=None, xty=None, samples=0):
+        dim = MAX_FEATURES + 1
+        self.xtx = np.array(xtx) if xtx is not None else np.zeros((dim, dim))
+        self.xty = np.array(xty) if xty is not None else np.zeros(dim)
+        self.samples = samples
+        self._coef = None
+
+    def add(self, x, y):
+        self.xtx = FORGET * self.xtx + np.outer(x, x)
+        self.xty = FORGET * self.xty + x * y
+        self.samples += 1
+        self._coef = None
+
+    def predict(self, x):
+        if self.samples < MIN_SAMPLES:
+            return None
+        if self._coef is None:
+            reg = RIDGE * np.eye(len(self.xty))
+            reg[0, 0] = 0.0  # لا تنظيم للثابت
+            self._coef = np.linalg.solve(self.xtx + reg, self.xty)
+        return float(x @ self._coef)
+
+    def to_dict(self):
+        return {"xtx": self.xtx.tolist(), "xty": self.xty.tolist(), "samples": self.samples}
+
+
+class CostModel:
+    """نماذج تكلفة لكل دالة مع حفظ دوري على القرص"""
+
+    def __init__(self, path=MODEL_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._models = {}   # func_name -> {target: _Regression}
+        self._dirty = False
+        self._last_save = time.time()
+        self.load()
+
+    def _regressions(self, func_name):
+        models = self._models.get(func_name)
+        if models is None:
+            models = {t: _Regression() for t in TARGETS}
+            self._models[func_name] = models
+        return models
+
+    def record(self, func_name, args, kwargs, local_runtime=None,
+               remote_runtime=None, transfer_bytes=None):
+        """تسجيل تنفيذ (محلي أو بعيد) وتحديث الانحدار"""
+        x = _design(extract_features(args, kwargs))
+        with self._lock:
+            models = self._regressions(func_name)
+            for target, value in (("local", local_runtime), ("remote", remote_runtime),
+                                  ("bytes", transfer_bytes)):
+                if value is not None and value > 0:
+                    models[target].add(x, math.log(value))
+            self._dirty = True
+            should_save = time.time() - self._last_save > SAVE_INTERVAL
+        if should_save:
+            self.save()
+
+    def predict(self, func_name, args, kwargs):
+        """توقّع (الزمن المحلي، الزمن البعيد، بايتات النقل)؛ None لما لا بيانات له"""
+        x = _design(extract_features(args, kwargs))
+        with self._lock:
+            models = self._models.get(func_name)
+            if models is None:
+                return Prediction(None, None, None, 0)
+            values = [models[t].predict(x) for t in TARGETS]
+            samples = max(m.samples for m in models.values())
+        local, remote, nbytes = (math.exp(v) if v is not None else None for v in values)
+        return Prediction(local, remote, nbytes, samples)
+
+    # ------------------------------------------------------------
+    # الحفظ والتحميل
+    # ------------------------------------------------------------
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {name: {t: r.to_dict() for t, r in models.items()}
+                    for name, models in self._models.items()}
+            self._dirty = False
+            self._last_save = time.time()
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logging.warning(f"⚠️ تعذّر حفظ نموذج التكلفة: {e}")
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            for name, models in data.items():
+                self._models[name] = {t: _Regression(**models[t]) if t in models else _Regression()
+                                      for t in TARGETS}
+
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_cost_model():
+    """نموذج التكلفة المشترك للعملية (يُحمَّل من القرص عند أول استخدام)"""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = CostModel()
+                atexit.register(_model.save)
+    return _model
+
+
+def run_local(func, args, kwargs):
+    """تنفيذ محلي مع تسجيل زمنه في النموذج"""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    get_cost_model().record(func.__name__, args, kwargs,
+                            local_runtime=time.perf_counter() - start)
+    return result
@@ -1,12 +1,29 @@
+from __future__ import annotations
+
+import os
 import threading
 import queue
 import time
 import json
+import heapq
+import itertools
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FutureTimeoutError  # قبل 3.11 ليست TimeoutError المدمجة
 from typing import Callable, Dict, List
 import socket
-from zeroconf import Zeroconf, ServiceBrowser, ServiceInfo
+from zeroconf import Zeroconf, ServiceInfo
 import logging
-import requests  # ✅ تأكد من استيراده
+import requests
+import http_pool
+import wire_format
+from result_store import ResultStore, SPILL_DIR
+from peer_table import PeerRecord, get_peer_table
+from load_advertiser import LoadAdvertiser
+from peer_selection import get_policy
+from peer_stats import get_peer_stats, is_private_ip
+from peer_health import get_peer_health
+from micro_batcher import MicroBatcher, BATCH_WINDOW, BATCH_MAX_SIZE
+from task_registry import get_task_spec, node_properties, peer_fits
 
 logging.basicConfig(level=logging.INFO)
 
@@ -15,6 +32,8 @@ class PeerRegistry:
         self._peers = {}
         self._zeroconf = Zeroconf()
         self.local_node_id = socket.gethostname()
+        self._advertisers = []
+        self.queue_depth = None  # دالة تعيد عمق طابور المهام المحلي (تُعلن في TXT)
 
     def register_service(self, name: str, port: int, load: float = 0.0):
         service_info = ServiceInfo(
@@ -24,42 +43,23 @@ class PeerRegistry:
             port=port,
             properties={
                 b'load': str(load).encode(),   # تأكد من أنها bytes
-                b'node_id': self.local_node_id.encode()
+                b'node_id': self.local_node_id.encode(),
+                **node_properties(),   # cores و caps لمطابقة متطلبات المهام
             },
             server=f"{name}.local."
         )
         self._zeroconf.register_service(service_info)
+        # القيمة load أعلاه أولية فقط؛ المُعلِن يعيد نشر الحمل الحي في TXT
+        self._advertisers.append(
+            LoadAdvertiser(self._zeroconf, service_info, queue_depth=self.queue_depth).start())
         logging.info(f"✅ Service registered: {name} @ {self._get_local_ip()}:{port}")
 
     def discover_peers(self, timeout: int = 3) -> List[Dict]:
-        class Listener:
-            def __init__(self):
-                self.peers = []
-
-            def add_service(self, zc, type_, name):
-                info = zc.get_service_info(type_, name)
-                if info:
-                    ip = socket.inet_ntoa(info.addresses[0])
-                    peer_data = {
-                        'ip': ip,
-                        'port': info.port,
-                        'load': float(info.properties.get(b'load', b'0')),
-                        'node_id': info.properties.get(b'node_id', b'unknown').decode(),
-                        'last_seen': time.time()
-                    }
-                    if peer_data not in self.peers:
-                        self.peers.append(peer_data)
-
-            def update_service(self, zc, type_, name):
-                self.add_service(zc, type_, name)
-
-            def remove_service(self, zc, type_, name):
-                pass  # اختياري
-
-        listener = Listener()
-        ServiceBrowser(self._zeroconf, "_tasknode._tcp.local.", listener)
-        time.sleep(timeout)
-        return sorted(listener.peers, key=lambda x: x['load'])
+        """العقد الحالية من الجدول الحي (لا ينتظر إلا إن كان فارغاً بعد)"""
+        table = get_peer_table()
+        if not len(table):
+            table.wait_ready(timeout)
+        return sorted((r.as_dict() for r in table.peers()), key=lambda x: x['load'])
 
     def _get_local_ip(self) -> str:
         s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -72,72 +72,285 @@ class PeerRegistry:
             s.close()
         return ip
 
+_NO_RESULT = object()
+
+
+def _resolve(future: Future, result=None, error: BaseException | None = None):
+    """إنهاء Future ما لم ينتهِ بعد (قد تكون مهلته انقضت أثناء التنفيذ)"""
+    try:
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+    except InvalidStateError:
+        pass
+
+
 class DistributedExecutor:
-    def __init__(self, shared_secret: str):
+    def __init__(self, shared_secret: str, dispatchers: int = 64, local_workers: int | None = None,
+                 batch_window: float = BATCH_WINDOW, batch_size: int = BATCH_MAX_SIZE,
+                 name: str = "default", result_dir: str | None = None):
         self.peer_registry = PeerRegistry()
+        self.peer_table = get_peer_table()
         self.shared_secret = shared_secret
         self.task_queue = queue.PriorityQueue()
-        self.result_cache = {}
-        self.available_peers = []
-        self._init_peer_discovery()
+        self.peer_registry.queue_depth = self.task_queue.qsize
+        # مجلد نتائج لكل منفِّذ (name) فلا يطرد منفِّذ ملفات غيره في المجلد نفسه
+        self.result_cache = ResultStore(
+            spill_dir=result_dir or os.path.join(SPILL_DIR, f"executor-{name}"))
+        self._pending = {}   # task_id -> Future للمهام التي لم تكتمل بعد
+        self._pending_lock = threading.Lock()
+        self._seq = itertools.count()
+        self._local_pool = ThreadPoolExecutor(max_workers=local_workers or os.cpu_count() or 1,
+                                              thread_name_prefix="local-task")
+        self._shutdown = threading.Event()
+        self._deadlines = []   # كومة (deadline_at, seq, future) تراقبها _deadline_loop
+        self._deadline_cond = threading.Condition()
+        self._deadline_thread = None
+        # المهام الصغيرة لنفس الجهاز تُجمَّع في /run_batch (batch_window=0 يعطّل التجميع)
+        self.batcher = MicroBatcher(window=batch_window, max_size=batch_size) if batch_window > 0 else None
+        self._init_dispatchers(dispatchers)
+
+    @property
+    def available_peers(self) -> List[PeerRecord]:
+        """العقد المعروفة الآن (يحدّثها جدول العقد عند كل إعلان أو مغادرة)"""
+        return self.peer_table.peers()
 
-    def _init_peer_discovery(self):
-        def discovery_loop():
-            while True:
-                self.available_peers = self.peer_registry.discover_peers()
-                logging.info(f"✅ Discovered peers: {self.available_peers}")
-                time.sleep(10)
+    def _init_dispatchers(self, count: int):
+        for i in range(count):
+            threading.Thread(target=self._dispatch_loop, daemon=True,
+                             name=f"dispatcher-{i}").start()
 
-        threading.Thread(target=discovery_loop, daemon=True).start()
+    # ------------------------------------------------------------
+    # واجهة الجدولة
+    # ------------------------------------------------------------
+    def submit(self, task_func: Callable, *args, priority: int = 0,
+               deadline: float | None = None, task_id: str | None = None, **kwargs) -> Future:
+        """إدراج مهمة في طابور الأولوية وإرجاع Future لنتيجتها
 
-    def submit(self, task_func: Callable, *args, **kwargs):
-        """إرسال مهمة جديدة للنظام"""
-        task_id = f"{task_func.__name__}_{time.time()}"
+        priority: الأصغر يُنفَّذ أولاً. deadline: مهلة بالثواني من لحظة الإرسال؛
+        المهمة التي لم تكتمل قبلها ينتهي Future الخاص بها بـ TimeoutError، سواء
+        كانت في الطابور أو قيد التنفيذ محلياً أو على جهاز آخر (التنفيذ الجاري
+        لا يُقاطَع لكن نتيجته تُهمل).
+        task_id: معرّف ثابت يحدده العميل؛ إن كانت نتيجته في result_cache (ولو من
+        تشغيل سابق) أو كانت المهمة قيد التنفيذ، يُعاد ذلك بدلاً من إعادة تنفيذها.
+        نتائج هذه المعرّفات وحدها تُكتب على القرص مهما صغرت (durable)؛ المعرّفات
+        المولَّدة تلقائياً لا يعيد أحد إرسالها فتبقى في الذاكرة.
+        """
+        seq = next(self._seq)
+        durable = task_id is not None
+        if task_id is None:
+            task_id = f"{task_func.__name__}_{time.time()}_{seq}"
+        else:
+            existing = self._existing_future(task_id)
+            if existing is not None:
+                return existing
 
         task = {
             'task_id': task_id,
+            'func': task_func.__name__,
             'function': task_func.__name__,
             'args': args,
             'kwargs': kwargs,
             'sender_id': self.peer_registry.local_node_id
         }
 
-        if self.available_peers:
-            # ترتيب الأجهزة: LAN أولاً ثم WAN
-            lan_peers = [p for p in self.available_peers if self._is_local_ip(p['ip'])]
-            wan_peers = [p for p in self.available_peers if not self._is_local_ip(p['ip'])]
-            
-            # اختيار من LAN أولاً
-            if lan_peers:
-                peer = min(lan_peers, key=lambda x: x['load'])
-                logging.info(f"✅ Sending task {task_id} to LAN peer {peer['node_id']}")
-            else:
-                # إذا لم تتوفر أجهزة محلية، استخدم WAN
-                peer = min(wan_peers, key=lambda x: x['load'])
-                logging.info(f"✅ Sending task {task_id} to WAN peer {peer['node_id']}")
-            
-            self._send_to_peer(peer, task)
+        future = Future()
+        future.task_id = task_id
+        future.durable = durable
+        with self._pending_lock:
+            self._pending[task_id] = future
+        future.add_done_callback(self._store_result)
+        deadline_at = time.time() + deadline if deadline is not None else None
+        if deadline_at is not None:
+            self._watch_deadline(deadline_at, seq, future)
+        self.task_queue.put((priority, seq, task, task_func, deadline_at, future))
+        return future
+
+    def _watch_deadline(self, deadline_at: float, seq: int, future: Future):
+        with self._deadline_cond:
+            heapq.heappush(self._deadlines, (deadline_at, seq, future))
+            if self._deadline_thread is None:
+                self._deadline_thread = threading.Thread(target=self._deadline_loop, daemon=True,
+                                                         name="task-deadlines")
+                self._deadline_thread.start()
+            self._deadline_cond.notify()
+
+    def _deadline_loop(self):
+        """إنهاء Future كل مهمة لم تكتمل عند انقضاء مهلتها"""
+        with self._deadline_cond:
+            while not self._shutdown.is_set():
+                now = time.time()
+                while self._deadlines and self._deadlines[0][0] <= now:
+                    _, _, future = heapq.heappop(self._deadlines)
+                    if not future.done():
+                        _resolve(future, error=TimeoutError(
+                            f"انتهت مهلة المهمة {future.task_id} قبل اكتمالها"))
+                wait = self._deadlines[0][0] - now if self._deadlines else 1.0
+                self._deadline_cond.wait(min(wait, 1.0))
+
+    def _existing_future(self, task_id: str) -> Future | None:
+        with self._pending_lock:
+            future = self._pending.get(task_id)
+        if future is not None:
+            return future
+        result = self.result_cache.get(task_id, default=_NO_RESULT)
+        if result is _NO_RESULT:
+            return None
+        future = Future()
+        future.task_id = task_id
+        future.set_result(result)
+        return future
+
+    def _store_result(self, future: Future):
+        with self._pending_lock:
+            self._pending.pop(future.task_id, None)
+        if not future.cancelled() and future.exception() is None:
+            self.result_cache.put(future.task_id, future.result(), durable=future.durable)
+
+    def get_result(self, task_id: str, timeout: float | None = None, default=None):
+        """نتيجة مهمة بمعرّفها (تنتظر حتى timeout إن لم تكتمل بعد)"""
+        return self.result_cache.wait(task_id, timeout=timeout, default=default)
+
+    def map(self, task_func: Callable, *iterables, priority: int = 0,
+            deadline: float | None = None):
+        """مثل Executor.map: إرسال كل الاستدعاءات ثم إرجاع النتائج بالترتيب"""
+        futures = [self.submit(task_func, *args, priority=priority, deadline=deadline)
+                   for args in zip(*iterables)]
+
+        def results():
+            for future in futures:
+                yield future.result()
+        return results()
+
+    @staticmethod
+    def as_completed(futures, timeout: float | None = None):
+        """النتائج حسب ترتيب اكتمالها"""
+        return as_completed(futures, timeout=timeout)
+
+    def shutdown(self):
+        self._shutdown.set()
+        self._local_pool.shutdown(wait=False)
+
+    # ------------------------------------------------------------
+    # التوزيع
+    # ------------------------------------------------------------
+    def _dispatch_loop(self):
+        while not self._shutdown.is_set():
+            try:
+                _, _, task, task_func, deadline_at, future = self.task_queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            try:
+                self._dispatch(task, task_func, deadline_at, future)
+            except Exception as e:
+                _resolve(future, error=e)
+            finally:
+                self.task_queue.task_done()
+
+    def _dispatch(self, task: Dict, task_func: Callable, deadline_at: float | None, future: Future):
+        if future.done() or not future.set_running_or_notify_cancel():
+            return
+        remaining = deadline_at - time.time() if deadline_at is not None else None
+        if remaining is not None and remaining <= 0:
+            future.set_exception(TimeoutError(f"انتهت مهلة المهمة {task['task_id']} قبل إرسالها"))
+            return
+
+        spec = get_task_spec(task_func)
+        peer = self._choose_peer(spec, task)
+        if peer is not None:
+            logging.info(f"✅ Sending task {task['task_id']} to peer {peer.node_id}")
+            timeout = get_peer_health().timeout_for(peer, task['func'], default=10,
+                                                    nbytes=wire_format.estimated_size(task))
+            try:
+                reply = self._send_to_peer(peer, task, timeout=min(remaining or timeout, timeout),
+                                           batch=spec is None or spec.batchable)
+            except (TimeoutError, FutureTimeoutError) as e:
+                # ربما نُفِّذت على الجهاز: لا تُعاد محلياً إلا إن كانت بلا أثر جانبي
+                if spec is None or not spec.idempotent:
+                    _resolve(future, error=e)
+                    return
+                reply = None
+            if reply is not None:
+                _resolve(future, reply.get("result", reply) if isinstance(reply, dict) else reply)
+                return
+            if future.done():
+                return
+            logging.warning(f"⚠️ فشل الإرسال - تنفيذ {task['task_id']} محلياً")
         else:
-            logging.warning("⚠️ لا توجد أجهزة متاحة - سيتم تنفيذ المهمة محلياً")
+            logging.debug(f"⚙️ لا توجد أجهزة متاحة - تنفيذ {task['task_id']} محلياً")
+        self._run_locally(task, task_func, deadline_at, future)
+
+    def _run_locally(self, task: Dict, task_func: Callable, deadline_at: float | None, future: Future):
+        def run():
+            if future.done() or (deadline_at is not None and time.time() > deadline_at):
+                raise TimeoutError(f"انتهت مهلة المهمة {task['task_id']} قبل تنفيذها")
+            return task_func(*task['args'], **task['kwargs'])
+
+        def relay(local: Future):
+            if local.exception() is not None:
+                _resolve(future, error=local.exception())
+            else:
+                _resolve(future, local.result())
+
+        self._local_pool.submit(run).add_done_callback(relay)
+
+    def _choose_peer(self, spec=None, task: Dict | None = None) -> PeerRecord | None:
+        """أقرب فئة شبكية مقاسة أولاً، وداخلها حسب سياسة الاختيار
+
+        spec: خصائص المهمة (task_registry)؛ تُستبعد الأجهزة التي أعلنت أنوية أو
+        ذاكرة أو قدرات لا تكفيها.
+        """
+        args, kwargs = (task['args'], task['kwargs']) if task else ((), {})
+        peers = [p for p in self.available_peers if p.node_id != self.peer_registry.local_node_id
+                 and peer_fits(spec, p, args, kwargs)]
+        peers = get_peer_health().healthy(peers)
+        if not peers:
+            return None
+        nearest = get_peer_stats().group_by_tier(peers)[0]
+        return get_policy().choose(nearest, load_of=lambda p: p.load)
 
     def _is_local_ip(self, ip: str) -> bool:
         """فحص إذا كان IP في الشبكة المحلية"""
-        return (
-            ip.startswith('192.168.') or 
-            ip.startswith('10.') or 
-            ip.startswith('172.') or
-            ip == '127.0.0.1'
-        )
+        return is_private_ip(ip)
+
+    def _send_to_peer(self, peer: PeerRecord, task: Dict, timeout: float = 10, batch: bool = True):
+        """رد الجهاز، أو None إن لم تصله المهمة أو فشلت عليه
 
-    def _send_to_peer(self, peer: Dict, task: Dict):
+        يرفع TimeoutError إن انقضت المهلة بعد الإرسال (قد تكون نُفِّذت هناك).
+        """
+        if self.batcher is not None and batch:
+            try:
+                result = self.batcher.call(peer, task, timeout=timeout)
+            except (TimeoutError, FutureTimeoutError):
+                logging.error(f"❌ انتهت مهلة رد {peer.node_id} على {task['task_id']}")
+                raise
+            except Exception as e:
+                logging.error(f"❌ فشل إرسال المهمة لـ {peer.node_id}: {e}")
+                return None
+            logging.info(f"✅ Response from peer {peer.node_id} for {task['task_id']}")
+            return result
+        health = get_peer_health()
+        if not health.allow(peer):
+            return None
         try:
-            url = f"http://{peer['ip']}:{peer['port']}/run"
-            response = requests.post(url, json=task, timeout=10)
-            response.raise_for_status()
-            logging.info(f"✅ Response from peer: {response.text}")
-            return response.json()
+            url = f"http://{peer.address}/run"
+            start = time.perf_counter()
+            with get_peer_stats().track(peer):
+                result = wire_format.post_task(url, task, timeout=timeout)
+            get_peer_stats().observe_latency(peer, time.perf_counter() - start, func=task['func'])
+            health.record_success(peer)
+            logging.info(f"✅ Response from peer {peer.node_id} for {task['task_id']}")
+            return result
+        except (requests.ConnectionError, requests.Timeout) as e:
+            health.record_error(peer, e, task['func'])
+            logging.error(f"❌ فشل إرسال المهمة لـ {peer.node_id}: {e}")
+            if isinstance(e, requests.Timeout) and not isinstance(e, requests.ConnectionError):
+                raise TimeoutError(f"لم يرد {peer.node_id} خلال {timeout:.1f}s") from e
+            return None
         except Exception as e:
-            logging.error(f"❌ فشل إرسال المهمة لـ {peer['node_id']}: {e}")
+            health.record_success(peer)
+            logging.error(f"❌ فشل إرسال المهمة لـ {peer.node_id}: {e}")
             return None
 
 if __name__ == "__main__":
@@ -149,5 +362,6 @@ if __name__ == "__main__":
     def example_task(x):
         return x * x
 
-    executor.submit(example_task, 5)
+    future = executor.submit(example_task, 5)
+    print("✅ النتيجة:", future.result())
 
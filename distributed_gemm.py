@@ -0,0 +1,190 @@
+# distributed_gemm.py
+"""
+ضرب مصفوفات موزّع بتقسيم C إلى كتل (block-decomposed GEMM).
+
+تُقسَّم أعمدة C إلى شرائح ثابتة العرض، ويسحب كل جهاز (قرين أو المعالج
+المحلي) الكتلة التالية من الصفوف بارتفاع يتناسب مع إنتاجيته المقاسة، بحيث
+تستغرق كل كتلة قرابة TARGET_SECONDS. يُرسَل للجهاز A[r0:r1, :] و B[:, c0:c1]
+(المهمة matmul_block عبر wire_format الثنائي) وتُكتب الكتلة العائدة فوراً
+في مصفوفة الخرج.
+
+ذاكرة العميل: إن كانت A و B أوصاف GeneratorSpec ببلاطات (block) فلا تُولَّدان
+عند العميل؛ يُرسل لكل جهاز وصف شريحتيه فقط (بضع بايتات) ويولّدهما بنفسه.
+والخرج إما مصفوفة محجوزة (أو out، مثل np.memmap على القرص) أو يُسلَّم كتلةً
+كتلة إلى on_block دون تجميعه، فلا يقيّد الحجمَ ذاكرةُ جهاز واحد.
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+
+import numpy as np
+
+from generator_spec import GeneratorSpec, materialize
+
+COL_BLOCK = 1024          # عرض شريحة الأعمدة
+SPEC_BLOCK = 256          # حجم بلاطة GeneratorSpec للمدخلات الموصوفة
+MIN_ROWS = 64             # أقل ارتفاع لكتلة الصفوف
+TARGET_SECONDS = 1.0      # الزمن المستهدف لكل كتلة
+DEFAULT_RATE = 2e9        # تقدير أولي للإنتاجية (FLOP/s) لجهاز غير مقاس
+RATE_ALPHA = 0.5          # وزن القياس الجديد في المتوسط الأسّي
+LOCAL = "local"
+
+# جهاز -> إنتاجية مقاسة (FLOP/s) شاملة النقل، تُحفظ بين الاستدعاءات
+_throughput = {}
+_throughput_lock = threading.Lock()
+
+
+def peer_throughput(peer):
+    return _throughput.get(peer, DEFAULT_RATE)
+
+
+def _record_throughput(peer, flops, seconds):
+    rate = flops / max(seconds, 1e-6)
+    with _throughput_lock:
+        old = _throughput.get(peer)
+        _throughput[peer] = rate if old is None else RATE_ALPHA * rate + (1 - RATE_ALPHA) * old
+
+
+class _TileScheduler:
+    """يوزّع كتل C بارتفاع متكيّف مع إنتاجية كل جهاز"""
+
+    def __init__(self, m, n, k, col_block):
+        self.m, self.n, self.k = m, n, k
+        self.col_starts = list(range(0, n, col_block))
+        self.col_block = col_block
+        self.col_index = 0
+        self.row_cursor = 0
+        self.retry = deque()
+        self.total_cells = m * n
+        self.done_cells = 0
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+
+    def next_tile(self, rate):
+        with self.lock:
+            if self.retry:
+                return self.retry.popleft()
+            if self.col_index >= len(self.col_starts):
+                return None
+            c0 = self.col_starts[self.col_index]
+            c1 = min(c0 + self.col_block, self.n)
+            rows = int(TARGET_SECONDS * rate / (2.0 * self.k * (c1 - c0)))
+            rows = max(MIN_ROWS, rows)
+            r0 = self.row_cursor
+            r1 = min(r0 + rows, self.m)
+            self.row_cursor = r1
+            if r1 >= self.m:
+                self.col_index += 1
+                self.row_cursor = 0
+            return (r0, r1, c0, c1)
+
+    def complete(self, tile):
+        r0, r1, c0, c1 = tile
+        with self.lock:
+            self.done_cells += (r1 - r0) * (c1 - c0)
+            if self.done_cells >= self.total_cells:
+                self.finished.set()
+
+    def give_back(self, tile):
+        with self.lock:
+            self.retry.append(tile)
+
+
+def _operand(x):
+    """المصفوفة كما هي، أو وصفها إن أمكن توليد شرائحه منفردة (block)"""
+    if isinstance(x, GeneratorSpec):
+        return x if x.block is not None else x.materialize()
+    return np.asarray(x)
+
+
+def _panel(x, r0, r1, c0, c1):
+    return x.panel(r0, r1, c0, c1) if isinstance(x, GeneratorSpec) else x[r0:r1, c0:c1]
+
+
+def _shape(x):
+    return x.view_shape if isinstance(x, GeneratorSpec) else x.shape
+
+
+def distributed_matmul(A, B, peers=None, send=None, col_block=COL_BLOCK, out=None, on_block=None):
+    """C = A @ B موزّعاً على الأقران والمعالج المحلي
+
+    A و B: مصفوفات أو GeneratorSpec (بـ block تُرسل شرائحها أوصافاً).
+    peers: عناوين 'ip:port'، وsend(peer, payload) دالة الإرسال (افتراضياً
+    offload_lib.try_offload). الكتلة التي تفشل على قرين تعود للطابور ويتوقف
+    ذلك القرين؛ المعالج المحلي يبقى دائماً ضمن العاملين.
+    out: مصفوفة الخرج (مثل np.memmap) بدلاً من حجز C في الذاكرة.
+    on_block(r0, r1, c0, c1, block): تُسلَّم إليه كل كتلة عند وصولها (من خيوط
+    العاملين) ولا تُجمع C؛ تعيد الدالة حينها None.
+    """
+    A = _operand(A)
+    B = _operand(B)
+    m, k = _shape(A)
+    k2, n = _shape(B)
+    if k != k2:
+        raise ValueError(f"أبعاد غير متوافقة: {_shape(A)} × {_shape(B)}")
+
+    dtype = np.result_type(np.dtype(A.dtype), np.dtype(B.dtype))
+    if on_block is not None:
+        C = None
+    elif out is not None:
+        if out.shape != (m, n):
+            raise ValueError(f"out بشكل {out.shape} بدلاً من {(m, n)}")
+        C = out
+    else:
+        C = np.empty((m, n), dtype=dtype)
+    if m == 0 or n == 0:
+        return C
+
+    peers = list(peers or [])
+    if send is None and peers:
+        from offload_lib import try_offload
+        send = try_offload
+
+    scheduler = _TileScheduler(m, n, k, col_block)
+    errors = []
+
+    def run(worker):
+        while not scheduler.finished.is_set():
+            tile = scheduler.next_tile(peer_throughput(worker))
+            if tile is None:
+                # لا جديد؛ ننتظر احتمال عودة كتلة فاشلة من قرين آخر
+                if scheduler.finished.wait(0.05):
+                    return
+                continue
+            r0, r1, c0, c1 = tile
+            start = time.perf_counter()
+            try:
+                a_panel, b_panel = _panel(A, r0, r1, 0, k), _panel(B, 0, k, c0, c1)
+                if worker == LOCAL:
+                    block = materialize(a_panel) @ materialize(b_panel)
+                else:
+                    reply = send(worker, {"func": "matmul_block",
+                                          "args": [a_panel, b_panel], "kwargs": {}})
+                    block = reply.get("result", reply) if isinstance(reply, dict) else reply
+                if C is None:
+                    on_block(r0, r1, c0, c1, np.asarray(block))
+                else:
+                    C[r0:r1, c0:c1] = block
+            except Exception as e:
+                scheduler.give_back(tile)
+                if worker == LOCAL:
+                    errors.append(e)
+                    scheduler.finished.set()
+                else:
+                    logging.warning(f"⚠️ فشلت الكتلة {tile} على {worker}: {e} - إعادتها للطابور")
+                return
+            _record_throughput(worker, 2.0 * (r1 - r0) * k * (c1 - c0), time.perf_counter() - start)
+            scheduler.complete(tile)
+
+    threads = [threading.Thread(target=run, args=(w,), daemon=True) for w in peers + [LOCAL]]
+    for t in threads:
+        t.start()
+    scheduler.finished.wait()
+    if errors:
+        raise errors[0]
+
+    logging.info(f"🧮 ضرب موزّع {m}×{k}·{k}×{n} على {len(peers)} جهاز + المعالج المحلي")
+    return C
+
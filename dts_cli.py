@@ -1,7 +1,7 @@
 # dts_cli.py
 import click
 from dashboard import app
-from rpc_server import app as rpc_app
+from worker_service import serve
 import threading
 
 @click.group()
@@ -20,8 +20,8 @@ def start():
     dashboard_thread.daemon = True
     dashboard_thread.start()
     
-    # تشغيل خادم RPC
-    rpc_app.run(host="0.0.0.0", port=7520)
+    # تشغيل خدمة العقدة (/run و /cpu و ...)
+    serve()
 
 @cli.command()
 def discover():
@@ -0,0 +1,132 @@
+# generator_spec.py
+"""
+وصف مُولِّد للمدخلات العشوائية (بذرة + توزيع + شكل) بدلاً من شحن المصفوفة.
+
+مهام القياس تولّد مدخلاتها عشوائياً؛ عند إرسال GeneratorSpec بدلاً من
+المصفوفة نفسها تعبر الشبكة بضع بايتات، ويولّد الجهاز المنفِّذ المصفوفة
+محلياً وبشكل قابل لإعادة الإنتاج (np.random.default_rng(seed)).
+
+مع block (مصفوفة ثنائية الأبعاد) تُولَّد المصفوفة بلاطاتٍ block × block لكل
+منها بذرتها (seed, i, j)، فيمكن توليد أي نافذة منها (panel) دون توليد الباقي:
+هكذا يرسل الضرب الموزّع (distributed_gemm) لكل جهاز وصف شريحته فقط، ولا
+يحتاج العميل ولا الجهاز ذاكرة المصفوفة كاملة.
+"""
+
+import numpy as np
+
+DISTRIBUTIONS = ("uniform", "normal", "standard_normal", "integers")
+
+
+class GeneratorSpec:
+    """وصف مصفوفة عشوائية قابلة لإعادة التوليد"""
+
+    __slots__ = ("seed", "distribution", "shape", "dtype", "params", "block", "window")
+
+    def __init__(self, seed, shape, distribution="uniform", dtype="float64",
+                 block=None, window=None, **params):
+        if distribution not in DISTRIBUTIONS:
+            raise ValueError(f"توزيع غير مدعوم: {distribution}")
+        self.seed = int(seed)
+        self.shape = tuple(int(d) for d in (shape if isinstance(shape, (list, tuple)) else (shape,)))
+        self.distribution = distribution
+        self.dtype = np.dtype(dtype).str
+        self.params = params
+        if block is not None and len(self.shape) != 2:
+            raise ValueError("block للمصفوفات ثنائية الأبعاد فقط")
+        if window is not None and block is None:
+            raise ValueError("window تتطلب block")
+        self.block = int(block) if block is not None else None
+        self.window = tuple(int(v) for v in window) if window is not None else None
+
+    def _draw(self, rng, shape):
+        p = self.params
+        if self.distribution == "uniform":
+            return rng.uniform(p.get("low", 0.0), p.get("high", 1.0), shape)
+        if self.distribution == "normal":
+            return rng.normal(p.get("loc", 0.0), p.get("scale", 1.0), shape)
+        if self.distribution == "standard_normal":
+            return rng.standard_normal(shape)
+        return rng.integers(p.get("low", 0), p.get("high", 100), shape)
+
+    def materialize(self):
+        """توليد المصفوفة (أو نافذتها) محلياً على الجهاز المنفِّذ"""
+        dtype = np.dtype(self.dtype)
+        if self.block is None:
+            return self._draw(np.random.default_rng(self.seed), self.shape).astype(dtype, copy=False)
+        rows, cols = self.shape
+        r0, r1, c0, c1 = self.window or (0, rows, 0, cols)
+        out = np.empty((r1 - r0, c1 - c0), dtype=dtype)
+        b = self.block
+        for ti in range(r0 // b, (r1 + b - 1) // b):
+            for tj in range(c0 // b, (c1 + b - 1) // b):
+                tr0, tc0 = ti * b, tj * b
+                tile = self._draw(np.random.default_rng([self.seed, ti, tj]),
+                                  (min(b, rows - tr0), min(b, cols - tc0)))
+                ar0, ar1 = max(r0, tr0), min(r1, tr0 + b)
+                ac0, ac1 = max(c0, tc0), min(c1, tc0 + b)
+                out[ar0 - r0:ar1 - r0, ac0 - c0:ac1 - c0] = tile[ar0 - tr0:ar1 - tr0,
+                                                                 ac0 - tc0:ac1 - tc0]
+        return out
+
+    def panel(self, r0, r1, c0, c1):
+        """وصف النافذة [r0:r1, c0:c1] من المصفوفة (يتطلب block)"""
+        if self.block is None:
+            raise ValueError("panel تتطلب GeneratorSpec بـ block")
+        wr0, _, wc0, _ = self.window or (0, 0, 0, 0)
+        return GeneratorSpec(self.seed, self.shape, self.distribution, self.dtype,
+                             block=self.block, window=(wr0 + r0, wr0 + r1, wc0 + c0, wc0 + c1),
+                             **self.params)
+
+    @property
+    def view_shape(self):
+        """شكل ما يولّده materialize (النافذة إن وُجدت)"""
+        if self.window is None:
+            return self.shape
+        r0, r1, c0, c1 = self.window
+        return (r1 - r0, c1 - c0)
+
+    @property
+    def nbytes(self):
+        """حجم المصفوفة بعد التوليد (ما كان سيُشحن لولا الوصف)"""
+        return int(np.prod(self.view_shape)) * np.dtype(self.dtype).itemsize
+
+    def to_dict(self):
+        data = {"seed": self.seed, "distribution": self.distribution,
+                "shape": list(self.shape), "dtype": self.dtype, "params": self.params}
+        if self.block is not None:
+            data["block"] = self.block
+        if self.window is not None:
+            data["window"] = list(self.window)
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["seed"], data["shape"], data.get("distribution", "uniform"),
+                   data.get("dtype", "float64"), block=data.get("block"),
+                   window=data.get("window"), **data.get("params", {}))
+
+    def __eq__(self, other):
+        return isinstance(other, GeneratorSpec) and self.to_dict() == other.to_dict()
+
+    def __hash__(self):
+        return hash((self.seed, self.distribution, self.shape, self.dtype, self.window))
+
+    def __repr__(self):
+        return f"GeneratorSpec(seed={self.seed}, shape={self.shape}, distribution={self.distribution!r})"
+
+
+def seeded_inputs(size, A=None, B=None):
+    """ضرب المصفوفات حتمي فقط إن كانت مدخلاته أوصاف مولِّدات ببذور
+
+    شرط cacheable/cache لمهام matrix_multiply (memo_cache و single_flight).
+    """
+    return isinstance(A, GeneratorSpec) and isinstance(B, GeneratorSpec)
+
+
+def materialize(value):
+    """إرجاع مصفوفة سواء كانت القيمة وصفاً أو مصفوفة/قائمة"""
+    if isinstance(value, GeneratorSpec):
+        return value.materialize()
+    if isinstance(value, dict) and "__genspec__" in value:
+        return GeneratorSpec.from_dict(value["__genspec__"]).materialize()
+    return np.asarray(value)
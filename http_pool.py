@@ -0,0 +1,96 @@
+# http_pool.py
+"""
+مدير اتصالات HTTP مشترك لكل جهاز (keep-alive).
+
+كل مسار صادر (try_offload و _send_to_peer و load_balancer.send و
+execute_remotely) يستخدم requests.Session خاصة بعنوان الجهاز بدلاً من
+requests.post على مستوى الوحدة، فيُعاد استخدام اتصال TCP (ومصافحة TLS لاحقاً)
+بين المهام. الجلسات الخاملة تُغلق تلقائياً بعد IDLE_TIMEOUT.
+"""
+
+import os
+import time
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+POOL_SIZE = int(os.getenv("DTS_HTTP_POOL_SIZE", "8"))            # اتصالات لكل جهاز
+IDLE_TIMEOUT = float(os.getenv("DTS_HTTP_IDLE_TIMEOUT", "120"))  # ثانية قبل الإغلاق
+
+
+class PeerSessionPool:
+    """جلسة requests واحدة لكل (scheme, host, port) مع إخلاء الخاملة"""
+
+    def __init__(self, pool_size=POOL_SIZE, idle_timeout=IDLE_TIMEOUT):
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._sessions = {}   # origin -> [session, last_used]
+        self._last_sweep = time.monotonic()
+
+    @staticmethod
+    def _origin(url):
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def _new_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def session_for(self, url):
+        """الجلسة الخاصة بعنوان الجهاز (تُنشأ عند أول طلب)"""
+        origin = self._origin(url)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._sessions.get(origin)
+            if entry is None:
+                entry = [self._new_session(), now]
+                self._sessions[origin] = entry
+            entry[1] = now
+            if now - self._last_sweep > self.idle_timeout / 2:
+                self._evict_idle(now)
+            return entry[0]
+
+    def _evict_idle(self, now):
+        """يُستدعى والقفل مأخوذ"""
+        self._last_sweep = now
+        for origin in [o for o, (_, used) in self._sessions.items()
+                       if now - used > self.idle_timeout]:
+            session, _ = self._sessions.pop(origin)
+            session.close()
+
+    def request(self, method, url, **kwargs):
+        return self.session_for(url).request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        with self._lock:
+            for session, _ in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+_pool = PeerSessionPool()
+
+
+def get_pool():
+    """مدير الجلسات المشترك للعملية"""
+    return _pool
+
+
+def get(url, **kwargs):
+    return _pool.get(url, **kwargs)
+
+
+def post(url, **kwargs):
+    return _pool.post(url, **kwargs)
@@ -0,0 +1,141 @@
+# job_client.py
+"""
+عميل واجهة المهام غير المتزامنة (انظر job_manager).
+
+المهام التي يتوقع نموذج التكلفة أن تتجاوز JOB_THRESHOLD ثانية على الجهاز
+البعيد لا تُرسل إلى /run: تُرسل إلى POST /jobs (يعود فوراً)، ثم يُتابع العميل
+بث /jobs/<id>/events حتى حدث done ويجلب النتيجة بـ GET /jobs/<id> بالصيغة
+الثنائية. انقطاع البث لا يُفشل المهمة: يعاد الاتصال حتى المهلة الكلية، ومعرّف
+المهمة يولّده العميل فيبقى إعادة الإرسال آمناً.
+
+جهاز لا يعرف /jobs (إصدار أقدم) يرفع JobsUnsupported فيعود المستدعي إلى /run.
+"""
+
+import os
+import json
+import time
+import uuid
+import logging
+
+import requests
+
+import http_pool
+import wire_format
+
+JOB_THRESHOLD = float(os.getenv("DTS_JOB_THRESHOLD", "10.0"))            # ثانية متوقعة
+STREAM_IDLE_TIMEOUT = float(os.getenv("DTS_JOB_STREAM_TIMEOUT", "10.0"))  # صمت البث قبل إعادة الاتصال
+SUBMIT_TIMEOUT = 5.0
+ACCEPT = f"{wire_format.CONTENT_TYPE}, {wire_format.JSON_CONTENT_TYPE}"
+
+
+class JobsUnsupported(Exception):
+    """الجهاز لا يوفّر واجهة /jobs"""
+
+
+def use_jobs(expected):
+    """هل تُرسل مهمة بهذا الزمن المتوقع عبر /jobs بدلاً من /run؟"""
+    return expected is not None and expected >= JOB_THRESHOLD
+
+
+def new_job_id():
+    return uuid.uuid4().hex
+
+
+def jobs_url(peer):
+    """عنوان /jobs لجهاز بصيغة 'http://ip:port/run' أو 'ip:port'"""
+    if "://" not in peer:
+        peer = f"http://{peer}"
+    base = peer[:-len("/run")] if peer.endswith("/run") else peer.rstrip("/")
+    return f"{base}/jobs"
+
+
+def submit_job(url, body, headers):
+    """POST /jobs؛ يعيد حالة المهمة المقبولة"""
+    response = http_pool.post(url, data=body, headers=headers, timeout=SUBMIT_TIMEOUT)
+    # 404 بلا JSON = المسار غير موجود؛ 404 بـ JSON = الدالة غير موجودة
+    json_reply = wire_format.JSON_CONTENT_TYPE in response.headers.get("Content-Type", "")
+    if response.status_code == 405 or (response.status_code == 404 and not json_reply):
+        raise JobsUnsupported(url)
+    response.raise_for_status()
+    return response.json()
+
+
+def stream_events(url, job_id):
+    """أحداث SSE للمهمة كأزواج (اسم، بيانات)، بلا النتيجة"""
+    with http_pool.get(f"{url}/{job_id}/events", params={"inline": "0"}, stream=True,
+                       headers={"Accept": "text/event-stream"},
+                       timeout=(SUBMIT_TIMEOUT, STREAM_IDLE_TIMEOUT)) as response:
+        response.raise_for_status()
+        event, data = "message", []
+        for line in response.iter_lines(decode_unicode=True):
+            if line:
+                field, _, value = line.partition(":")
+                if field == "event":
+                    event = value.strip()
+                elif field == "data":
+                    data.append(value.strip())
+                continue
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+
+
+def poll_job(url, job_id):
+    response = http_pool.get(f"{url}/{job_id}", timeout=SUBMIT_TIMEOUT,
+                             headers={"Accept": wire_format.JSON_CONTENT_TYPE})
+    response.raise_for_status()
+    return response.json()
+
+
+def wait_job(url, job_id, timeout):
+    """انتظار انتهاء المهمة حتى timeout ثانية؛ يعيد حالتها الأخيرة"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            for event, state in stream_events(url, job_id):
+                if event == "done":
+                    return state
+                if event == "error":
+                    raise RuntimeError(state.get("error"))
+                if time.monotonic() >= deadline:
+                    break
+        except (requests.ConnectionError, requests.Timeout) as e:
+            logging.info(f"🔌 انقطع بث المهمة {job_id}: {e} - إعادة الاتصال")
+            state = poll_job(url, job_id)   # جهاز لا يرد إطلاقاً يرفع هنا
+            if state.get("status") in ("done", "error"):
+                return state
+        if time.monotonic() >= deadline:
+            raise requests.Timeout(f"تجاوزت المهمة {job_id} المهلة ({timeout:.0f}s)")
+
+
+def fetch_result(url, job_id):
+    """(بيانات الرد، حجمه) لمهمة منتهية بالصيغة الثنائية إن قبلها الخادم"""
+    response = http_pool.get(f"{url}/{job_id}", timeout=SUBMIT_TIMEOUT,
+                             headers={"Accept": ACCEPT})
+    response.raise_for_status()
+    return (wire_format.decode_body(response.content, response.headers.get("Content-Type")),
+            len(response.content))
+
+
+def run_job(url, body, headers, job_id, timeout, stats=None):
+    """إرسال مهمة عبر /jobs وانتظارها؛ يعيد الرد بصيغة رد /run
+
+    body: حمولة /run مرمّزة تتضمن job_id. timeout: المهلة الكلية للمهمة.
+    إن مُرِّر stats يُضاف إليه bytes = حجم الطلب + حجم النتيجة.
+    """
+    submit_job(url, body, headers)
+    state = wait_job(url, job_id, timeout)
+    if state.get("status") == "error":
+        raise RuntimeError(state.get("error") or "job-failed")
+    data, nbytes = fetch_result(url, job_id)
+    if stats is not None:
+        stats["bytes"] = len(body) + nbytes
+    return data
+
+
+def post_job(peer, payload, timeout, stats=None):
+    """مثل wire_format.post_task لكن عبر /jobs (للمهام الطويلة)"""
+    payload = dict(payload, job_id=payload.get("job_id") or new_job_id())
+    headers = {"Content-Type": wire_format.CONTENT_TYPE, "Accept": ACCEPT}
+    return run_job(jobs_url(peer), wire_format.encode(payload), headers,
+                   payload["job_id"], timeout, stats=stats)
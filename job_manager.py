@@ -0,0 +1,286 @@
+# job_manager.py
+"""
+واجهة المهام غير المتزامنة على جانب الخادم (مستقلة عن Flask و FastAPI).
+
+/run يُبقي اتصال HTTP مفتوحاً طوال التنفيذ، فتصطدم مهام الفيديو الطويلة
+بمهلات العملاء والوسطاء. هنا يعود POST /jobs بمعرّف المهمة فوراً وتُنفَّذ في
+الخلفية (عبر worker_pool.execute)، ثم:
+
+    GET /jobs/<id>          الحالة، والنتيجة عند الاكتمال (JSON أو wire_format)
+    GET /jobs/<id>/events   بث SSE: أحداث progress دورية ثم حدث done أخير
+                            يحمل النتيجة (أو بدونها مع ?inline=0)
+
+أحداث progress تحمل الزمن المنقضي، ونسبة تقديرية إن أرسل العميل expected
+(الزمن المتوقع من نموذج التكلفة)، وتعمل كنبض يُبقي البث حياً عبر الوسطاء.
+العميل قد يرسل job_id بنفسه فتصبح إعادة الإرسال بعد انقطاع الشبكة آمنة:
+المعرّف المعروف يعيد المهمة نفسها ولا يُنفِّذها مرة ثانية.
+
+نتائج المهام في ResultStore (تُكتب كلها على القرص في JOB_DIR)، وبجانب كل
+نتيجة ملف JSON بحالة المهمة. عند إعادة تشغيل الخادم تُحمَّل السجلات، فيعمل
+GET /jobs/<id> وتبقى إعادة إرسال job_id نفسه آمنة؛ المهمة التي انقطعت عن
+التنفيذ بإعادة التشغيل تظهر فاشلة (interrupted). تُحذف السجلات بعد JOB_TTL.
+"""
+
+import os
+import json
+import time
+import uuid
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import wire_format
+from result_store import ResultStore
+from load_sampler import track_task, inflight_tasks
+
+JOB_TTL = float(os.getenv("DTS_JOB_TTL", "900"))                  # ثانية بعد الانتهاء
+JOB_THREADS = int(os.getenv("DTS_JOB_THREADS", "8"))              # مهام تُنتظر بالتوازي
+PROGRESS_INTERVAL = float(os.getenv("DTS_JOB_PROGRESS_INTERVAL", "2.0"))
+JOB_DIR = os.getenv("DTS_JOB_DIR", os.path.join(os.path.expanduser("~"), ".dts", "jobs"))
+JOB_SUFFIX = ".job.json"
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "error"
+_FINISHED = (DONE, FAILED)
+
+
+def _round(value):
+    return round(value, 3) if value is not None else None
+
+
+class Job:
+    __slots__ = ("id", "func", "status", "error", "expected", "queue",
+                 "created", "started", "finished")
+
+    def __init__(self, job_id, func, expected=None, queue=0):
+        self.id = job_id
+        self.func = func
+        self.status = QUEUED
+        self.error = None
+        self.expected = expected
+        self.queue = queue
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    def progress(self):
+        """نسبة تقديرية من expected (لا تبلغ 1 قبل الاكتمال)، أو None"""
+        if self.status == DONE:
+            return 1.0
+        if not self.expected or self.started is None:
+            return None
+        return min(self.elapsed / self.expected, 0.99)
+
+    def record(self):
+        """الحقول المحفوظة على القرص"""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_record(cls, data):
+        job = cls(data["id"], data["func"], data.get("expected"), data.get("queue", 0))
+        for name in ("status", "error", "created", "started", "finished"):
+            setattr(job, name, data.get(name, getattr(job, name)))
+        return job
+
+    def as_dict(self):
+        return {"job_id": self.id, "func": self.func, "status": self.status,
+                "error": self.error, "progress": _round(self.progress()),
+                "elapsed": round(self.elapsed, 3), "queue": self.queue,
+                "took": round(self.elapsed, 3) if self.status == DONE else None}
+
+
+class JobManager:
+    """تشغيل المهام في الخلفية وتتبّع حالتها (آمن للخيوط)"""
+
+    def __init__(self, threads=JOB_THREADS, ttl=JOB_TTL, result_dir=JOB_DIR,
+                 progress_interval=PROGRESS_INTERVAL):
+        self.ttl = ttl
+        self.progress_interval = progress_interval
+        self.result_dir = result_dir
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="job")
+        # كل النتائج على القرص (spill_threshold=0) لتبقى بعد إعادة التشغيل
+        self._results = ResultStore(ttl=ttl, spill_dir=result_dir, spill_threshold=0)
+        self._jobs = {}
+        self._cond = threading.Condition()
+        if result_dir:
+            self._load_jobs()
+
+    # ------------------------------------------------------------
+    # الإرسال والتنفيذ
+    # ------------------------------------------------------------
+    def submit(self, fn, args=(), kwargs=None, func_name=None, job_id=None, expected=None):
+        """إنشاء مهمة وإرجاعها فوراً؛ job_id معروف يعيد المهمة القائمة"""
+        self.purge_expired()
+        job_id = job_id or uuid.uuid4().hex
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return job
+            job = self._jobs[job_id] = Job(job_id, func_name or fn.__name__, expected,
+                                           queue=inflight_tasks())
+            self._save(job)
+        self._pool.submit(self._run, job, fn, list(args), dict(kwargs or {}))
+        logging.info(f"📥 مهمة {job.func} مقبولة بالمعرّف {job_id}")
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        from worker_pool import execute
+        self._update(job, status=RUNNING, started=time.time())
+        try:
+            with track_task():
+                result = execute(fn, args, kwargs)
+        except Exception as e:
+            logging.error(f"🔥 فشلت المهمة {job.id}: {e}")
+            self._update(job, status=FAILED, error=str(e), finished=time.time())
+            return
+        self._results.put(job.id, result)
+        self._update(job, status=DONE, finished=time.time())
+
+    def _update(self, job, **fields):
+        with self._cond:
+            for name, value in fields.items():
+                setattr(job, name, value)
+            self._save(job)
+            self._cond.notify_all()
+
+    # ------------------------------------------------------------
+    # الحفظ على القرص (بجانب النتائج)
+    # ------------------------------------------------------------
+    def _job_path(self, job_id):
+        digest = hashlib.sha1(str(job_id).encode()).hexdigest()
+        return os.path.join(self.result_dir, digest + JOB_SUFFIX)
+
+    def _save(self, job):
+        if not self.result_dir:
+            return
+        path = self._job_path(job.id)
+        try:
+            os.makedirs(self.result_dir, exist_ok=True)
+            tmp = f"{path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(job.record(), f)
+            os.replace(tmp, path)
+        except (TypeError, ValueError, OSError) as e:
+            logging.debug(f"تعذّر حفظ سجل المهمة {job.id}: {e}")
+
+    def _delete(self, job_id):
+        if self.result_dir:
+            try:
+                os.remove(self._job_path(job_id))
+            except OSError:
+                pass
+
+    def _load_jobs(self):
+        """تحميل سجلات المهام من تشغيل سابق؛ غير المكتملة تُعلَّم منقطعة"""
+        try:
+            names = [n for n in os.listdir(self.result_dir) if n.endswith(JOB_SUFFIX)]
+        except OSError:
+            return
+        now = time.time()
+        for name in names:
+            path = os.path.join(self.result_dir, name)
+            try:
+                with open(path, encoding="utf-8") as f:
+                    job = Job.from_record(json.load(f))
+            except (OSError, ValueError, KeyError) as e:
+                logging.debug(f"تعذّر قراءة سجل مهمة من {path}: {e}")
+                continue
+            if job.status not in _FINISHED:
+                job.status, job.error = FAILED, "interrupted"
+                job.finished = job.finished or now
+                self._save(job)
+            elif job.status == DONE and job.id not in self._results:
+                job.status, job.error = FAILED, "result-lost"
+                self._save(job)
+            if now - (job.finished or now) > self.ttl:
+                self._delete(job.id)
+                continue
+            self._jobs[job.id] = job
+
+    # ------------------------------------------------------------
+    # القراءة
+    # ------------------------------------------------------------
+    def get(self, job_id):
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def result(self, job_id, default=None):
+        return self._results.get(job_id, default)
+
+    def snapshot(self, job_id):
+        """حالة المهمة مع نتيجتها إن اكتملت، أو None لمعرّف غير معروف"""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        state = job.as_dict()
+        if job.status == DONE:
+            state["result"] = self.result(job_id)
+        return state
+
+    def wait(self, job_id, timeout=None):
+        """انتظار تغيّر حالة مهمة ما حتى timeout؛ يعيد المهمة"""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is not None and job.status not in _FINISHED:
+                self._cond.wait(timeout)
+            return job
+
+    def events(self, job_id, inline=True):
+        """أحداث المهمة كأزواج (اسم، بيانات) حتى الحدث الأخير done"""
+        status, sent_at = None, 0.0
+        while True:
+            job = self.get(job_id)
+            if job is None:
+                yield "error", {"job_id": job_id, "error": "job-not-found"}
+                return
+            if job.status in _FINISHED:
+                yield "done", self.snapshot(job_id) if inline else job.as_dict()
+                return
+            # حدث عند تغيّر الحالة، ونبض كل progress_interval
+            if job.status != status or time.time() - sent_at >= self.progress_interval:
+                status, sent_at = job.status, time.time()
+                yield "progress", job.as_dict()
+            self.wait(job_id, max(self.progress_interval - (time.time() - sent_at), 0.05))
+
+    def sse(self, job_id, inline=True):
+        """بث SSE جاهز لتمريره كجسم رد متدفق"""
+        for event, data in self.events(job_id, inline):
+            body = json.dumps(wire_format.jsonable(data))
+            yield f"event: {event}\ndata: {body}\n\n".encode()
+
+    def purge_expired(self):
+        now = time.time()
+        with self._cond:
+            for job_id in [k for k, j in self._jobs.items()
+                           if j.finished is not None and now - j.finished > self.ttl]:
+                del self._jobs[job_id]
+                self._delete(job_id)
+        self._results.purge_expired()
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager():
+    """مدير المهام المشترك للعملية (يُنشأ عند أول استخدام)"""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = JobManager()
+    return _manager
+
+
+def submit_payload(fn, data):
+    """إرسال حمولة /jobs (نفس حمولة /run مع job_id و expected اختياريين)"""
+    return get_job_manager().submit(fn, data.get("args", []), data.get("kwargs", {}),
+                                    func_name=data.get("func"), job_id=data.get("job_id"),
+                                    expected=data.get("expected"))
+
@@ -17,8 +17,7 @@ def check_requirements():
     required_files = [
         'background_service.py',
         'main.py',
-        'peer_server.py',
-        'rpc_server.py',
+        'worker_service.py',
         'load_balancer.py'
     ]
     
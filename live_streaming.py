@@ -11,7 +11,13 @@ import base64
 import json
 from datetime import datetime
 from processor_manager import should_offload
-from remote_executor import execute_remotely
+from remote_executor import execute_remotely, REMOTE_PEER
+from cost_model import get_cost_model, run_local
+from offload_decision import decide, log_outcome
+from load_sampler import current_load
+from task_registry import task_complexity
+from peer_health import get_peer_health
+import wire_format
 from functools import wraps
 
 logging.basicConfig(level=logging.INFO)
@@ -47,27 +53,32 @@ def stream_offload(func):
     """ديكوراتور خاص بالبث المباشر"""
     @wraps(func)
     def wrapper(*args, **kwargs):
-        complexity = estimate_stream_complexity(func, args, kwargs)
+        complexity = task_complexity(func, args, kwargs, default=40)  # task_registry
+        model = get_cost_model()
+        prediction = model.predict(func.__name__, args, kwargs)
+        decision = decide(func.__name__, prediction, get_peer_health().healthy([REMOTE_PEER]),
+                          current_load().cpu_ewma,
+                          wire_format.estimated_size([args, kwargs]),
+                          fallback_remote=complexity > 70 or should_offload(complexity))
         
-        if complexity > 70 or should_offload(complexity):
+        if decision.target is not None:
             logging.info(f"📺 إرسال مهمة البث {func.__name__} للمعالجة الموزعة")
-            return execute_remotely(func.__name__, args, kwargs)
+            stats = {}
+            result = execute_remotely(func.__name__, args, kwargs, stats=stats,
+                                      expected=prediction.remote)
+            if "compute" in stats:
+                model.record(func.__name__, args, kwargs, remote_runtime=stats["compute"],
+                             transfer_bytes=stats["bytes"])
+            log_outcome(decision, stats.get("elapsed"), ok="compute" in stats)
+            return result
         
         logging.info(f"📺 معالجة البث محلياً: {func.__name__}")
-        return func(*args, **kwargs)
+        start = time.perf_counter()
+        result = run_local(func, args, kwargs)
+        log_outcome(decision, time.perf_counter() - start)
+        return result
     return wrapper
 
-def estimate_stream_complexity(func, args, kwargs):
-    """تقدير تعقيد معالجة البث"""
-    if func.__name__ == "process_game_stream":
-        return args[1] * args[2] / 10000  # FPS × الدقة
-    elif func.__name__ == "real_time_video_enhancement":
-        return args[0] * 20  # عدد التحسينات × 20
-    elif func.__name__ == "multi_stream_processing":
-        return len(args[0]) * 25  # عدد البثوث × 25
-    elif func.__name__ == "ai_commentary_generation":
-        return args[1] * 15  # طول النص × 15
-    return 40
 
 # ═══════════════════════════════════════════════════════════════
 # معالجة بث الألعاب المباشر
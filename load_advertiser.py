@@ -0,0 +1,107 @@
+# load_advertiser.py
+"""
+إعلان الحمل الحيّ في سجل TXT لخدمة _tasknode عبر update_service.
+
+بدلاً من نشر قيمة load مرة واحدة عند التسجيل، يعيد المُعلِن نشر CPU والذاكرة
+المتاحة وعمق الطابور وعدد المهام الجارية كلما تغيّرت بما يتجاوز العتبات
+(يُفحص كل ADVERTISE_INTERVAL)، ومرة على الأقل كل HEARTBEAT_INTERVAL كنبض
+حياة. العملاء يقرؤون هذه القيم من ذاكرة mDNS المؤقتة (peer_table) دون
+استطلاع /cpu.
+
+حقول TXT: load و cpu (0-1)، mem (MB متاحة)، queue، inflight، hb (ثوانٍ)، seq.
+
+seq رقم يزداد مع كل نشر: متصفح zeroconf لا يُبلغ عن سجل TXT مطابق لما في
+ذاكرته المؤقتة، فبدونه لا يصل نبض عقدة حملها ثابت ويُحذف سجلها (peer_table).
+"""
+
+import os
+import time
+import logging
+import threading
+
+from zeroconf import ServiceInfo
+
+from load_sampler import current_load, inflight_tasks
+
+ADVERTISE_INTERVAL = float(os.getenv("DTS_ADVERTISE_INTERVAL", "1.0"))    # ثانية بين الفحوص
+HEARTBEAT_INTERVAL = float(os.getenv("DTS_HEARTBEAT_INTERVAL", "10.0"))   # أقصى مدة بلا نشر
+CPU_DELTA = float(os.getenv("DTS_ADVERTISE_CPU_DELTA", "0.05"))            # تغيّر CPU الجدير بالنشر
+MEM_DELTA_MB = float(os.getenv("DTS_ADVERTISE_MEM_DELTA_MB", "256"))       # تغيّر الذاكرة الجدير بالنشر
+
+
+class LoadAdvertiser:
+    """خيط يحدّث خصائص TXT لخدمة مسجّلة بقيم الحمل الحالية"""
+
+    def __init__(self, zeroconf, info, queue_depth=None, interval=ADVERTISE_INTERVAL,
+                 heartbeat=HEARTBEAT_INTERVAL, cpu_delta=CPU_DELTA, mem_delta_mb=MEM_DELTA_MB):
+        self._zeroconf = zeroconf
+        self._info = info
+        self._static = {k: v for k, v in info.properties.items()
+                        if k not in (b"load", b"cpu", b"mem", b"queue", b"inflight", b"hb", b"seq")}
+        self._queue_depth = queue_depth
+        self.interval = interval
+        self.heartbeat = heartbeat
+        self.cpu_delta = cpu_delta
+        self.mem_delta_mb = mem_delta_mb
+        self._published = None
+        self._published_at = 0.0
+        self._seq = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True, name="load-advertiser")
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def sample(self):
+        """القيم الحالية المراد إعلانها"""
+        load = current_load()
+        queue = self._queue_depth() if self._queue_depth is not None else 0
+        return {"cpu": load.cpu_ewma, "mem": load.mem_ewma_mb,
+                "queue": int(queue), "inflight": inflight_tasks()}
+
+    def _changed(self, values):
+        last = self._published
+        if last is None:
+            return True
+        return (abs(values["cpu"] - last["cpu"]) >= self.cpu_delta
+                or abs(values["mem"] - last["mem"]) >= self.mem_delta_mb
+                or values["queue"] != last["queue"]
+                or values["inflight"] != last["inflight"])
+
+    def properties(self, values):
+        props = dict(self._static)
+        props.update({
+            b"load": f"{values['cpu']:.3f}".encode(),
+            b"cpu": f"{values['cpu']:.3f}".encode(),
+            b"mem": f"{values['mem']:.0f}".encode(),
+            b"queue": str(values["queue"]).encode(),
+            b"inflight": str(values["inflight"]).encode(),
+            b"hb": f"{self.heartbeat:g}".encode(),
+            b"seq": str(self._seq).encode(),
+        })
+        return props
+
+    def publish(self, values):
+        info = self._info
+        self._seq += 1
+        self._info = ServiceInfo(info.type, info.name, addresses=info.addresses, port=info.port,
+                                 properties=self.properties(values), server=info.server)
+        self._zeroconf.update_service(self._info)
+        self._published = values
+        self._published_at = time.monotonic()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                values = self.sample()
+                due = time.monotonic() - self._published_at >= self.heartbeat
+                if due or self._changed(values):
+                    self.publish(values)
+            except Exception as e:
+                logging.debug(f"تعذّر تحديث إعلان الحمل: {e}")
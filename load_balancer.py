@@ -1,78 +1,88 @@
 # load_balancer.py
-import  requests, time, smart_tasks, psutil, socket
+import time, psutil, socket
+import requests
+import wire_format
 from offload_core import peer_discovery
+from peer_prober import PeerProber
+from peer_selection import get_policy
+from peer_stats import get_peer_stats, is_private_ip, peer_key
+from peer_health import get_peer_health
+from task_registry import get_task_spec
+
+# فحص /cpu لكل الأقران بالتوازي في الخلفية؛ الاختيار قراءة من الذاكرة فقط
+prober = PeerProber(lambda: list(peer_discovery.PEERS))
 
 def send(peer, func, *args, **kw):
+    health = get_peer_health()
+    if not health.allow(peer):
+        return {"error": f"circuit open for {peer}"}
     try:
-        r = requests.post(peer, json={"func": func,
-                                      "args": list(args),
-                                      "kwargs": kw}, timeout=12)
-        return r.json()
+        start = time.perf_counter()
+        with get_peer_stats().track(peer):
+            result = wire_format.post_task(peer, {"func": func,
+                                                  "args": list(args),
+                                                  "kwargs": kw},
+                                           timeout=health.timeout_for(peer, func, default=12))
+        get_peer_stats().observe_latency(peer, time.perf_counter() - start, func=func)
+        health.record_success(peer)
+        return result
+    except (requests.ConnectionError, requests.Timeout) as e:
+        health.record_error(peer, e, func)
+        return {"error": str(e)}
     except Exception as e:
+        health.record_success(peer)
         return {"error": str(e)}
 
 def choose_peer():
-    """اختيار أفضل جهاز - أولوية LAN ثم WAN"""
-    import socket
-    
-    lan_peers = []
-    wan_peers = []
-    
-    # تصنيف الأجهزة
-    for p in list(peer_discovery.PEERS):
-        ip = p.split('//')[1].split(':')[0] if '//' in p else p.split(':')[0]
-        if is_local_ip(ip):
-            lan_peers.append(p)
-        else:
-            wan_peers.append(p)
-    
-    # أولاً: جرب الأجهزة المحلية (LAN)
-    best_lan = find_best_peer(lan_peers)
-    if best_lan:
-        return best_lan
-    
-    # ثانياً: إذا لم تتوفر أجهزة محلية، جرب WAN
-    if internet_available():
-        best_wan = find_best_peer(wan_peers)
-        return best_wan
-    
+    """اختيار أفضل جهاز - أقرب فئة شبكية مقاسة أولاً (RTT وعرض النطاق)"""
+    peers = list(peer_discovery.PEERS)
+
+    # الأجهزة العامة لا تُجرب دون اتصال بالإنترنت
+    if not internet_available():
+        peers = [p for p in peers if is_local_ip(peer_key(p).rsplit(':', 1)[0])]
+
+    # فئة بعد فئة: جهاز WAN سريع يسبق جهاز LAN مزدحماً إن قالت القياسات ذلك
+    for group in get_peer_stats().group_by_tier(peers):
+        best = find_best_peer(group)
+        if best:
+            return best
+
     return None
 
 def find_best_peer(peers):
-    """العثور على أفضل جهاز من قائمة معينة"""
-    best = None
-    for p in peers:
-        try:
-            cpu = requests.get(p.replace("/run", "/cpu"), timeout=2).json()["usage"]
-            best = (p, cpu) if best is None or cpu < best[1] else best
-        except: 
-            continue
-    return best[0] if best else None
+    """العثور على أفضل جهاز من قائمة معينة (من آخر جولة فحص وحسب سياسة الاختيار)"""
+    prober.start()
+    loads = {p: entry.load for p in get_peer_health().healthy(peers)
+             if (entry := prober.load(p)) is not None}
+    return get_policy().choose(list(loads), load_of=loads.get)
 
 def is_local_ip(ip):
     """فحص إذا كان IP محلي"""
-    return (
-        ip.startswith('192.168.') or 
-        ip.startswith('10.') or 
-        ip.startswith('172.') or
-        ip == '127.0.0.1'
-    )
+    return is_private_ip(ip)
 
 def internet_available():
-    """فحص توفر الإنترنت"""
-    try:
-        socket.create_connection(("8.8.8.8", 53), timeout=3)
-        return True
-    except:
-        return False
+    """فحص توفر الإنترنت (حالة مخزّنة يحدّثها الفاحص دورياً)"""
+    return prober.start().internet_available()
+
+def run_registered(name, *args, **kw):
+    """تنفيذ المهمة عبر مدخلها المسجّل (spec.entry: بعد offload و memoize)"""
+    spec = get_task_spec(name)
+    if spec is None:
+        return {"error": f"task not registered: {name}"}
+    return spec.entry(*args, **kw)
+
+def main():
+    prober.start()
+    while True:
+        peer = choose_peer()
+        if peer:
+            print(f"\n🛰️  إرسال إلى {peer}")
+            res = send(peer, "prime_calculation", 30000)
+        else:
+            print("\n⚙️  لا أقران؛ العمل محليّ على", socket.gethostname())
+            res = run_registered("prime_calculation", 30000)
+        print("🔹 النتيجة (جزئية):", str(res)[:120])
+        time.sleep(10)
 
-while True:
-    peer = choose_peer()
-    if peer:
-        print(f"\n🛰️  إرسال إلى {peer}")
-        res = send(peer, "prime_calculation", 30000)
-    else:
-        print("\n⚙️  لا أقران؛ العمل محليّ على", socket.gethostname())
-        res = smart_tasks.prime_calculation(30000)
-    print("🔹 النتيجة (جزئية):", str(res)[:120])
-    time.sleep(10)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# load_sampler.py
+"""
+مُعايِن حمل مشترك للعملية يعمل في خيط خلفي.
+
+يأخذ عينة من CPU والذاكرة ومتوسط الحمل ونسب الأنوية كل SAMPLE_INTERVAL
+ويحتفظ بمتوسط أسّي (EWMA) ومتوسط نافذة، ثم ينشر لقطة ثابتة (namedtuple)
+يستبدلها بإسناد واحد. القراءة عبر current_load() فورية وبلا قفل، بدلاً من
+psutil.cpu_percent(interval=...) الحاجب في كل استدعاء.
+"""
+
+import os
+import time
+import threading
+import logging
+from collections import deque, namedtuple
+from contextlib import contextmanager
+
+import psutil
+
+SAMPLE_INTERVAL = 0.5   # ثانية بين العينات
+WINDOW_SIZE = 10        # عدد العينات في متوسط النافذة
+EWMA_ALPHA = 0.3        # وزن العينة الجديدة في المتوسط الأسّي
+
+LoadSnapshot = namedtuple("LoadSnapshot", [
+    "cpu",              # نسبة CPU اللحظية (0.0 - 1.0)
+    "cpu_ewma",         # المتوسط الأسّي لنسبة CPU
+    "cpu_window",       # متوسط آخر WINDOW_SIZE عينة
+    "mem_available_mb", # الذاكرة المتاحة اللحظية (MB)
+    "mem_ewma_mb",      # المتوسط الأسّي للذاكرة المتاحة
+    "mem_window_mb",    # متوسط نافذة الذاكرة المتاحة
+    "mem_percent",      # نسبة استخدام الذاكرة (0 - 100)
+    "load_avg",         # (1, 5, 15) دقيقة، مقسومة على عدد الأنوية
+    "per_core",         # نسب الأنوية (0.0 - 1.0)
+    "timestamp",
+])
+
+
+def _load_average():
+    cores = os.cpu_count() or 1
+    try:
+        return tuple(v / cores for v in psutil.getloadavg())
+    except (AttributeError, OSError):
+        return (0.0, 0.0, 0.0)
+
+
+class LoadSampler:
+    """خيط واحد يحدّث لقطة الحمل بشكل دوري"""
+
+    def __init__(self, interval=SAMPLE_INTERVAL, window=WINDOW_SIZE, alpha=EWMA_ALPHA):
+        self.interval = interval
+        self.alpha = alpha
+        self.cpu_history = deque(maxlen=window)
+        self.mem_history = deque(maxlen=window)
+        self._stop = threading.Event()
+        self._thread = None
+
+        # تهيئة عدّادات psutil حتى تكون العينة التالية ذات معنى
+        psutil.cpu_percent(interval=None)
+        psutil.cpu_percent(interval=None, percpu=True)
+
+        # لقطة أولية بلا انتظار: نستعمل متوسط الحمل كتقدير لـ CPU
+        load_avg = _load_average()
+        cpu = min(load_avg[0], 1.0)
+        vm = psutil.virtual_memory()
+        mem = vm.available / (1024**2)
+        self.snapshot = LoadSnapshot(cpu, cpu, cpu, mem, mem, mem, vm.percent,
+                                     load_avg, (), time.time())
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True, name="load-sampler")
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self._sample()
+            except Exception as e:
+                logging.debug(f"فشل أخذ عينة الحمل: {e}")
+
+    def _sample(self):
+        prev = self.snapshot
+        cpu = psutil.cpu_percent(interval=None) / 100.0
+        per_core = tuple(c / 100.0 for c in psutil.cpu_percent(interval=None, percpu=True))
+        vm = psutil.virtual_memory()
+        mem = vm.available / (1024**2)
+
+        self.cpu_history.append(cpu)
+        self.mem_history.append(mem)
+        a = self.alpha
+
+        # إسناد واحد = نشر ذري للقطة الجديدة
+        self.snapshot = LoadSnapshot(
+            cpu=cpu,
+            cpu_ewma=a * cpu + (1 - a) * prev.cpu_ewma,
+            cpu_window=sum(self.cpu_history) / len(self.cpu_history),
+            mem_available_mb=mem,
+            mem_ewma_mb=a * mem + (1 - a) * prev.mem_ewma_mb,
+            mem_window_mb=sum(self.mem_history) / len(self.mem_history),
+            mem_percent=vm.percent,
+            load_avg=_load_average(),
+            per_core=per_core,
+            timestamp=time.time(),
+        )
+
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def get_load_sampler():
+    """المُعايِن المشترك للعملية (يبدأ عند أول استخدام)"""
+    global _sampler
+    if _sampler is None:
+        with _sampler_lock:
+            if _sampler is None:
+                _sampler = LoadSampler().start()
+    return _sampler
+
+
+def current_load():
+    """آخر لقطة حمل - قراءة فورية بلا حجب"""
+    return get_load_sampler().snapshot
+
+
+# ------------------------------------------------------------
+# عدّاد المهام الجارية على هذا الجهاز (عمق الطابور المُعلن للعملاء)
+# ------------------------------------------------------------
+_inflight = 0
+_inflight_lock = threading.Lock()
+
+
+@contextmanager
+def track_task():
+    """يحيط بتنفيذ مهمة واردة ليُحتسب ضمن المهام الجارية"""
+    global _inflight
+    with _inflight_lock:
+        _inflight += 1
+    try:
+        yield
+    finally:
+        with _inflight_lock:
+            _inflight -= 1
+
+
+def inflight_tasks():
+    return _inflight
@@ -1,7 +1,7 @@
 # main.py – نسخة مُنقَّحة ومستقرة
 
 """
-تشغيل خادم FastAPI + واجهة أوامر موزّعة.
+تشغيل خدمة العقدة (worker_service) + واجهة أوامر موزّعة.
 - يعتمد على حزمة offload_core (tasks + peer_discovery + smart_tasks).
 - يفعّل Zeroconf لاكتشاف العقد.
 - يُشغّل ماسح الإنترنت وخوادم الخلفية.
@@ -16,8 +16,6 @@ import subprocess
 import threading
 from pathlib import Path
 
-from fastapi import FastAPI
-from pydantic import BaseModel
 from offload_core.smart_tasks import (
     matrix_multiply,
     prime_calculation,
@@ -38,19 +36,9 @@ from offload_core.smart_tasks import (
 )
 from distributed_executor import DistributedExecutor
 
-# ---- إعداد FastAPI ----------------------------------------------------------
-app = FastAPI(title="Offload Helper API")
-
-class TaskRequest(BaseModel):
-    func: str
-    args: list | None = []
-    kwargs: dict | None = {}
-    complexity: int | float | None = None
-
-@app.post("/run")
-async def run_task(req: TaskRequest):
-    """End‑point موحّد يستدعي dispatch في offload_core.tasks"""
-    return tasks.dispatch(req)
+# ---- خادم العقدة ------------------------------------------------------------
+# مسارات /run و /run_batch و /jobs وغيرها في خدمة العقدة الموحّدة
+from worker_service import app, serve  # noqa: F401
 
 # ---- إعدادات النظام ---------------------------------------------------------
 CPU_PORT = 7520
@@ -65,10 +53,9 @@ def benchmark(fn, *args):
 
 
 def start_background():
-    """تشغيل Peer Server وLoad Balancer في الخلفية"""
-    subprocess.Popen([PYTHON_EXE, "peer_server.py"])
+    """تشغيل Load Balancer في الخلفية (خادم العقدة يعمل داخل هذه العملية)"""
     subprocess.Popen([PYTHON_EXE, "load_balancer.py"])
-    logging.info("✅ تم تشغيل الخدمات الخلفيّة (peer_server & load_balancer)")
+    logging.info("✅ تم تشغيل الخدمات الخلفيّة (load_balancer)")
 
 
 def cli_menu(executor: DistributedExecutor):
@@ -111,10 +98,9 @@ def main() -> None:
     executor.peer_registry.register_service("node_main", CPU_PORT, load=0.2)
     logging.info("✅ النظام جاهز للعمل")
 
-    # تشغيل خادم FastAPI في خيط منفصل
-    import uvicorn
+    # تشغيل خدمة العقدة في خيط منفصل (العقدة مسجّلة أعلاه فلا يعاد إعلانها)
     threading.Thread(
-        target=lambda: uvicorn.run(app, host="0.0.0.0", port=CPU_PORT, log_level="warning"),
+        target=lambda: serve(port=CPU_PORT, advertise=False),
         daemon=True,
     ).start()
 
@@ -0,0 +1,187 @@
+# memo_cache.py
+"""
+ذاكرة تخزين لنتائج المهام الحتمية مفهرسة بمحتوى الاستدعاء.
+
+المفتاح = blake2b(اسم الدالة، إصدارها، الوسائط بعد توحيدها)، حيث:
+    - تُربط الوسائط بتوقيع الدالة وتُكمَّل القيم الافتراضية، فيتساوى f(5) و f(n=5)
+    - القوائم والصفوف سواء (الوسائط تصل قوائم عبر JSON)، والقواميس مرتبة بالمفاتيح
+    - المصفوفات تُبصم بنوعها وشكلها ومحتواها، وأوصاف GeneratorSpec بحقولها
+الإصدار = الإصدار المعلن + بصمة شيفرة الدالة، فتعديل الدالة يبطل نتائجها القديمة.
+
+التفعيل لكل دالة على حدة: @memoize أو offload(cache=True)، و cache قد تكون
+شرطاً على الوسائط (مثلاً: ضرب المصفوفات حتمي فقط إن مُرِّرت أوصاف مولِّدات ببذور).
+التخزين عبر ResultStore: LRU في الذاكرة وطبقة قرص للنتائج الكبيرة.
+"""
+
+import os
+import json
+import inspect
+import hashlib
+import logging
+import threading
+from functools import wraps
+
+import numpy as np
+
+from generator_spec import GeneratorSpec
+from result_store import ResultStore
+
+MEMO_TTL = float(os.getenv("DTS_MEMO_TTL", str(24 * 3600)))
+MEMO_MAX_ENTRIES = int(os.getenv("DTS_MEMO_MAX_ENTRIES", "50000"))
+MEMO_MAX_BYTES = int(os.getenv("DTS_MEMO_MAX_BYTES", str(256 * 1024**2)))
+MEMO_DISK_MAX_BYTES = int(os.getenv("DTS_MEMO_DISK_MAX_BYTES", str(2 * 1024**3)))
+MEMO_DIR = os.getenv("DTS_MEMO_DIR", os.path.join(os.path.expanduser("~"), ".dts", "memo"))
+
+_MISS = object()
+
+
+class MemoPolicy:
+    """سياسة التخزين لدالة: الإصدار وشرط اختياري على الوسائط"""
+
+    __slots__ = ("name", "version", "when", "signature")
+
+    def __init__(self, func, version=None, when=None):
+        self.name = f"{func.__module__}.{func.__qualname__}"
+        self.version = f"{version or 0}:{_code_fingerprint(func)}"
+        self.when = when
+        try:
+            self.signature = inspect.signature(func)
+        except (TypeError, ValueError):
+            self.signature = None
+
+
+def _code_fingerprint(func):
+    code = getattr(inspect.unwrap(func), "__code__", None)
+    if code is None:
+        return "0"
+    h = hashlib.blake2b(code.co_code, digest_size=8)
+    h.update(repr(code.co_consts).encode())
+    return h.hexdigest()
+
+
+# ------------------------------------------------------------
+# توحيد الوسائط
+# ------------------------------------------------------------
+def _feed(h, value):
+    """إدخال قيمة في البصمة بصيغة موحّدة؛ TypeError لنوع غير قابل للتخزين"""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        h.update(f"{type(value).__name__}:{value!r};".encode())
+    elif isinstance(value, bytes):
+        h.update(b"bytes:%d;" % len(value))
+        h.update(value)
+    elif isinstance(value, np.generic):
+        _feed(h, value.item())
+    elif isinstance(value, np.ndarray):
+        if value.dtype.hasobject:
+            _feed(h, value.tolist())
+            return
+        arr = np.ascontiguousarray(value)
+        h.update(f"ndarray:{arr.dtype.str}:{arr.shape};".encode())
+        h.update(memoryview(arr).cast("B"))
+    elif isinstance(value, GeneratorSpec):
+        h.update(b"genspec:" + json.dumps(value.to_dict(), sort_keys=True).encode() + b";")
+    elif isinstance(value, (list, tuple)):
+        h.update(b"list:%d[" % len(value))
+        for item in value:
+            _feed(h, item)
+        h.update(b"]")
+    elif isinstance(value, dict):
+        h.update(b"dict:%d{" % len(value))
+        for key in sorted(value, key=str):
+            _feed(h, str(key))
+            _feed(h, value[key])
+        h.update(b"}")
+    else:
+        raise TypeError(f"نوع غير قابل للتخزين: {type(value).__name__}")
+
+
+def _policy(fn):
+    return getattr(fn, "memo_policy", None)
+
+
+def call_fingerprint(name, args, kwargs, signature=None):
+    """بصمة استدعاء موحّدة (name يشمل الإصدار إن لزم)؛ TypeError إن تعذّر توحيده"""
+    if signature is not None:
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        args, kwargs = (), dict(bound.arguments)
+    h = hashlib.blake2b(digest_size=20)
+    h.update(f"{name};".encode())
+    _feed(h, list(args))
+    _feed(h, kwargs)
+    return h.hexdigest()
+
+
+def memo_key(fn, args, kwargs):
+    """مفتاح الاستدعاء، أو None إن لم تُفعَّل الدالة أو لم يتحقق شرطها"""
+    policy = _policy(fn)
+    if policy is None:
+        return None
+    try:
+        if policy.when is not None and not policy.when(*args, **kwargs):
+            return None
+        return call_fingerprint(f"{policy.name}@{policy.version}", args, kwargs,
+                                policy.signature)
+    except TypeError as e:
+        logging.debug(f"استدعاء غير قابل للتخزين لـ {policy.name}: {e}")
+        return None
+
+
+# ------------------------------------------------------------
+# التخزين
+# ------------------------------------------------------------
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_memo_cache():
+    """مخزن النتائج المشترك للعملية"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultStore(ttl=MEMO_TTL, max_entries=MEMO_MAX_ENTRIES,
+                                     max_bytes=MEMO_MAX_BYTES, spill_dir=MEMO_DIR,
+                                     spill_max_bytes=MEMO_DISK_MAX_BYTES)
+    return _cache
+
+
+def cached_call(fn, args, kwargs, compute=None):
+    """تنفيذ fn مع استشارة المخزن أولاً (لخوادم /run وللديكوراتورات)
+
+    إن لم تكن الدالة مفعّلة تُنفَّذ كما هي. عند الإصابة تُعاد النتيجة دون أي
+    تنفيذ أو اتصال شبكي. compute يحل محل المنفِّذ عند الإخفاق (مثل مجمع
+    العمليات في worker_pool).
+    """
+    if compute is None:
+        compute = getattr(fn, "memo_compute", fn)
+    key = memo_key(fn, args, kwargs)
+    if key is None:
+        return compute(*args, **kwargs)
+    cache = get_memo_cache()
+    result = cache.get(key, _MISS)
+    if result is not _MISS:
+        logging.debug(f"💾 إصابة في ذاكرة النتائج لـ {fn.__name__}")
+        return result
+    result = compute(*args, **kwargs)
+    cache.put(key, result)
+    return result
+
+
+def memoize(func=None, *, version=None, when=None, compute=None):
+    """تفعيل التخزين لدالة حتمية
+
+    version: يُغيَّر يدوياً لإبطال النتائج القديمة (بصمة الشيفرة تُضاف تلقائياً).
+    when: شرط على الوسائط؛ الاستدعاءات التي لا تحققه تُنفَّذ دون تخزين.
+    compute: المنفِّذ الفعلي عند الإخفاق إن اختلف عن func (مثل ديكوراتور offload).
+    """
+    if func is None:
+        return lambda f: memoize(f, version=version, when=when, compute=compute)
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        return cached_call(wrapper, args, kwargs)
+
+    wrapper.memo_policy = MemoPolicy(func, version, when)
+    wrapper.memo_compute = compute or func
+    return wrapper
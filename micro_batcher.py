@@ -0,0 +1,255 @@
+# micro_batcher.py
+"""
+تجميع الاستدعاءات الصغيرة الموجّهة لنفس الجهاز في طلب /run_batch واحد.
+
+في المهام الصغيرة (multiply_task و data_processing) تطغى رحلة HTTP الكاملة
+وترميز الحمولة على زمن الحساب نفسه. المُجمِّع يحتجز الحمولة حتى BATCH_WINDOW
+ثانية أو حتى BATCH_MAX_SIZE عنصراً لنفس الجهاز، ثم يرسلها دفعة واحدة ويوزّع
+الردود على Future كل مستدعٍ. الحمولات الأكبر من BATCH_MAX_ITEM_BYTES تُرسل
+منفردة فوراً، والجهاز الذي لا يعرف /run_batch يُخدم عبر /run بعدها.
+
+قاطع الدائرة وإحصاءات الجهاز (peer_health و peer_stats) تُحدَّث لكل دفعة:
+زمن كل عنصر = زمن تنفيذه على الجهاز (took) + حصته من زمن الشبكة للدفعة.
+انتهاء مهلة الرد بعد الاتصال يُفشل العناصر بـ TimeoutError (ربما نُفِّذت على
+الجهاز)، وتعذّر الاتصال بـ ConnectionError (لم تصل).
+"""
+
+import os
+import time
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import requests
+
+import http_pool
+import wire_format
+from peer_stats import get_peer_stats, peer_key
+from peer_health import get_peer_health
+
+BATCH_WINDOW = float(os.getenv("DTS_BATCH_WINDOW", "0.005"))                  # ثانية
+BATCH_MAX_SIZE = int(os.getenv("DTS_BATCH_MAX_SIZE", "32"))
+BATCH_MAX_ITEM_BYTES = int(os.getenv("DTS_BATCH_MAX_ITEM_BYTES", str(64 * 1024)))
+
+# إرسال عناصر الدفعة متوازية عبر /run لجهاز بلا /run_batch (منفصل عن مجمع الدفعات)
+_each_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="batch-each")
+
+
+class BatchUnsupported(Exception):
+    """الجهاز لا يوفّر /run_batch"""
+
+
+def _batch_reply(response):
+    """جسم الرد إن كان رد دفعة ({"results": ...})، وإلا None"""
+    try:
+        reply = wire_format.decode_body(response.content, response.headers.get("Content-Type"))
+    except Exception:
+        return None
+    return reply if isinstance(reply, dict) and "results" in reply else None
+
+
+def post_batch(peer, payloads, timeout, stats=None):
+    """إرسال دفعة إلى /run_batch؛ يعيد ردود العناصر بترتيب payloads
+
+    العنصر الذي لم يرد له الجهاز رداً يكون None. رد 404 أو 405 ليس رد دفعة
+    (مثل {"detail": "Not Found"} الافتراضي في FastAPI) يرفع BatchUnsupported.
+
+    إن مُرِّر stats يُضاف إليه bytes = حجم الطلب + حجم الرد، و took = زمن
+    تنفيذ الدفعة كلها على الجهاز.
+    """
+    url = f"http://{peer_key(peer)}/run_batch"
+    body = wire_format.encode({"tasks": payloads})
+    response = http_pool.post(url, data=body, timeout=timeout, headers={
+        "Content-Type": wire_format.CONTENT_TYPE,
+        "Accept": f"{wire_format.CONTENT_TYPE}, {wire_format.JSON_CONTENT_TYPE}"})
+    if response.status_code in (404, 405) and _batch_reply(response) is None:
+        raise BatchUnsupported(url)
+    response.raise_for_status()
+    reply = wire_format.decode_body(response.content, response.headers.get("Content-Type"))
+    if stats is not None:
+        stats["bytes"] = len(body) + len(response.content)
+        stats["took"] = reply.get("took")
+    items = [None] * len(payloads)
+    for position, item in enumerate(reply.get("results", [])):
+        index = item.get("index", position)
+        if 0 <= index < len(items):
+            item.setdefault("queue", reply.get("queue"))
+            items[index] = item
+    return items
+
+
+class _Batch:
+    __slots__ = ("peer", "payloads", "futures", "stats", "timeout", "opened")
+
+    def __init__(self, peer):
+        self.peer = peer
+        self.payloads = []
+        self.futures = []
+        self.stats = []
+        self.timeout = 0.0
+        self.opened = time.monotonic()
+
+
+class MicroBatcher:
+    """دفعات لكل جهاز تُرسل عند امتلائها أو انقضاء نافذتها (آمن للخيوط)"""
+
+    def __init__(self, window=BATCH_WINDOW, max_size=BATCH_MAX_SIZE,
+                 max_item_bytes=BATCH_MAX_ITEM_BYTES, max_workers=16):
+        self.window = window
+        self.max_size = max_size
+        self.max_item_bytes = max_item_bytes
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="batch-send")
+        self._cond = threading.Condition()
+        self._batches = {}          # peer_key -> _Batch مفتوحة
+        self._unsupported = set()   # أجهزة بلا /run_batch
+        self._thread = None
+
+    # ------------------------------------------------------------
+    # الواجهة
+    # ------------------------------------------------------------
+    def submit(self, peer, payload, timeout=10, stats=None):
+        """Future لرد العنصر بصيغة رد /run (result و took و queue)"""
+        future = Future()
+        key = peer_key(peer)
+        if (self.window <= 0 or key in self._unsupported
+                or wire_format.estimated_size(payload) > self.max_item_bytes):
+            batch = _Batch(peer)
+            self._add(batch, payload, future, stats, timeout)
+            self._pool.submit(self._send, batch)
+            return future
+        with self._cond:
+            batch = self._batches.get(key)
+            if batch is None:
+                batch = self._batches[key] = _Batch(peer)
+                self._ensure_thread()
+                self._cond.notify()
+            self._add(batch, payload, future, stats, timeout)
+            if len(batch.payloads) >= self.max_size:
+                del self._batches[key]
+                self._pool.submit(self._send, batch)
+        return future
+
+    def call(self, peer, payload, timeout=10, stats=None):
+        """مثل submit لكن ينتظر الرد (المهلة تشمل نافذة التجميع)"""
+        return self.submit(peer, payload, timeout, stats).result(timeout + self.window)
+
+    @staticmethod
+    def _add(batch, payload, future, stats, timeout):
+        batch.payloads.append(payload)
+        batch.futures.append(future)
+        batch.stats.append(stats)
+        batch.timeout = max(batch.timeout, timeout)
+
+    # ------------------------------------------------------------
+    # الإرسال
+    # ------------------------------------------------------------
+    def _ensure_thread(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True, name="micro-batcher")
+            self._thread.start()
+
+    def _run(self):
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                for key in [k for k, b in self._batches.items() if now - b.opened >= self.window]:
+                    self._pool.submit(self._send, self._batches.pop(key))
+                if self._batches:
+                    oldest = min(b.opened for b in self._batches.values())
+                    self._cond.wait(max(oldest + self.window - now, 0.0005))
+                else:
+                    self._cond.wait()
+
+    def _send(self, batch):
+        peer, health = batch.peer, get_peer_health()
+        if not health.allow(peer):
+            self._fail(batch, ConnectionError(f"قاطع الدائرة مفتوح لـ {peer_key(peer)}"))
+            return
+        stats = get_peer_stats()
+        sent = {}
+        start = time.perf_counter()
+        try:
+            with stats.track(peer):
+                if len(batch.payloads) == 1 or peer_key(peer) in self._unsupported:
+                    replies = self._send_each(batch)
+                else:
+                    try:
+                        replies = post_batch(peer, batch.payloads, batch.timeout, stats=sent)
+                    except BatchUnsupported:
+                        logging.info(f"الجهاز {peer_key(peer)} لا يدعم /run_batch - إرسال عبر /run")
+                        self._unsupported.add(peer_key(peer))
+                        replies = self._send_each(batch)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            funcs = {p.get("func") for p in batch.payloads}
+            health.record_error(peer, e, funcs.pop() if len(funcs) == 1 else None)
+            if isinstance(e, requests.Timeout) and not isinstance(e, requests.ConnectionError):
+                self._fail(batch, TimeoutError(f"لم يرد {peer_key(peer)} خلال المهلة: {e}"))
+            else:
+                self._fail(batch, ConnectionError(f"تعذّر الوصول إلى {peer_key(peer)}: {e}"))
+            return
+        except Exception as e:
+            health.record_success(peer)  # الجهاز يرد؛ الخطأ من الخادم
+            self._fail(batch, e)
+            return
+        health.record_success(peer)
+        elapsed = time.perf_counter() - start
+        count = len(batch.payloads)
+        share = sent["bytes"] // count if "bytes" in sent else None
+        # زمن الشبكة = الزمن الكلي ناقص زمن التنفيذ على الجهاز، يُقسَم على العناصر
+        server = sent.get("took")
+        if server is None:
+            server = sum(r.get("took") or 0 for r in replies if r is not None)
+        network = max(elapsed - server, 0.0) / count
+        for payload, future, item_stats, reply in zip(batch.payloads, batch.futures,
+                                                      batch.stats, replies):
+            if reply is None:
+                future.set_exception(RuntimeError(f"لم يرد {peer_key(peer)} بنتيجة هذا العنصر"))
+                continue
+            took = reply.get("took")
+            stats.observe_latency(peer, took + network if took is not None else elapsed / count,
+                                  func=payload.get("func"))
+            if item_stats is not None and share is not None:
+                item_stats.setdefault("bytes", share)
+            if "error" in reply:
+                future.set_exception(RuntimeError(reply["error"]))
+            else:
+                future.set_result(reply)
+
+    @staticmethod
+    def _send_each(batch):
+        """إرسال العناصر عبر /run متوازية (جهاز أقدم أو عنصر منفرد)
+
+        كل عنصر طلب مستقل بمهلة الدفعة كاملة، فلا تتراكم المهل على التوالي.
+        """
+        url = f"http://{peer_key(batch.peer)}/run"
+
+        def post(payload, item_stats):
+            try:
+                return wire_format.post_task(url, payload, timeout=batch.timeout, stats=item_stats)
+            except requests.HTTPError as e:
+                return {"error": str(e)}   # خطأ عنصر لا يُفشل البقية
+
+        if len(batch.payloads) == 1:
+            return [post(batch.payloads[0], batch.stats[0])]
+        futures = [_each_pool.submit(post, payload, item_stats)
+                   for payload, item_stats in zip(batch.payloads, batch.stats)]
+        return [f.result() for f in futures]
+
+    @staticmethod
+    def _fail(batch, error):
+        for future in batch.futures:
+            future.set_exception(error)
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher():
+    """المُجمِّع المشترك للعملية (يُنشأ عند أول استخدام)"""
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = MicroBatcher()
+    return _batcher
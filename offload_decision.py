@@ -0,0 +1,145 @@
+# offload_decision.py
+"""
+قرار التوزيع بنقطة التعادل (break-even): لكل تنفيذ يُقدَّر زمن الإكمال
+محلياً ولكل جهاز مرشح، ويُختار الأقل.
+
+    محلياً  = الزمن المتوقع / حصة المعالج المتاحة
+    بعيداً = RTT + (بايتات الطلب + بايتات الرد) / عرض النطاق
+              + (عمق طابور الجهاز + 1) × زمن التنفيذ البعيد المتوقع
+
+الأزمنة من نموذج التكلفة (cost_model) وإحصاءات الاتصال من peer_stats. بايتات
+الرد من النموذج (الذي يتعلّم الطلب + الرد معاً) بعد طرح بايتات هذا الطلب، أو من
+الحجم المعلن للمهمة قبل أن يتعلّم.
+
+الهدف المختار وحده يُقاس، فنموذج يفضّل المحلي لا يتعلّم الزمن البعيد أبداً (والعكس).
+لذلك يُستكشف باحتمال EXPLORE_RATE (DTS_EXPLORE_RATE، 0 يعطّله) هدف آخر عشوائي
+بين المحلي والأقران، بسبب "explore".
+
+سجل القرارات اختياري (DTS_DECISION_LOG = مسار ملف JSONL): كل قرار وتقديراته
+سطر، ويُلحق به لاحقاً الزمن الفعلي (log_outcome) لمعايرة النموذج. الكتابة في
+خيط خلفي فلا تقع على مسار الاستدعاء.
+"""
+
+import os
+import json
+import time
+import uuid
+import logging
+import queue
+import random
+import threading
+from collections import namedtuple
+
+from peer_stats import get_peer_stats
+
+DECISION_LOG = os.getenv("DTS_DECISION_LOG", "")   # فارغ = السجل معطّل
+LOG_QUEUE_SIZE = 10000                              # إدخالات تنتظر الكتابة قبل الإسقاط
+MIN_CPU_SHARE = 0.1   # أدنى حصة معالج نفترضها للتنفيذ المحلي تحت الحمل
+EXPLORE_RATE = float(os.getenv("DTS_EXPLORE_RATE", "0.05"))   # نسبة القرارات الاستكشافية
+
+Decision = namedtuple("Decision", ["id", "target", "estimates", "reason"])
+
+_log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def local_estimate(predicted_local, cpu_load):
+    """زمن الإكمال المحلي مع تمديده بحسب انشغال المعالج"""
+    return predicted_local / max(1.0 - cpu_load, MIN_CPU_SHARE)
+
+
+def remote_estimate(peer, predicted_remote, request_bytes, response_bytes):
+    """زمن الإكمال على جهاز: الشبكة + الانتظار في طابوره + التنفيذ
+
+    الانتظار يشمل طابور الجهاز المعلن وطلبات هذا العميل الجارية عليه.
+    """
+    link = get_peer_stats().link(peer)
+    transfer = link.rtt + (request_bytes + response_bytes) / link.bandwidth
+    return transfer + (link.queue_depth + link.outstanding + 1) * predicted_remote
+
+
+def _explore(chosen, peers):
+    """هدف عشوائي غير chosen ("local" أو جهاز) باحتمال EXPLORE_RATE، وإلا None"""
+    others = [t for t in ["local", *peers] if t != chosen]
+    if others and random.random() < EXPLORE_RATE:
+        return random.choice(others)
+    return None
+
+
+def decide(func_name, prediction, peers, cpu_load, request_bytes, fallback_remote,
+           response_bytes=None):
+    """اختيار الهدف الأسرع (None = محلياً) مع تسجيل القرار
+
+    prediction: cost_model.Prediction؛ إن نقصه الزمن المحلي أو البعيد يُستعمل
+    fallback_remote (القاعدة القديمة) ويُختار أول جهاز مرشح.
+    response_bytes: حجم النتيجة المعلن (task_registry) إن لم يتعلّمه النموذج بعد.
+    يُستبدل بالهدف أحياناً هدف استكشافي (انظر EXPLORE_RATE) ليتعلّم النموذج البديل.
+    """
+    decision_id = uuid.uuid4().hex[:12]
+    if prediction.local is None or prediction.remote is None:
+        target = peers[0] if fallback_remote and peers else None
+        decision = Decision(decision_id, target, {}, "fallback")
+    else:
+        if prediction.transfer_bytes is not None:
+            # النموذج يتعلّم stats["bytes"] = الطلب + الرد؛ الطلب يُضاف في remote_estimate
+            response_bytes = max(prediction.transfer_bytes - request_bytes, 0.0)
+        else:
+            response_bytes = response_bytes or 0.0
+        estimates = {"local": local_estimate(prediction.local, cpu_load)}
+        for peer in peers:
+            estimates[peer] = remote_estimate(peer, prediction.remote, request_bytes, response_bytes)
+        best = min(estimates, key=estimates.get)
+        decision = Decision(decision_id, None if best == "local" else best, estimates, "break-even")
+    explored = _explore(decision.target or "local", peers)
+    if explored is not None:
+        decision = Decision(decision_id, None if explored == "local" else explored,
+                            decision.estimates, "explore")
+
+    if DECISION_LOG:
+        _write({"event": "decision", "id": decision_id, "ts": time.time(), "func": func_name,
+                "cpu": round(cpu_load, 3), "request_bytes": request_bytes,
+                "predicted_local": prediction.local, "predicted_remote": prediction.remote,
+                "estimates": decision.estimates, "target": decision.target or "local",
+                "reason": decision.reason})
+    return decision
+
+
+def log_outcome(decision, actual_seconds, target=None, ok=True):
+    """إلحاق الزمن الفعلي بالقرار للمعايرة"""
+    if DECISION_LOG:
+        _write({"event": "outcome", "id": decision.id, "ts": time.time(),
+                "target": target or decision.target or "local",
+                "actual": actual_seconds, "ok": ok})
+
+
+def _write(entry):
+    """وضع الإدخال في طابور الكاتب الخلفي (بلا حجب؛ يُسقط إن امتلأ الطابور)"""
+    global _writer
+    if not DECISION_LOG:
+        return
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = threading.Thread(target=_write_loop, daemon=True, name="decision-log")
+                _writer.start()
+    try:
+        _log_queue.put_nowait(entry)
+    except queue.Full:
+        pass
+
+
+def _write_loop():
+    while True:
+        entries = [_log_queue.get()]
+        while True:
+            try:
+                entries.append(_log_queue.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            os.makedirs(os.path.dirname(DECISION_LOG) or ".", exist_ok=True)
+            with open(DECISION_LOG, "a") as f:
+                f.writelines(json.dumps(e, default=str) + "\n" for e in entries)
+        except OSError as e:
+            logging.debug(f"تعذّر كتابة سجل القرارات: {e}")
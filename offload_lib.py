@@ -3,13 +3,25 @@
 
 import time
 import math
-import random
-import psutil
 import requests
-import socket
+import http_pool
+import wire_format
+import job_client
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from functools import wraps
-from zeroconf import Zeroconf, ServiceBrowser
 import logging
+from load_sampler import current_load
+from cost_model import get_cost_model, run_local
+from offload_decision import decide, log_outcome
+from peer_stats import get_peer_stats, is_private_ip
+from memo_cache import memoize
+from single_flight import coalesce
+from peer_selection import get_policy
+from peer_health import get_peer_health
+from micro_batcher import get_batcher
+from task_registry import task, get_task_spec, task_complexity
+from generator_spec import seeded_inputs
 
 # إعداد السجل
 logging.basicConfig(
@@ -19,58 +31,66 @@ logging.basicConfig(
 
 # إعدادات التحميل
 MAX_CPU = 0.6  # عتبة استخدام CPU فقط
+DEFAULT_HEDGE_DELAY = 1.0  # مهلة التحوّط لجهاز بلا أزمنة مقاسة (ثانية)
 
-class PeerListener:
-    def __init__(self):
-        self.peers = []
+_hedge_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="hedge")
 
-    def add_service(self, zc, type, name):
-        info = zc.get_service_info(type, name)
-        if info:
-            ip = socket.inet_ntoa(info.addresses[0])
-            self.peers.append(f"{ip}:{info.port}")
-            logging.info(f"🔗 جهاز مكتشف: {ip}:{info.port}")
+_peer_directory = None
+_peer_directory_lock = threading.Lock()
 
-    def update_service(self, zc, type, name):
-        logging.debug(f"🔄 تم تحديث الخدمة: {name}")
-        pass  # هنا فقط لتفادي التحذير
+def _normalize_peer(peer):
+    """تحويل 'http://ip:port/run' أو 'ip:port' إلى الصيغة الموحدة 'ip:port'"""
+    if "://" in peer:
+        peer = peer.split("://", 1)[1]
+    return peer.split("/", 1)[0]
+
+def _external_peers():
+    """الأقران المكتشفون عبر الإنترنت (إن توفرت وحدة peer_discovery)"""
+    try:
+        import peer_discovery
+    except ImportError:
+        return []
+    return [_normalize_peer(p) for p in list(peer_discovery.PEERS)]
+
+def _verify_address(address):
+    ip, _, port = address.partition(':')
+    return verify_peer_project(ip, int(port) if port else 7520)
+
+def get_peer_directory():
+    """دليل الأقران المشترك للعملية (يُنشأ ويُشغَّل عند أول استخدام)"""
+    global _peer_directory
+    if _peer_directory is None:
+        with _peer_directory_lock:
+            if _peer_directory is None:
+                from peer_directory import PeerDirectory
+                directory = PeerDirectory(verifier=_verify_address,
+                                          extra_sources=_external_peers)
+                directory.start()
+                for address in _external_peers():
+                    directory.touch(address)
+                _peer_directory = directory
+    return _peer_directory
+
+def ranked_peers():
+    """الأقران المتوافقون الأصحاء من الدليل: الفئة الأقرب أولاً وسياسة الاختيار داخلها (بلا انتظار)"""
+    directory = get_peer_directory()
+    peers = get_peer_health().healthy(directory.peers())
+    return get_policy().order_by_tier(peers, load_of=directory.load_of)
 
 def discover_peers(timeout=1.5):
-    """اكتشاف الأجهزة المتاحة - أولوية LAN ثم WAN ثم الإنترنت مع فحص المشروع"""
-    import peer_discovery
-    from project_identifier import verify_project_compatibility
-
-    zc = Zeroconf()
-    listener = PeerListener()
-    ServiceBrowser(zc, "_http._tcp.local.", listener)
-    time.sleep(timeout)
-    zc.close()
-
-    lan_peers = []
-    wan_peers = []
-    internet_peers = []
-
-    for peer in listener.peers:
-        ip = peer.split(':')[0]
-        if verify_peer_project(ip):
-            if is_local_network(ip):
-                lan_peers.append(peer)
-            else:
-                wan_peers.append(peer)
-
-    all_discovered = list(peer_discovery.PEERS)
-    for peer_url in all_discovered:
-        peer_ip = peer_url.split("://")[1].split(":")[0]
-        if verify_peer_project(peer_ip):
-            if is_local_network(peer_ip):
-                if peer_url not in lan_peers:
-                    lan_peers.append(peer_url)
-            else:
-                if peer_url not in wan_peers:
-                    internet_peers.append(peer_url)
-
-    all_peers = lan_peers + wan_peers + internet_peers
-    logging.info(f"اكتُشف {len(all_peers)} جهاز DTS متوافق - LAN: {len(lan_peers)}, WAN: {len(wan_peers)}, Internet: {len(internet_peers)}")
+    """اكتشاف الأجهزة المتاحة - أولوية LAN ثم WAN ثم الإنترنت مع فحص المشروع
+
+    يقرأ من دليل الأقران الدائم؛ لا ينتظر حتى timeout إلا إذا كان الدليل
+    فارغاً بعد (أول استدعاء في العملية).
+    """
+    directory = get_peer_directory()
+    deadline = time.time() + timeout
+    while not directory.peers() and time.time() < deadline:
+        time.sleep(0.1)
+
+    all_peers = ranked_peers()
+    lan_count = sum(1 for p in all_peers if is_local_network(p.split(':')[0]))
+    logging.info(f"اكتُشف {len(all_peers)} جهاز DTS متوافق - LAN: {lan_count}, WAN: {len(all_peers) - lan_count}")
 
     return all_peers
 
@@ -80,7 +100,9 @@ def verify_peer_project(ip, port=7520):
         from project_identifier import verify_project_compatibility
 
         project_url = f"http://{ip}:{port}/project_info"
-        response = requests.get(project_url, timeout=2)
+        start = time.perf_counter()
+        response = http_pool.get(project_url, timeout=2)
+        get_peer_stats().observe_rtt(f"{ip}:{port}", time.perf_counter() - start)
 
         if response.status_code == 200:
             remote_info = response.json()
@@ -91,99 +113,277 @@ def verify_peer_project(ip, port=7520):
     return False
 
 def is_local_network(ip):
-    """فحص إذا كان IP في الشبكة المحلية"""
-    try:
-        import ipaddress
-        addr = ipaddress.ip_address(ip)
-        return (
-            addr.is_private or
-            str(addr).startswith('192.168.') or
-            str(addr).startswith('10.') or
-            str(addr).startswith('172.')
-        )
-    except:
-        return False
+    """فحص إذا كان IP في الشبكة المحلية (للتقارير فقط؛ الترتيب بفئات القرب المقاسة)"""
+    return is_private_ip(ip)
 
-def try_offload(peer, payload, max_retries=3):
-    """محاولة إرسال المهمة إلى جهاز آخر"""
-    url = f"http://{peer}/run"
+def _post(peer, payload, timeout, stats, job_id):
+    """إرسال عبر /jobs إن مُرِّر job_id (مع العودة إلى /run لجهاز أقدم)، وإلا /run"""
+    if job_id is not None:
+        try:
+            return job_client.post_job(peer, dict(payload, job_id=job_id), timeout, stats=stats)
+        except job_client.JobsUnsupported:
+            logging.info(f"الجهاز {peer} لا يدعم /jobs - إرسال عبر /run")
+    return wire_format.post_task(f"http://{peer}/run", payload, timeout=timeout, stats=stats)
+
+def try_offload(peer, payload, max_retries=3, stats=None, expected=None, response_bytes=None):
+    """محاولة إرسال المهمة إلى جهاز آخر
+
+    المهلة من متتبّع الصحة (أزمنة الدالة على الجهاز و expected = الزمن البعيد
+    المتوقع، مع زمن نقل الحمولة و response_bytes = حجم الرد المتوقع). جهاز قاطعه مفتوح يُرفض فوراً، وجهاز لا يرد لا يُعاد إليه الطلب؛
+    إعادة المحاولة فقط لأخطاء الخادم. المهام المتوقع أن تتجاوز
+    job_client.JOB_THRESHOLD تُرسل عبر /jobs بمعرّف ثابت بين المحاولات.
+    """
+    health = get_peer_health()
+    func = payload.get("func")
+    timeout = health.timeout_for(peer, func, expected=expected, default=10,
+                                 nbytes=wire_format.estimated_size(payload) + (response_bytes or 0))
+    job_id = job_client.new_job_id() if job_client.use_jobs(expected) else None
+    if job_id is not None:
+        payload = dict(payload, expected=expected)
     for attempt in range(max_retries):
+        if not health.allow(peer):
+            raise ConnectionError(f"قاطع الدائرة مفتوح لـ {peer}")
         try:
-            response = requests.post(url, json=payload, timeout=10)
-            response.raise_for_status()
-            return response.json()
+            start = time.perf_counter()
+            with get_peer_stats().track(peer):
+                result = _post(peer, payload, timeout, stats, job_id)
+            get_peer_stats().observe_latency(peer, time.perf_counter() - start, func=func)
+            health.record_success(peer)
+            return result
+        except (requests.ConnectionError, requests.Timeout) as e:
+            health.record_error(peer, e, func)
+            raise ConnectionError(f"تعذّر الوصول إلى {peer}: {e}") from e
         except Exception as e:
+            health.record_success(peer)  # الجهاز يرد؛ الخطأ من المهمة أو الخادم
             logging.warning(f"فشل المحاولة {attempt + 1} لـ {peer}: {str(e)}")
             time.sleep(0.5 * (attempt + 1))
     raise ConnectionError(f"فشل جميع المحاولات لـ {peer}")
 
+def batched_offload(peer, payload, stats=None, expected=None, response_bytes=None):
+    """مثل try_offload لمهمة صغيرة: تُضم إلى دفعة الجهاز في micro_batcher
+
+    بلا إعادة محاولة؛ المُجمِّع يحدّث قاطع الدائرة وأزمنة الجهاز للدفعة كلها.
+    """
+    timeout = get_peer_health().timeout_for(
+        peer, payload.get("func"), expected=expected, default=10,
+        nbytes=wire_format.estimated_size(payload) + (response_bytes or 0))
+    return get_batcher().call(peer, payload, timeout=timeout, stats=stats)
+
+def hedged_offload(peers, payload, local_fn=None, expected=None, response_bytes=None):
+    """إرسال متحوّط: نسخة احتياطية إذا تجاوز الطلب مئين 95 لأزمنة الجهاز
+
+    يُرسل للجهاز الأول؛ إن لم يرد خلال p95 الخاص به (أو فشل) تُرسل نسخة
+    للجهاز التالي، أو تُنفَّذ محلياً عبر local_fn عند نفاد الأقران. أول نتيجة
+    ناجحة تفوز، وتُلغى الأخرى (إن لم تبدأ) أو تُهمل نتيجتها.
+    للمهام عديمة الأثر الجانبي فقط (المعلنة بـ offload(hedge=True)).
+    يعيد (الفائز، النتيجة، stats) حيث الفائز اسم الجهاز أو "local"، و
+    stats["elapsed"] زمن طلب الفائز من لحظة إطلاقه هو (لا من إطلاق الأول).
+    """
+    candidates = list(peers)
+    if local_fn is not None:
+        candidates.append("local")
+    stats_by_target = {}
+
+    def call(target):
+        if target == "local":
+            return local_fn()
+        stats = stats_by_target.setdefault(target, {})
+        start = time.perf_counter()
+        result = try_offload(target, payload, max_retries=1, stats=stats, expected=expected,
+                             response_bytes=response_bytes)
+        stats["elapsed"] = time.perf_counter() - start
+        return result
+
+    def launch():
+        target = candidates.pop(0)
+        running[_hedge_pool.submit(call, target)] = target
+        return target
+
+    func = payload.get("func")
+    running = {}
+    current = launch()
+    last_error = None
+    while running:
+        delay = (get_peer_stats().latency_percentile(current, 0.95, func=func)
+                 or DEFAULT_HEDGE_DELAY)
+        done, _ = wait(running, timeout=delay if candidates else None,
+                       return_when=FIRST_COMPLETED)
+        for future in done:
+            target = running.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                last_error = e
+                logging.warning(f"⚠️ فشل الطلب المتحوّط على {target}: {e}")
+                continue
+            for loser, name in running.items():
+                loser.cancel()
+                logging.info(f"✂️ إلغاء النسخة الخاسرة على {name}")
+            return target, result, stats_by_target.get(target, {})
+        if candidates and (not done or not running):
+            previous = current
+            current = launch()
+            logging.info(f"🛡️ تحوّط: {previous} تجاوز {delay:.2f}s أو فشل - نسخة إلى {current}")
+    raise ConnectionError(f"فشلت كل النسخ المتحوّطة: {last_error}")
+
 def estimate_complexity(func, args, kwargs):
-    """تقدير تعقيد المهمة"""
-    if func.__name__ == "matrix_multiply":
-        return args[0] ** 2
-    elif func.__name__ == "prime_calculation":
-        return args[0] / 100
-    elif func.__name__ == "data_processing":
-        return args[0] / 10
-    elif func.__name__ == "image_processing_emulation":
-        return args[0] * 5
-    return 1  # قيمة افتراضية
-
-def offload(func):
-    """ديكوراتور لتوزيع المهام"""
+    """تقدير تعقيد المهمة من دالة cost المعلنة في task_registry
+
+    (قاعدة احتياطية حتى يجمع نموذج التكلفة عينات كافية)
+    """
+    return task_complexity(func, args, kwargs, default=1)
+
+def offload(func=None, *, hedge=None, cache=None, cache_version=None, share=None, batch=None):
+    """ديكوراتور لتوزيع المهام
+
+    hedge و cache و batch تؤخذ افتراضياً من خصائص المهمة المعلنة بـ @task
+    (idempotent و cacheable و batchable) إن سبقت offload، والقيمة الصريحة تتقدّم.
+    hedge=True تعلن أن المهمة عديمة الأثر الجانبي (idempotent) فيُسمح بإرسالها
+    متحوّطاً إلى أكثر من جهاز (انظر hedged_offload).
+    cache=True (أو شرط على الوسائط) تعلن أن المهمة حتمية فتُخدم الاستدعاءات
+    المتكررة من memo_cache قبل أي قرار توزيع (انظر memo_cache.memoize).
+    share=True تدمج الاستدعاءات المتطابقة المتزامنة في تنفيذ واحد (انظر
+    single_flight)؛ افتراضياً من deterministic المعلنة وإلا تتبع cache، فلا
+    تُدمج المهام ذات النتائج العشوائية أو الأثر الجانبي.
+    batch=True للمهام الصغيرة: الاستدعاءات البعيدة لنفس الجهاز تُجمَّع في طلب
+    /run_batch واحد (انظر micro_batcher)؛ لا يُجمع مع hedge.
+
+    الدالة المغلّفة تعيد نتيجة المهمة نفسها أياً كان مسار التنفيذ (محلياً أو
+    بعيداً أو متحوّطاً أو في دفعة)، لا رد /run المغلِّف لها.
+    """
+    if func is None:
+        return lambda f: offload(f, hedge=hedge, cache=cache, cache_version=cache_version,
+                                 share=share, batch=batch)
+    declared = getattr(func, "task_spec", None)
+    if declared is not None:
+        batch = declared.batchable if batch is None else batch
+        hedge = declared.idempotent and not batch if hedge is None else hedge
+        cache = declared.cacheable if cache is None else cache
+        if share is None and declared.deterministic is not None:
+            share = declared.deterministic
+    if share is None:
+        share = cache
+
     @wraps(func)
     def wrapper(*args, **kwargs):
-        cpu = psutil.cpu_percent(interval=0.5) / 100.0
-        mem = psutil.virtual_memory().available / (1024**2)
+        load = current_load()
+        cpu = load.cpu_ewma
+        mem = load.mem_available_mb
+        model = get_cost_model()
+        prediction = model.predict(func.__name__, args, kwargs)
+        spec = get_task_spec(func)
         complexity = estimate_complexity(func, args, kwargs)
+        response_bytes = spec.response_bytes(args, kwargs) if spec else None
+
+        logging.info(f"حمل النظام - CPU: {cpu:.2f}, الذاكرة: {mem:.1f}MB, تعقيد المهمة: {complexity}, "
+                     f"المتوقع محلياً: {prediction.local}, بعيداً: {prediction.remote}")
 
-        logging.info(f"حمل النظام - CPU: {cpu:.2f}, الذاكرة: {mem:.1f}MB, تعقيد المهمة: {complexity}")
+        payload = {
+            "func": func.__name__,
+            "args": args,
+            "kwargs": kwargs,
+            "complexity": complexity
+        }
+        peers = ranked_peers()
+        # القاعدة القديمة تُستعمل فقط إن لم يملك نموذج التكلفة توقعاً بعد
+        decision = decide(func.__name__, prediction, peers, cpu,
+                          wire_format.estimated_size(payload),
+                          fallback_remote=complexity > 50 or cpu > MAX_CPU,
+                          response_bytes=response_bytes)
 
-        if complexity > 50 or cpu > MAX_CPU:
+        if decision.target is not None:
+            selected_peer = decision.target
             try:
-                peers = discover_peers()
-                if peers:
-                    payload = {
-                        "func": func.__name__,
-                        "args": args,
-                        "kwargs": kwargs,
-                        "complexity": complexity
-                    }
-                    selected_peer = random.choice(peers)
-                    logging.info(f"إرسال المهمة إلى {selected_peer}")
-                    return try_offload(selected_peer, payload)
+                logging.info(f"إرسال المهمة إلى {selected_peer} ({decision.reason})")
+                start = time.perf_counter()
+                if hedge:
+                    backups = sorted((p for p in decision.estimates if p != "local"),
+                                     key=decision.estimates.get) or peers
+                    ordered = [selected_peer] + [p for p in backups if p != selected_peer]
+                    selected_peer, reply, stats = hedged_offload(
+                        ordered, payload, local_fn=lambda: run_local(func, args, kwargs),
+                        expected=prediction.remote, response_bytes=response_bytes)
+                    if selected_peer == "local":
+                        log_outcome(decision, time.perf_counter() - start, target="local")
+                        return reply
+                else:
+                    stats = {}
+                    send = batched_offload if batch else try_offload
+                    reply = send(selected_peer, payload, stats=stats, expected=prediction.remote,
+                                 response_bytes=response_bytes)
+                elapsed = time.perf_counter() - start
+                # زمن الفائز المتحوّط من إطلاقه هو، لا يشمل انتظار التحوّط
+                compute = get_peer_stats().observe_reply(selected_peer,
+                                                         stats.get("elapsed", elapsed),
+                                                         stats.get("bytes"), reply)
+                model.record(func.__name__, args, kwargs, remote_runtime=compute,
+                             transfer_bytes=stats.get("bytes"))
+                log_outcome(decision, elapsed)
+                return reply.get("result", reply) if isinstance(reply, dict) else reply
             except Exception as e:
                 logging.error(f"خطأ في التوزيع: {str(e)}")
+                log_outcome(decision, None, ok=False)
 
         logging.info("تنفيذ المهمة محلياً")
-        return func(*args, **kwargs)
+        start = time.perf_counter()
+        result = run_local(func, args, kwargs)
+        if decision.target is None:
+            log_outcome(decision, time.perf_counter() - start)
+        return result
+    wrapper.hedge_safe = bool(hedge)
+    if share:
+        wrapper = coalesce(wrapper, when=share if callable(share) else None)
+    if cache:
+        wrapper = memoize(func, version=cache_version,
+                          when=cache if callable(cache) else None, compute=wrapper)
+        wrapper.hedge_safe = bool(hedge)
     return wrapper
 
 # المهام القابلة للتوزيع:
 
-@offload
-def matrix_multiply(size):
-    """ضرب مصفوفتين عشوائيتين بالحجم"""
+@offload(hedge=True, cache=seeded_inputs)
+def matrix_multiply(size, A=None, B=None):
+    """ضرب مصفوفتين بالحجم (عشوائيتين إن لم تُمرَّرا)
+
+    A و B قد تكونان مصفوفتين أو GeneratorSpec يولّدها الجهاز المنفِّذ محلياً.
+    """
     import numpy as np
-    A = np.random.rand(size, size)
-    B = np.random.rand(size, size)
-    return np.dot(A, B).tolist()
+    from generator_spec import materialize
+    A = materialize(A) if A is not None else np.random.rand(size, size)
+    B = materialize(B) if B is not None else np.random.rand(size, size)
+    return np.dot(A, B)
 
-@offload
+def distributed_matrix_multiply(size, out=None, on_block=None):
+    """ضرب مصفوفتين عشوائيتين بتقسيمهما إلى كتل موزّعة على الأقران
+
+    A و B وصفا GeneratorSpec ببلاطات: لا يولّدهما العميل، ويولّد كل جهاز
+    شريحتيه فقط. تعود كتل C تباعاً إلى out (مثل np.memmap) أو إلى
+    on_block(r0, r1, c0, c1, block)، وإلا تُجمع في مصفوفة C في الذاكرة.
+    """
+    import secrets
+    from generator_spec import GeneratorSpec
+    from distributed_gemm import distributed_matmul, SPEC_BLOCK
+    A = GeneratorSpec(secrets.randbits(63), (size, size), block=SPEC_BLOCK)
+    B = GeneratorSpec(secrets.randbits(63), (size, size), block=SPEC_BLOCK)
+    return distributed_matmul(A, B, peers=ranked_peers(), out=out, on_block=on_block)
+
+PRIMES_LIST_LIMIT = 1_000_000  # فوق هذا الحد يُعاد العدد فقط (primes = None)
+
+@memoize
 def prime_calculation(n):
-    """حساب الأعداد الأولية"""
-    primes = []
-    for num in range(2, n + 1):
-        is_prime = True
-        for i in range(2, int(math.sqrt(num)) + 1):
-            if num % i == 0:
-                is_prime = False
-                break
-        if is_prime:
-            primes.append(num)
-    return {"primes_count": len(primes), "primes": primes}
+    """حساب الأعداد الأولية بغربال مقطّع موزّع على الأقران والأنوية المحلية
 
-@offload
+    يعيد دائماً primes_count و primes و truncated؛ فوق PRIMES_LIST_LIMIT تكون
+    primes = None و truncated = True (القائمة أكبر من أن تُعاد).
+    """
+    from prime_sieve import distributed_prime_calculation, primes_up_to
+    if n <= PRIMES_LIST_LIMIT:
+        primes = primes_up_to(n).tolist()
+        return {"primes_count": len(primes), "primes": primes, "truncated": False}
+    result = distributed_prime_calculation(n, peers=ranked_peers())
+    return {"primes_count": result["count"], "primes": None, "truncated": True}
+
+@offload(batch=True)
 def data_processing(data_size):
     """معالجة بيانات كبيرة"""
     processed_data = []
@@ -193,6 +393,7 @@ def data_processing(data_size):
     return {"processed_items": len(processed_data)}
 
 @offload
+@task(cost=lambda iterations: iterations * 5)
 def image_processing_emulation(iterations):
     """محاكاة معالجة الصور"""
     results = []
@@ -0,0 +1,178 @@
+# peer_directory.py
+"""
+دليل أقران offload: عناوين الأقران المتوافقة مع المشروع (بلا انتظار).
+
+بدلاً من إنشاء Zeroconf جديد والنوم 1.5 ثانية وفحص /project_info لكل مرشح
+في كل استدعاء، يحتفظ الدليل بجدول أقران آمن للخيوط مع مدة صلاحية (TTL)
+لكل جهاز ونتيجة توافق مخزّنة، فيقرأ ديكوراتور offload القائمة فوراً.
+
+لا يتصفح الدليل mDNS بنفسه: يشترك في جدول العقد المشترك (peer_table) الذي
+يقرؤه DistributedExecutor أيضاً، فمتصفح واحد وذاكرة واحدة لعقد _tasknode
+وحملها الحي من TXT. يضيف الدليل فوقه فحص التوافق والأقران الخارجيين
+(extra_sources، مثل peer_discovery).
+"""
+
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+PEER_TTL = 60.0          # مدة صلاحية الجهاز بعد آخر إعلان (ثانية)
+VERDICT_TTL = 300.0      # مدة صلاحية نتيجة فحص التوافق (ثانية)
+REFRESH_INTERVAL = 15.0  # دورة تنظيف الجدول وإعادة فحص الأقران
+
+
+class PeerDirectory:
+    """أقران offload المتوافقون، يغذّيهم جدول العقد المشترك"""
+
+    def __init__(self, table=None, peer_ttl=PEER_TTL, verdict_ttl=VERDICT_TTL,
+                 verifier=None, extra_sources=None):
+        self._table = table
+        self.peer_ttl = peer_ttl
+        self.verdict_ttl = verdict_ttl
+        self._verifier = verifier
+        self._extra_sources = extra_sources
+        self._lock = threading.Lock()
+        # address -> {"expires": float, "verified": bool|None, "verified_at": float,
+        #             "load": float|None}
+        self._entries = {}
+        self._snapshot = ()
+        self._started = False
+        self._verify_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="peer-verify")
+        self._pending = set()
+        self._stop = threading.Event()
+
+    # ------------------------------------------------------------
+    # دورة الحياة
+    # ------------------------------------------------------------
+    def start(self):
+        """الاشتراك في جدول العقد وتشغيل حلقة التنظيف (مرة واحدة فقط)"""
+        if self._started:
+            return self
+        self._started = True
+        if self._table is None:
+            from peer_table import get_peer_table
+            self._table = get_peer_table()
+        self._table.subscribe(self._on_table_event)
+        for record in self._table.peers():
+            self._on_table_event("add", record)
+        threading.Thread(target=self._maintenance_loop, daemon=True,
+                         name="peer-directory").start()
+        logging.info(f"📒 دليل الأقران يعمل على جدول العقد ({self._table.service_type})")
+        return self
+
+    def close(self):
+        self._stop.set()
+        if self._table is not None:
+            self._table.unsubscribe(self._on_table_event)
+        self._verify_pool.shutdown(wait=False)
+
+    def _on_table_event(self, event, record):
+        """أحداث peer_table: العقدة تبقى ما بقي سجلها (الجدول يتابع النبض والمغادرة)"""
+        if event == "remove":
+            self.forget(record.address)
+        else:
+            self.touch(record.address, ttl=float("inf"), load=record.load)
+
+    # ------------------------------------------------------------
+    # تحديث الجدول
+    # ------------------------------------------------------------
+    def touch(self, address, ttl=None, load=None):
+        """تسجيل ظهور جهاز وتمديد صلاحيته، مع جدولة فحص التوافق عند الحاجة"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(address)
+            is_new = entry is None
+            if is_new:
+                entry = {"expires": 0.0, "verified": None, "verified_at": 0.0, "load": None}
+                self._entries[address] = entry
+            entry["expires"] = now + (ttl or self.peer_ttl)
+            if load is not None:
+                entry["load"] = load
+            stale = entry["verified"] is None or now - entry["verified_at"] > self.verdict_ttl
+            if entry["verified"]:
+                self._rebuild_snapshot()
+        if is_new:
+            logging.info(f"🔗 جهاز مكتشف: {address}")
+        if stale:
+            self._schedule_verify(address)
+
+    def forget(self, address):
+        with self._lock:
+            removed = self._entries.pop(address, None)
+            if removed is not None:
+                self._rebuild_snapshot()
+        if removed is not None:
+            logging.info(f"👋 غادر الجهاز: {address}")
+
+    def _schedule_verify(self, address):
+        if self._verifier is None:
+            with self._lock:
+                entry = self._entries.get(address)
+                if entry is not None:
+                    entry["verified"], entry["verified_at"] = True, time.time()
+                    self._rebuild_snapshot()
+            return
+        with self._lock:
+            if address in self._pending:
+                return
+            self._pending.add(address)
+        try:
+            self._verify_pool.submit(self._verify, address)
+        except RuntimeError:  # المجمع أُغلق
+            with self._lock:
+                self._pending.discard(address)
+
+    def _verify(self, address):
+        try:
+            verdict = bool(self._verifier(address))
+        except Exception:
+            verdict = False
+        with self._lock:
+            self._pending.discard(address)
+            entry = self._entries.get(address)
+            if entry is not None:
+                entry["verified"], entry["verified_at"] = verdict, time.time()
+                self._rebuild_snapshot()
+
+    def _rebuild_snapshot(self):
+        """يُستدعى والقفل مأخوذ: لقطة ثابتة تُقرأ بلا قفل"""
+        self._snapshot = tuple(
+            (addr, e["expires"]) for addr, e in self._entries.items() if e["verified"]
+        )
+
+    def _maintenance_loop(self):
+        while not self._stop.wait(REFRESH_INTERVAL):
+            if self._extra_sources is not None:
+                try:
+                    for address in self._extra_sources():
+                        self.touch(address)
+                except Exception as e:
+                    logging.debug(f"تعذّر قراءة مصادر الأقران الإضافية: {e}")
+            now = time.time()
+            to_verify = []
+            with self._lock:
+                for addr in [a for a, e in self._entries.items() if e["expires"] <= now]:
+                    del self._entries[addr]
+                for addr, e in self._entries.items():
+                    if now - e["verified_at"] > self.verdict_ttl:
+                        to_verify.append(addr)
+                self._rebuild_snapshot()
+            for addr in to_verify:
+                self._schedule_verify(addr)
+
+    # ------------------------------------------------------------
+    # القراءة
+    # ------------------------------------------------------------
+    def peers(self):
+        """قائمة الأقران المتوافقة الصالحة حالياً (قراءة فورية بلا شبكة)"""
+        now = time.time()
+        return [addr for addr, expires in self._snapshot if expires > now]
+
+    def load_of(self, address):
+        """الحمل المعلن في TXT (0-1)، أو None لجهاز خارجي لم يعلنه"""
+        entry = self._entries.get(address)
+        return entry["load"] if entry is not None else None
+
+    def __len__(self):
+        return len(self._snapshot)
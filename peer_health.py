@@ -0,0 +1,167 @@
+# peer_health.py
+"""
+متتبّع صحة الأقران المشترك: قاطع دائرة (circuit breaker) لكل جهاز ومهلات
+متكيّفة بدلاً من الأرقام الثابتة (10 و 12 و 15 ثانية).
+
+حالات القاطع:
+    closed     الطلبات تمر؛ FAILURE_THRESHOLD إخفاقات اتصال متتالية تفتحه
+    open       الجهاز يُتخطّى فوراً حتى تنقضي مهلة التبريد
+    half_open  بعد التبريد يُسمح بطلب تجريبي واحد: نجاحه يغلق القاطع،
+               وفشله يعيد فتحه بمهلة تبريد مضاعفة (حتى MAX_COOLDOWN)
+
+المهلة لكل (جهاز، دالة) = RTT + TIMEOUT_MULTIPLIER × max(مئين 99 لأزمنة
+الدالة على الجهاز، الزمن البعيد المتوقع من نموذج التكلفة + زمن نقل بايتات
+الطلب والرد بعرض نطاق الجهاز)، محصورة بين MIN_TIMEOUT و MAX_TIMEOUT؛ وقبل
+توفر عينات تُستعمل المهلة الافتراضية للمستدعي (أو زمن النقل إن زاد عنها).
+
+انتهاء مهلة الرد لا يُحتسب إخفاقاً للقاطع ما لم تكن للدالة عينات أزمنة على
+الجهاز: المهلة قبلها تخمين، ولا دليل على أن الجهاز معطّل.
+"""
+
+import os
+import time
+import logging
+import threading
+
+import requests
+
+from peer_stats import get_peer_stats, peer_key
+
+FAILURE_THRESHOLD = int(os.getenv("DTS_BREAKER_FAILURES", "3"))
+BASE_COOLDOWN = float(os.getenv("DTS_BREAKER_COOLDOWN", "5.0"))     # ثانية
+MAX_COOLDOWN = float(os.getenv("DTS_BREAKER_MAX_COOLDOWN", "120.0"))
+TIMEOUT_MULTIPLIER = 2.0
+MIN_TIMEOUT = 1.0
+MAX_TIMEOUT = float(os.getenv("DTS_MAX_TIMEOUT", "300.0"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class _Breaker:
+    __slots__ = ("state", "failures", "opened_at", "cooldown", "probing")
+
+    def __init__(self):
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.cooldown = BASE_COOLDOWN
+        self.probing = False
+
+
+class PeerHealth:
+    """قواطع الدائرة لكل جهاز (آمنة للخيوط)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._breakers = {}
+
+    def _breaker(self, peer):
+        key = peer_key(peer)
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = self._breakers[key] = _Breaker()
+        return breaker
+
+    def state(self, peer):
+        with self._lock:
+            breaker = self._breakers.get(peer_key(peer))
+            return breaker.state if breaker is not None else CLOSED
+
+    def available(self, peer):
+        """هل يستحق الجهاز المحاولة الآن؟ (فحص بلا أثر، لترشيح القوائم)"""
+        with self._lock:
+            breaker = self._breakers.get(peer_key(peer))
+            if breaker is None or breaker.state == CLOSED:
+                return True
+            if breaker.state == OPEN:
+                return time.time() - breaker.opened_at >= breaker.cooldown
+            return not breaker.probing
+
+    def allow(self, peer):
+        """حجز إذن طلب فعلي؛ في half_open يُمنح لطلب تجريبي واحد فقط"""
+        with self._lock:
+            breaker = self._breaker(peer)
+            if breaker.state == CLOSED:
+                return True
+            if breaker.state == OPEN:
+                if time.time() - breaker.opened_at < breaker.cooldown:
+                    return False
+                breaker.state = HALF_OPEN
+                breaker.probing = False
+            if breaker.probing:
+                return False
+            breaker.probing = True
+            return True
+
+    def record_success(self, peer):
+        with self._lock:
+            breaker = self._breaker(peer)
+            if breaker.state != CLOSED:
+                logging.info(f"✅ عاد الجهاز {peer_key(peer)} للخدمة")
+            breaker.state = CLOSED
+            breaker.failures = 0
+            breaker.cooldown = BASE_COOLDOWN
+            breaker.probing = False
+
+    def record_failure(self, peer):
+        with self._lock:
+            breaker = self._breaker(peer)
+            breaker.failures += 1
+            if breaker.state == HALF_OPEN:
+                breaker.cooldown = min(breaker.cooldown * 2, MAX_COOLDOWN)
+            elif breaker.state == OPEN or breaker.failures < FAILURE_THRESHOLD:
+                return
+            breaker.state = OPEN
+            breaker.opened_at = time.time()
+            breaker.probing = False
+            cooldown = breaker.cooldown
+        logging.warning(f"⛔ قاطع الدائرة مفتوح للجهاز {peer_key(peer)} لمدة {cooldown:.0f}s")
+
+    def record_timeout(self, peer, func=None):
+        """انتهت مهلة الرد: إخفاق فقط إن كانت المهلة مبنية على أزمنة مقاسة للدالة"""
+        if get_peer_stats().latency_percentile(peer, 0.99, func=func) is not None:
+            self.record_failure(peer)
+            return
+        logging.debug(f"مهلة {func} على {peer_key(peer)} بلا عينات أزمنة - لا تُحتسب إخفاقاً")
+        with self._lock:
+            breaker = self._breakers.get(peer_key(peer))
+            if breaker is not None:
+                breaker.probing = False   # الطلب التجريبي انتهى دون حكم؛ يُسمح بغيره
+
+    def record_error(self, peer, error, func=None):
+        """خطأ شبكة من requests: انتهاء مهلة الرد عبر record_timeout، وغيره إخفاق اتصال"""
+        if isinstance(error, requests.Timeout) and not isinstance(error, requests.ConnectionError):
+            self.record_timeout(peer, func)
+        else:
+            self.record_failure(peer)
+
+    def healthy(self, peers):
+        """الأقران الذين يستحقون المحاولة الآن (بترتيبهم)"""
+        return [p for p in peers if self.available(p)]
+
+    # ------------------------------------------------------------
+    # المهلات المتكيّفة
+    # ------------------------------------------------------------
+    def timeout_for(self, peer, func=None, expected=None, default=10.0, nbytes=0):
+        """مهلة طلب مهمة func على الجهاز (انظر رأس الوحدة)
+
+        expected: الزمن البعيد المتوقع من نموذج التكلفة لهذه الوسائط (زمن التنفيذ
+        وحده)، إن وُجد. nbytes: حجم الطلب + الرد المتوقع بالبايت.
+        """
+        stats = get_peer_stats()
+        link = stats.link(peer)
+        transfer = (nbytes or 0) / link.bandwidth
+        p99 = stats.latency_percentile(peer, 0.99, func=func)
+        if p99 is None and expected is None:
+            return min(max(default, link.rtt + TIMEOUT_MULTIPLIER * transfer), MAX_TIMEOUT)
+        budget = max(p99 or 0.0, (expected or 0.0) + transfer)
+        timeout = link.rtt + TIMEOUT_MULTIPLIER * budget
+        return min(max(timeout, MIN_TIMEOUT), MAX_TIMEOUT)
+
+
+_health = PeerHealth()
+
+
+def get_peer_health():
+    """متتبّع الصحة المشترك للعملية"""
+    return _health
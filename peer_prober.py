@@ -0,0 +1,155 @@
+# peer_prober.py
+"""
+فاحص حمل الأقران في الخلفية.
+
+بدلاً من طلب /cpu من كل جهاز بالتتابع (مهلة ثانيتين لكل منها) عند كل اختيار،
+يفحص خيط خلفي كل الأقران بالتوازي كل PROBE_INTERVAL، ويحفظ لكل جهاز متوسطاً
+أسّياً للحمل، ويغذّي peer_stats بزمن الذهاب والعودة وعمق الطابور. حالة
+الاتصال بالإنترنت تُفحص كل CONNECTIVITY_INTERVAL وتُخزَّن، فيصبح الاختيار
+قراءة من الذاكرة فقط.
+"""
+
+import os
+import time
+import socket
+import logging
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import http_pool
+from peer_stats import get_peer_stats
+from peer_health import get_peer_health, CLOSED
+
+PROBE_INTERVAL = float(os.getenv("DTS_PROBE_INTERVAL", "2.0"))          # ثانية بين جولات الفحص
+PROBE_TIMEOUT = float(os.getenv("DTS_PROBE_TIMEOUT", "1.5"))
+CONNECTIVITY_INTERVAL = float(os.getenv("DTS_CONNECTIVITY_INTERVAL", "30.0"))
+STALE_AFTER = 3            # جولات فاشلة متتالية قبل استبعاد الجهاز
+EWMA_ALPHA = 0.3
+
+PeerLoad = namedtuple("PeerLoad", ["load", "rtt", "ok", "failures", "updated"])
+
+
+def probe_url(peer):
+    """عنوان /cpu لجهاز بصيغة 'http://ip:port/run' أو 'ip:port'"""
+    if "://" not in peer:
+        peer = f"http://{peer}"
+    base = peer[:-len("/run")] if peer.endswith("/run") else peer.rstrip("/")
+    return f"{base}/cpu"
+
+
+class PeerProber:
+    """جولات فحص متوازية لـ /cpu مع ذاكرة مؤقتة لحمل كل جهاز"""
+
+    def __init__(self, peers_source, interval=PROBE_INTERVAL, timeout=PROBE_TIMEOUT,
+                 connectivity_interval=CONNECTIVITY_INTERVAL, max_workers=16):
+        self._peers_source = peers_source
+        self.interval = interval
+        self.timeout = timeout
+        self.connectivity_interval = connectivity_interval
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="peer-probe")
+        self._lock = threading.Lock()
+        self._loads = {}             # peer -> PeerLoad
+        self._internet = False
+        self._internet_checked = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True, name="peer-prober")
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._pool.shutdown(wait=False)
+
+    # ------------------------------------------------------------
+    # الفحص
+    # ------------------------------------------------------------
+    def _run(self):
+        while True:
+            try:
+                self.probe_all()
+                if time.time() - self._internet_checked >= self.connectivity_interval:
+                    self._check_internet()
+            except Exception as e:
+                logging.debug(f"فشل جولة فحص الأقران: {e}")
+            if self._stop.wait(self.interval):
+                return
+
+    def probe_all(self):
+        """جولة واحدة: فحص كل الأقران بالتوازي وانتظار انتهائها"""
+        peers = list(self._peers_source())
+        for future in [self._pool.submit(self._probe, p) for p in peers]:
+            future.result()
+        with self._lock:
+            for gone in set(self._loads) - set(peers):
+                del self._loads[gone]
+
+    def _probe(self, peer):
+        start = time.perf_counter()
+        try:
+            data = http_pool.get(probe_url(peer), timeout=self.timeout).json()
+            rtt = time.perf_counter() - start
+        except Exception as e:
+            # قاطع الدائرة لتعذّر الوصول فقط؛ رد لا يُقرأ (مثل 404 لعقدة بلا /cpu) ليس عطلاً
+            if isinstance(e, (requests.ConnectionError, requests.Timeout)):
+                get_peer_health().record_failure(peer)
+            else:
+                logging.debug(f"رد فحص غير صالح من {peer}: {e}")
+            with self._lock:
+                old = self._loads.get(peer)
+                if old is not None:
+                    self._loads[peer] = old._replace(ok=False, failures=old.failures + 1)
+            return
+        stats = get_peer_stats()
+        stats.observe_rtt(peer, rtt)
+        if get_peer_health().state(peer) != CLOSED:
+            get_peer_health().record_success(peer)
+        if data.get("queue") is not None:
+            stats.observe_queue(peer, data["queue"])
+        load = float(data.get("ewma", data.get("usage", 0.0))) / 100.0
+        with self._lock:
+            old = self._loads.get(peer)
+            if old is not None and old.ok:
+                load = EWMA_ALPHA * load + (1 - EWMA_ALPHA) * old.load
+                rtt = EWMA_ALPHA * rtt + (1 - EWMA_ALPHA) * old.rtt
+            self._loads[peer] = PeerLoad(load, rtt, True, 0, time.time())
+
+    def _check_internet(self):
+        try:
+            socket.create_connection(("8.8.8.8", 53), timeout=3).close()
+            self._internet = True
+        except OSError:
+            self._internet = False
+        self._internet_checked = time.time()
+
+    # ------------------------------------------------------------
+    # القراءة (من الذاكرة فقط)
+    # ------------------------------------------------------------
+    def internet_available(self):
+        """آخر حالة اتصال مُقاسة"""
+        return self._internet
+
+    def load(self, peer):
+        """PeerLoad للجهاز، أو None إن لم يُفحص بعد أو تكرر فشله"""
+        with self._lock:
+            entry = self._loads.get(peer)
+        if entry is None or entry.failures >= STALE_AFTER:
+            return None
+        return entry
+
+    def best(self, peers):
+        """الجهاز الأقل حملاً من peers بين من أجاب فحصهم مؤخراً، أو None"""
+        best = None
+        for peer in peers:
+            entry = self.load(peer)   # فشل عابر لا يُسقط الجهاز قبل STALE_AFTER جولات
+            if entry is None:
+                continue
+            if best is None or entry.load < best[1]:
+                best = (peer, entry.load)
+        return best[0] if best else None
@@ -1,32 +1,9 @@
 import socket
 import time
-from zeroconf import Zeroconf, ServiceBrowser, ServiceInfo
-
-class Listener:
-    def __init__(self):
-        self.peers = []
-
-    def add_service(self, zc, type_, name):
-        info = zc.get_service_info(type_, name)
-        if info:
-            ip = socket.inet_ntoa(info.addresses[0])
-            peer_data = {
-                'ip': ip,
-                'port': info.port,
-                'load': float(info.properties.get(b'load', 0)),
-                'node_id': info.properties.get(b'node_id', b'unknown').decode(),
-                'last_seen': time.time()
-            }
-            if peer_data not in self.peers:
-                self.peers.append(peer_data)
-
-    def update_service(self, zc, type_, name):
-        """مطلوب بواسطة Zeroconf"""
-        self.add_service(zc, type_, name)
-
-    def remove_service(self, zc, type_, name):
-        """اختياري"""
-        pass
+from zeroconf import Zeroconf, ServiceInfo
+from peer_table import get_peer_table
+from load_advertiser import LoadAdvertiser
+from task_registry import node_properties
 
 def register_service(ip: str, port: int, load: float = 0.0):
     zc = Zeroconf()
@@ -38,20 +15,21 @@ def register_service(ip: str, port: int, load: float = 0.0):
         port=port,
         properties={
             b'load': str(load).encode(),
-            b'node_id': socket.gethostname().encode()
+            b'node_id': socket.gethostname().encode(),
+            **node_properties(),   # cores و caps لمطابقة متطلبات المهام (task_registry)
         }
     )
     zc.register_service(service_info)
+    zc.load_advertiser = LoadAdvertiser(zc, service_info).start()  # إعلان الحمل الحي
     print(f"✅ Service registered: {service_name} @ {ip}:{port}")
     return zc  # أبقِ المرجع حياً
 
 def discover_peers(timeout=2):
-    zc = Zeroconf()
-    listener = Listener()
-    ServiceBrowser(zc, "_tasknode._tcp.local.", listener)
-    time.sleep(timeout)
-    zc.close()
-    return listener.peers
+    """العقد الحالية من جدول العقد المشترك (لا ينتظر إلا إن كان فارغاً بعد)"""
+    table = get_peer_table()
+    if not len(table):
+        table.wait_ready(timeout)
+    return [record.as_dict() for record in table.peers()]
 
 if __name__ == "__main__":
     local_ip = socket.gethostbyname(socket.gethostname())
@@ -0,0 +1,107 @@
+# peer_selection.py
+"""
+سياسات اختيار الجهاز المشتركة بين offload_lib و distributed_executor و
+load_balancer.
+
+اختيار "الأقل حملاً" من قيمة قديمة يدفع كل العملاء إلى الجهاز نفسه في اللحظة
+نفسها، واختيار عشوائي بحت يتجاهل الأجهزة البطيئة. السياستان هنا تعتمدان على
+ما يعرفه العميل محلياً من peer_stats: طلباته الجارية على كل جهاز
+(outstanding) ومتوسطاً أسّياً لزمن طلباته.
+
+    p2c  (power of two choices): جهازان عشوائيان ويُختار الأقل كلفة
+    wlor (weighted least outstanding requests): الأقل كلفة من الكل
+
+الكلفة = (الطلبات الجارية + 1) × زمن الطلب المتوسط / حصة المعالج الحرة.
+تُختار السياسة الافتراضية بـ DTS_PEER_POLICY.
+"""
+
+import os
+import random
+
+from peer_stats import get_peer_stats
+
+DEFAULT_POLICY = os.getenv("DTS_PEER_POLICY", "p2c")
+MIN_FREE_SHARE = 0.05   # أدنى حصة معالج حرة لجهاز محمّل بالكامل
+
+
+class SelectionPolicy:
+    """الأساس: حساب الكلفة وترتيب المرشحين"""
+
+    name = "base"
+
+    def cost(self, peer, load_of=None, default_latency=1.0):
+        stats = get_peer_stats()
+        latency = stats.latency(peer)
+        if latency is None:
+            latency = default_latency
+        load = load_of(peer) if load_of is not None else None
+        free = max(1.0 - load, MIN_FREE_SHARE) if load is not None else 1.0
+        return (stats.outstanding(peer) + 1) * latency / free
+
+    @staticmethod
+    def _default_latency(peers):
+        # الجهاز غير المقاس يُعامل كمتوسط المقاسين: لا يُفضَّل ولا يُعاقب
+        stats = get_peer_stats()
+        known = [l for l in (stats.latency(p) for p in peers) if l is not None]
+        return sum(known) / len(known) if known else 1.0
+
+    def choose(self, peers, load_of=None):
+        """الجهاز المختار أو None إن كانت القائمة فارغة"""
+        ordered = self.order(peers, load_of)
+        return ordered[0] if ordered else None
+
+    def order(self, peers, load_of=None):
+        """كل المرشحين مرتبين: المختار أولاً ثم البدائل"""
+        raise NotImplementedError
+
+    def order_by_tier(self, peers, load_of=None):
+        """فئة القرب الأقرب أولاً (peer_stats.group_by_tier)، والسياسة داخل كل فئة"""
+        return [p for group in get_peer_stats().group_by_tier(peers)
+                for p in self.order(group, load_of)]
+
+
+class PowerOfTwoChoices(SelectionPolicy):
+    """جهازان عشوائيان والأقل كلفة منهما؛ البقية بترتيب عشوائي"""
+
+    name = "p2c"
+
+    def order(self, peers, load_of=None):
+        peers = list(peers)
+        random.shuffle(peers)
+        if len(peers) >= 2:
+            default = self._default_latency(peers[:2])
+            a, b = (self.cost(p, load_of, default) for p in peers[:2])
+            if b < a:
+                peers[0], peers[1] = peers[1], peers[0]
+        return peers
+
+
+class WeightedLeastOutstanding(SelectionPolicy):
+    """كل المرشحين مرتبين بالكلفة (التعادل يُكسر عشوائياً)"""
+
+    name = "wlor"
+
+    def order(self, peers, load_of=None):
+        peers = list(peers)
+        random.shuffle(peers)
+        default = self._default_latency(peers)
+        return sorted(peers, key=lambda p: self.cost(p, load_of, default))
+
+
+POLICIES = {cls.name: cls for cls in (PowerOfTwoChoices, WeightedLeastOutstanding)}
+
+_policy = None
+
+
+def get_policy():
+    """السياسة الافتراضية للعملية (DTS_PEER_POLICY)"""
+    global _policy
+    if _policy is None:
+        _policy = POLICIES.get(DEFAULT_POLICY, PowerOfTwoChoices)()
+    return _policy
+
+
+def set_policy(policy):
+    """استبدال السياسة الافتراضية (اسم أو كائن SelectionPolicy)"""
+    global _policy
+    _policy = POLICIES[policy]() if isinstance(policy, str) else policy
@@ -0,0 +1,228 @@
+# peer_stats.py
+"""
+إحصاءات الاتصال لكل جهاز كما يقيسها العميل: زمن الذهاب والعودة (RTT)،
+عرض النطاق الفعلي، وعمق طابور المهام الذي يعلنه الجهاز.
+
+تُغذّى من كل طلب صادر (try_offload و execute_remotely و الفحوص)، ويقرأها
+قرار التوزيع لتقدير زمن النقل والانتظار لكل جهاز مرشح. كما يُحصى فيها عدد
+طلبات هذا العميل الجارية على كل جهاز (track) لسياسات الاختيار (peer_selection).
+"""
+
+import os
+import time
+import ipaddress
+import threading
+from collections import deque, namedtuple
+from contextlib import contextmanager
+
+DEFAULT_RTT = 0.05               # ثانية، لجهاز لم يُقس بعد
+DEFAULT_BANDWIDTH = 10 * 1024**2  # بايت/ثانية، لجهاز لم يُقس بعد
+EWMA_ALPHA = 0.3
+MIN_BANDWIDTH_BYTES = 64 * 1024  # لا نقيس عرض النطاق من طلبات أصغر من هذا
+LATENCY_WINDOW = 100             # عدد أزمنة الطلبات المحفوظة لحساب المئينات
+MIN_LATENCY_SAMPLES = 5          # أقل عدد عينات قبل الوثوق بالمئين
+REFERENCE_BYTES = 256 * 1024     # حجم الحمولة المرجعي لحساب زمن الشبكة في الفئات
+# حدود فئات زمن الشبكة (ثانية): فئة 0 أسرع من الأول، ... وآخر فئة بعد الأخير
+LATENCY_TIERS = tuple(float(t) for t in
+                      os.getenv("DTS_LATENCY_TIERS", "0.005,0.02,0.08,0.25").split(","))
+
+PeerLink = namedtuple("PeerLink", ["rtt", "bandwidth", "queue_depth", "samples", "updated",
+                                   "outstanding", "latency"])
+
+
+def peer_key(peer):
+    """مفتاح موحّد 'host:port' من 'http://host:port/run' أو 'host:port' أو قاموس"""
+    if isinstance(peer, dict):
+        return f"{peer['ip']}:{peer['port']}"
+    if hasattr(peer, "address"):          # peer_table.PeerRecord
+        return peer.address
+    if "://" in peer:
+        peer = peer.split("://", 1)[1]
+    return peer.split("/", 1)[0]
+
+
+def is_private_ip(ip):
+    """عنوان شبكة خاصة (RFC 1918: 10/8 و 172.16/12 و 192.168/16) أو محلي"""
+    try:
+        addr = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    return addr.is_private or addr.is_loopback or addr.is_link_local
+
+
+def _ewma(old, new):
+    return new if old is None else EWMA_ALPHA * new + (1 - EWMA_ALPHA) * old
+
+
+class _PeerRecord:
+    __slots__ = ("rtt", "bandwidth", "queue_depth", "samples", "updated", "latencies",
+                 "func_latencies", "latency", "outstanding")
+
+    def __init__(self):
+        self.rtt = None
+        self.bandwidth = None
+        self.queue_depth = 0
+        self.samples = 0
+        self.updated = 0.0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.func_latencies = {}  # اسم الدالة -> deque (لمهلات كل دالة)
+        self.latency = None      # متوسط أسّي لزمن طلب المهمة كاملاً
+        self.outstanding = 0     # طلبات هذا العميل الجارية على الجهاز
+
+
+class PeerStatsRegistry:
+    """سجل إحصاءات الأجهزة المشترك (آمن للخيوط)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._peers = {}
+
+    def _record(self, peer):
+        key = peer_key(peer)
+        record = self._peers.get(key)
+        if record is None:
+            record = self._peers[key] = _PeerRecord()
+        return record
+
+    def observe_rtt(self, peer, seconds):
+        """عينة RTT من طلب صغير (فحص صحة، /cpu، /project_info)"""
+        with self._lock:
+            record = self._record(peer)
+            record.rtt = _ewma(record.rtt, seconds)
+            record.samples += 1
+            record.updated = time.time()
+
+    def observe_transfer(self, peer, network_seconds, nbytes):
+        """عينة من طلب مهمة: زمن الشبكة (الإجمالي ناقص زمن التنفيذ) والبايتات"""
+        with self._lock:
+            record = self._record(peer)
+            rtt = record.rtt if record.rtt is not None else DEFAULT_RTT
+            if nbytes and nbytes >= MIN_BANDWIDTH_BYTES:
+                transfer = max(network_seconds - rtt, 1e-3)
+                record.bandwidth = _ewma(record.bandwidth, nbytes / transfer)
+            elif network_seconds > 0:
+                record.rtt = _ewma(record.rtt, network_seconds)
+            record.samples += 1
+            record.updated = time.time()
+
+    def observe_queue(self, peer, depth):
+        with self._lock:
+            record = self._record(peer)
+            record.queue_depth = max(int(depth), 0)
+            record.updated = time.time()
+
+    def observe_latency(self, peer, seconds, func=None):
+        """زمن طلب مهمة كامل كما رآه العميل (للتحوّط وسياسات الاختيار والمهلات)"""
+        with self._lock:
+            record = self._record(peer)
+            record.latencies.append(seconds)
+            record.latency = _ewma(record.latency, seconds)
+            if func is not None:
+                window = record.func_latencies.get(func)
+                if window is None:
+                    window = record.func_latencies[func] = deque(maxlen=LATENCY_WINDOW)
+                window.append(seconds)
+
+    @contextmanager
+    def track(self, peer):
+        """يحيط بطلب صادر إلى الجهاز ليُحتسب ضمن طلباته الجارية"""
+        with self._lock:
+            record = self._record(peer)
+            record.outstanding += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                record.outstanding -= 1
+
+    def outstanding(self, peer):
+        record = self._peers.get(peer_key(peer))
+        return record.outstanding if record is not None else 0
+
+    def latency(self, peer):
+        """المتوسط الأسّي لزمن طلبات الجهاز، أو None إن لم يُقس"""
+        record = self._peers.get(peer_key(peer))
+        return record.latency if record is not None else None
+
+    def latency_percentile(self, peer, q=0.95, func=None):
+        """المئين q لأزمنة طلبات الجهاز (أو طلبات الدالة func عليه)، أو None إن قلّت العينات"""
+        with self._lock:
+            record = self._peers.get(peer_key(peer))
+            if record is None:
+                return None
+            window = record.latencies if func is None else record.func_latencies.get(func, ())
+            if len(window) < MIN_LATENCY_SAMPLES:
+                return None
+            ordered = sorted(window)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    def link(self, peer):
+        """لقطة إحصاءات الجهاز (بقيم افتراضية لما لم يُقس)"""
+        with self._lock:
+            record = self._peers.get(peer_key(peer))
+            if record is None:
+                return PeerLink(DEFAULT_RTT, DEFAULT_BANDWIDTH, 0, 0, 0.0, 0, None)
+            return PeerLink(
+                record.rtt if record.rtt is not None else DEFAULT_RTT,
+                record.bandwidth if record.bandwidth is not None else DEFAULT_BANDWIDTH,
+                record.queue_depth, record.samples, record.updated,
+                record.outstanding, record.latency,
+            )
+
+    def network_time(self, peer):
+        """زمن الشبكة المقاس لحمولة مرجعية (RTT + REFERENCE_BYTES / عرض النطاق)
+
+        None لجهاز لم يُقس RTT الخاص به بعد؛ وRTT وحده إن لم يُقس عرض النطاق
+        (القيمة الافتراضية لعرض النطاق ليست قياساً).
+        """
+        with self._lock:
+            record = self._peers.get(peer_key(peer))
+            if record is None or record.rtt is None:
+                return None
+            if record.bandwidth is None:
+                return record.rtt
+            return record.rtt + REFERENCE_BYTES / record.bandwidth
+
+    def tier(self, peer):
+        """فئة قرب الجهاز (0 الأقرب) من زمن الشبكة المقاس
+
+        قبل أي قياس تُقدَّر من العنوان: الشبكات الخاصة في الفئة 1 والعامة في 3.
+        """
+        seconds = self.network_time(peer)
+        if seconds is None:
+            host = peer_key(peer).rsplit(":", 1)[0]
+            return 1 if is_private_ip(host) else 3
+        for tier, limit in enumerate(LATENCY_TIERS):
+            if seconds < limit:
+                return tier
+        return len(LATENCY_TIERS)
+
+    def group_by_tier(self, peers):
+        """الأقران مجمّعين حسب الفئة، الأقرب أولاً (قائمة قوائم غير فارغة)"""
+        groups = {}
+        for peer in peers:
+            groups.setdefault(self.tier(peer), []).append(peer)
+        return [groups[t] for t in sorted(groups)]
+
+    def observe_reply(self, peer, elapsed, nbytes, reply):
+        """تحديث الإحصاءات من رد /run (يستخدم took و queue إن أعادهما الجهاز)
+
+        يعيد زمن التنفيذ على الجهاز (took) أو الزمن الإجمالي إن لم يُعلن.
+        """
+        took = None
+        if isinstance(reply, dict):
+            took = reply.get("took")
+            if reply.get("queue") is not None:
+                self.observe_queue(peer, reply["queue"])
+        if isinstance(took, (int, float)) and 0 <= took <= elapsed:
+            self.observe_transfer(peer, elapsed - took, nbytes)
+            return took
+        return elapsed
+
+
+_registry = PeerStatsRegistry()
+
+
+def get_peer_stats():
+    """سجل إحصاءات الأجهزة المشترك للعملية"""
+    return _registry
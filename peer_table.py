@@ -0,0 +1,259 @@
+# peer_table.py
+"""
+جدول عُقد _tasknode حيّ يغذّيه ServiceBrowser دائم واحد.
+
+بدلاً من إنشاء متصفح جديد والنوم 2-3 ثوانٍ في كل استدعاء لـ discover_peers،
+يحتفظ الجدول بسجل مضغوط (__slots__) لكل عقدة مفهرس بـ node_id:
+    - add_service / update_service تُنشئ السجل أو تحدّثه في مكانه (O(1))
+    - remove_service تحذفه فوراً
+    - العقد التي تعلن نبضاً (hb في TXT) تُحذف إن فاتها HEARTBEAT_MISSES نبضات
+    - حقول الحمل الحية (cpu / mem / queue / inflight من load_advertiser) تُقرأ
+      مع كل تحديث، فيبقى load حديثاً دون استطلاع /cpu
+ويُبلَّغ المشتركون بأحداث add / update / remove. القراءة عبر peers() من لقطة
+ثابتة بلا قفل.
+
+هذا المتصفح الوحيد في العملية: DistributedExecutor يقرأ الجدول مباشرة، ودليل
+offload (peer_directory) يشترك في أحداثه.
+"""
+
+import socket
+import threading
+import time
+import logging
+
+from zeroconf import Zeroconf, ServiceBrowser
+
+SERVICE_TYPE = "_tasknode._tcp.local."
+HEARTBEAT_MISSES = 3      # نبضات فائتة قبل اعتبار العقدة مغادرة
+SWEEP_INTERVAL = 1.0      # ثانية بين فحوص انتهاء النبض
+
+
+class PeerRecord:
+    """سجل عقدة واحدة كما أعلنت عن نفسها"""
+
+    __slots__ = ("node_id", "name", "ip", "port", "load", "mem_mb", "queue", "inflight",
+                 "heartbeat", "last_seen", "properties")
+
+    def __init__(self, node_id, name, ip, port, load=0.0, heartbeat=None, properties=None):
+        self.node_id = node_id
+        self.name = name
+        self.ip = ip
+        self.port = port
+        self.load = load
+        self.mem_mb = None     # الحقول الحية من load_advertiser (None لعقدة لا تعلنها)
+        self.queue = 0
+        self.inflight = 0
+        self.heartbeat = heartbeat
+        self.last_seen = time.time()
+        self.properties = properties or {}
+
+    @property
+    def address(self):
+        return f"{self.ip}:{self.port}"
+
+    def expired(self, now):
+        return self.heartbeat is not None and now - self.last_seen > HEARTBEAT_MISSES * self.heartbeat
+
+    def as_dict(self):
+        """الصيغة القديمة لقوائم الأقران (قواميس ip/port/load/node_id)"""
+        return {"ip": self.ip, "port": self.port, "load": self.load,
+                "node_id": self.node_id, "last_seen": self.last_seen,
+                "mem_mb": self.mem_mb, "queue": self.queue, "inflight": self.inflight}
+
+    def __repr__(self):
+        return f"PeerRecord({self.node_id}@{self.address}, load={self.load})"
+
+
+def _decode_properties(properties):
+    decoded = {}
+    for key, value in (properties or {}).items():
+        if value is None:
+            continue
+        key = key.decode() if isinstance(key, bytes) else key
+        decoded[key] = value.decode() if isinstance(value, bytes) else value
+    return decoded
+
+
+def _float(value, default=None):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+class PeerTable:
+    """جدول العقد المفهرس بـ node_id (آمن للخيوط)"""
+
+    def __init__(self, service_type=SERVICE_TYPE, zeroconf=None):
+        self.service_type = service_type
+        self._zeroconf = zeroconf
+        self._owns_zeroconf = zeroconf is None
+        self._browser = None
+        self._lock = threading.Lock()
+        self._by_node = {}     # node_id -> PeerRecord
+        self._by_name = {}     # اسم الخدمة -> node_id
+        self._snapshot = ()
+        self._subscribers = []
+        self._ready = threading.Event()   # يُضبط عند أول عقدة
+        self._stop = threading.Event()
+
+    # ------------------------------------------------------------
+    # دورة الحياة
+    # ------------------------------------------------------------
+    def start(self):
+        if self._browser is not None:
+            return self
+        if self._zeroconf is None:
+            self._zeroconf = Zeroconf()
+        self._browser = ServiceBrowser(self._zeroconf, self.service_type, self)
+        threading.Thread(target=self._sweep_loop, daemon=True, name="peer-table").start()
+        return self
+
+    def close(self):
+        self._stop.set()
+        if self._browser is not None:
+            self._browser.cancel()
+            self._browser = None
+        if self._owns_zeroconf and self._zeroconf is not None:
+            self._zeroconf.close()
+            self._zeroconf = None
+
+    def subscribe(self, callback):
+        """callback(event, record) حيث event أحد add / update / remove"""
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        try:
+            self._subscribers.remove(callback)
+        except ValueError:
+            pass
+
+    # ------------------------------------------------------------
+    # واجهة المستمع المطلوبة من Zeroconf
+    # ------------------------------------------------------------
+    def add_service(self, zc, type_, name):
+        info = zc.get_service_info(type_, name)
+        if info is None or not info.addresses:
+            return
+        props = _decode_properties(info.properties)
+        node_id = props.pop("node_id", None) or name
+        load = _float(props.pop("load", None), 0.0)
+        props.pop("seq", None)   # عدّاد النشر (load_advertiser) ليس خاصية للعقدة
+        live = {"load": _float(props.pop("cpu", None), load),
+                "heartbeat": _float(props.pop("hb", None)),
+                "mem_mb": _float(props.pop("mem", None)),
+                "queue": int(_float(props.pop("queue", None), 0)),
+                "inflight": int(_float(props.pop("inflight", None), 0))}
+        self.upsert(node_id, name, socket.inet_ntoa(info.addresses[0]), info.port,
+                    properties=props, **live)
+
+    def update_service(self, zc, type_, name):
+        self.add_service(zc, type_, name)
+
+    def remove_service(self, zc, type_, name):
+        with self._lock:
+            node_id = self._by_name.pop(name, None)
+            record = self._by_node.get(node_id)
+            # إعلان مغادرة لاسم قديم لا يحذف تسجيل العقدة الأحدث
+            if record is None or record.name != name:
+                return
+            del self._by_node[node_id]
+            self._rebuild_snapshot()
+        self._emit("remove", record)
+
+    # ------------------------------------------------------------
+    # تحديث الجدول
+    # ------------------------------------------------------------
+    def upsert(self, node_id, name, ip, port, load=0.0, heartbeat=None, properties=None,
+               mem_mb=None, queue=0, inflight=0):
+        """إضافة عقدة أو تحديث سجلها في مكانه"""
+        with self._lock:
+            record = self._by_node.get(node_id)
+            if record is None:
+                record = PeerRecord(node_id, name, ip, port, load, heartbeat, properties)
+                self._by_node[node_id] = record
+                event = "add"
+            else:
+                if record.name != name:
+                    self._by_name.pop(record.name, None)
+                record.name, record.ip, record.port = name, ip, port
+                record.load, record.heartbeat = load, heartbeat
+                record.properties = properties or {}
+                record.last_seen = time.time()
+                event = "update"
+            record.mem_mb, record.queue, record.inflight = mem_mb, queue, inflight
+            self._by_name[name] = node_id
+            if event == "add":
+                self._rebuild_snapshot()
+        if event == "add":
+            logging.info(f"🔗 عقدة جديدة: {node_id} @ {record.address}")
+        self._ready.set()
+        self._emit(event, record)
+        return record
+
+    def _rebuild_snapshot(self):
+        """يُستدعى والقفل مأخوذ: لقطة ثابتة تُقرأ بلا قفل"""
+        self._snapshot = tuple(self._by_node.values())
+
+    def _emit(self, event, record):
+        for callback in self._subscribers:
+            try:
+                callback(event, record)
+            except Exception as e:
+                logging.debug(f"فشل مشترك جدول العقد: {e}")
+
+    def _sweep_loop(self):
+        while not self._stop.wait(SWEEP_INTERVAL):
+            now = time.time()
+            expired = [r for r in self._snapshot if r.expired(now)]
+            if not expired:
+                continue
+            removed = []
+            with self._lock:
+                for record in expired:
+                    if self._by_node.get(record.node_id) is record and record.expired(now):
+                        del self._by_node[record.node_id]
+                        self._by_name.pop(record.name, None)
+                        removed.append(record)
+                self._rebuild_snapshot()
+            for record in removed:
+                logging.info(f"👋 انقطع نبض العقدة: {record.node_id}")
+                self._emit("remove", record)
+
+    # ------------------------------------------------------------
+    # القراءة
+    # ------------------------------------------------------------
+    def get(self, node_id):
+        return self._by_node.get(node_id)
+
+    def peers(self):
+        """كل العقد الحالية (لقطة بلا قفل)"""
+        return list(self._snapshot)
+
+    def wait_ready(self, timeout):
+        """انتظار أول عقدة حتى timeout (للاستدعاء الأول في العملية فقط)"""
+        return self._ready.wait(timeout)
+
+    def __len__(self):
+        return len(self._snapshot)
+
+    def __bool__(self):
+        # ServiceBrowser يختبر المستمع بقيمته المنطقية؛ الجدول الفارغ مستمع صالح
+        return True
+
+    def __contains__(self, node_id):
+        return node_id in self._by_node
+
+
+_table = None
+_table_lock = threading.Lock()
+
+
+def get_peer_table():
+    """جدول العقد المشترك للعملية (يبدأ التصفح عند أول استخدام)"""
+    global _table
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                _table = PeerTable().start()
+    return _table
@@ -0,0 +1,187 @@
+# prime_sieve.py
+"""
+غربال مقطّع (segmented sieve) موزّع لحساب الأعداد الأولية.
+
+يُقسَّم المجال [0, n] إلى مقاطع بطول SEGMENT_SIZE، ويُغربل كل مقطع بعمليات
+NumPy متجهة على مصفوفة بايتات بالأعداد الأولية الأساسية حتى √n. تُوزَّع
+المقاطع على كل الأقران المتاحة (المهمة prime_segment) وعلى أنوية الجهاز
+المحلي معاً، ثم تُدمج النتائج إما كعدد أو كخريطة بتات مضغوطة (np.packbits).
+"""
+
+import os
+import math
+import queue
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+SEGMENT_SIZE = 1 << 24         # 16M عدد لكل مقطع (مضاعف لـ 8 لمحاذاة خريطة البتات)
+LOCAL_ONLY_LIMIT = 5_000_000   # تحت هذا الحد لا فائدة من التوزيع
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+
+def base_primes(limit):
+    """الأعداد الأولية حتى limit (غربال بسيط، يكفي لـ √n)"""
+    if limit < 2:
+        return np.empty(0, dtype=np.int64)
+    sieve = np.ones(limit + 1, dtype=np.bool_)
+    sieve[:2] = False
+    for p in range(2, math.isqrt(limit) + 1):
+        if sieve[p]:
+            sieve[p * p::p] = False
+    return np.flatnonzero(sieve)
+
+
+def sieve_segment(lo, hi, mode="count", primes=None):
+    """غربلة المقطع [lo, hi)
+
+    mode="count" يعيد عدد الأوليات، وmode="bitset" يعيد خريطة بتات مضغوطة
+    (بت لكل عدد ابتداءً من lo).
+    """
+    if primes is None:
+        primes = base_primes(math.isqrt(max(hi - 1, 0)))
+    is_prime = np.ones(hi - lo, dtype=np.bool_)
+    if lo < 2:
+        is_prime[:2 - lo] = False
+    for p in primes:
+        p = int(p)
+        if p * p >= hi:
+            break
+        start = max(p * p, ((lo + p - 1) // p) * p)
+        is_prime[start - lo::p] = False
+    if mode == "bitset":
+        return np.packbits(is_prime)
+    return int(np.count_nonzero(is_prime))
+
+
+def segments(n, segment_size=SEGMENT_SIZE):
+    """تقسيم [0, n] إلى مقاطع [lo, hi)"""
+    if segment_size <= 0:
+        raise ValueError(f"segment_size يجب أن يكون موجباً: {segment_size}")
+    return [(lo, min(lo + segment_size, n + 1)) for lo in range(0, n + 1, segment_size)]
+
+
+def count_primes(n, segment_size=SEGMENT_SIZE):
+    """عدد الأوليات حتى n على نواة واحدة (ذاكرة ثابتة بحجم مقطع)"""
+    primes = base_primes(math.isqrt(n))
+    return sum(sieve_segment(lo, hi, "count", primes) for lo, hi in segments(n, segment_size))
+
+
+def primes_up_to(n):
+    """قائمة الأوليات حتى n كمصفوفة (للأحجام الصغيرة)"""
+    bits = np.unpackbits(sieve_segment(0, n + 1, "bitset"), count=n + 1)
+    return np.flatnonzero(bits)
+
+
+def _get_process_pool():
+    global _process_pool
+    if _process_pool is None:
+        with _process_pool_lock:
+            if _process_pool is None:
+                _process_pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+    return _process_pool
+
+
+def distributed_prime_calculation(n, mode="count", peers=None, send=None,
+                                  segment_size=SEGMENT_SIZE, local_workers=None):
+    """غربلة [0, n] بتوزيع المقاطع على الأقران والأنوية المحلية
+
+    peers: عناوين الأقران 'ip:port'، وsend(peer, payload) دالة الإرسال
+    (افتراضياً offload_lib.try_offload). كل جهاز يسحب المقطع التالي من طابور
+    مشترك، فيأخذ الأسرع مقاطع أكثر؛ والمقطع الذي يفشل على جهاز يعود للطابور.
+    مع mode="bitset" يجب أن يكون segment_size مضاعفاً لـ 8 ليبدأ كل مقطع عند
+    بايت كامل من خريطة البتات المدمجة.
+    """
+    if mode == "bitset" and segment_size % 8:
+        raise ValueError(f"segment_size يجب أن يكون مضاعفاً لـ 8 مع bitset: {segment_size}")
+    if n < 2:
+        result = {"n": n, "count": 0}
+        if mode == "bitset":
+            result["bitset"] = np.packbits(np.zeros(max(n + 1, 0), dtype=np.bool_))
+        return result
+
+    peers = list(peers or []) if n > LOCAL_ONLY_LIMIT else []
+    if send is None and peers:
+        from offload_lib import try_offload
+        send = try_offload
+
+    work = queue.Queue()
+    for seg in segments(n, segment_size):
+        work.put(seg)
+    total_segments = work.qsize()
+
+    lock = threading.Lock()
+    done = threading.Event()
+    state = {"count": 0, "finished": 0, "error": None}
+    bitset = np.zeros((n + 8) // 8, dtype=np.uint8) if mode == "bitset" else None
+
+    def merge(lo, value):
+        with lock:
+            if mode == "bitset":
+                bits = np.asarray(value, dtype=np.uint8)
+                start = lo // 8
+                bitset[start:start + len(bits)] = bits
+                state["count"] += int(_POPCOUNT[bits].sum(dtype=np.int64))
+            else:
+                state["count"] += int(value)
+            state["finished"] += 1
+            if state["finished"] == total_segments:
+                done.set()
+
+    def take():
+        while not done.is_set():
+            try:
+                return work.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return None
+
+    def peer_worker(peer):
+        while True:
+            seg = take()
+            if seg is None:
+                return
+            lo, hi = seg
+            try:
+                reply = send(peer, {"func": "prime_segment", "args": [lo, hi, mode], "kwargs": {}})
+                merge(lo, reply.get("result", reply) if isinstance(reply, dict) else reply)
+            except Exception as e:
+                logging.warning(f"⚠️ فشل المقطع [{lo}, {hi}) على {peer}: {e} - إعادته للطابور")
+                work.put(seg)
+                return
+
+    def local_worker():
+        pool = _get_process_pool()
+        while True:
+            seg = take()
+            if seg is None:
+                return
+            lo, hi = seg
+            try:
+                merge(lo, pool.submit(sieve_segment, lo, hi, mode).result())
+            except Exception as e:
+                with lock:
+                    state["error"] = e
+                done.set()
+                return
+
+    workers = [threading.Thread(target=peer_worker, args=(p,), daemon=True) for p in peers]
+    workers += [threading.Thread(target=local_worker, daemon=True)
+                for _ in range(local_workers or os.cpu_count() or 1)]
+    for t in workers:
+        t.start()
+    done.wait()
+    if state["error"] is not None:
+        raise state["error"]
+
+    logging.info(f"🔢 غربلة [0, {n}] على {len(peers)} جهاز + الأنوية المحلية: {state['count']} عدد أولي")
+    result = {"n": n, "count": state["count"]}
+    if mode == "bitset":
+        result["bitset"] = bitset
+    return result
@@ -3,6 +3,7 @@
 import psutil
 from collections import deque
 import logging
+from load_sampler import current_load
 
 logging.basicConfig(level=logging.INFO)
 
@@ -12,17 +13,19 @@ class ResourceMonitor:
         self.mem_history = deque(maxlen=10)
 
     def current_load(self):
-        cpu = psutil.cpu_percent(interval=0.5) / 100.0  # كنسبة (0.0 - 1.0)
-        mem = psutil.virtual_memory().available / (1024**2)  # MB
+        # قراءة فورية من المُعايِن المشترك بدلاً من cpu_percent(interval=0.5) الحاجب
+        snapshot = current_load()
+        cpu = snapshot.cpu  # كنسبة (0.0 - 1.0)
+        mem = snapshot.mem_available_mb  # MB
 
         self.cpu_history.append(cpu)
         self.mem_history.append(mem)
 
-        avg_cpu = sum(self.cpu_history) / len(self.cpu_history)
-        avg_mem = sum(self.mem_history) / len(self.mem_history)
+        avg_cpu = snapshot.cpu_window
+        avg_mem = snapshot.mem_window_mb
 
-        logging.info(f"Instant CPU: {cpu:.2%}, Instant MEM: {mem:.1f}MB")
-        logging.info(f"Avg CPU: {avg_cpu:.2%}, Avg MEM: {avg_mem:.1f}MB")
+        logging.debug(f"Instant CPU: {cpu:.2%}, Instant MEM: {mem:.1f}MB")
+        logging.debug(f"Avg CPU: {avg_cpu:.2%}, Avg MEM: {avg_mem:.1f}MB")
 
         return {
             "instant": {"cpu": cpu, "mem": mem},
@@ -34,9 +37,10 @@ def trigger_offload():
     """عملية توزيع المهام التجريبية"""
     print("⚠️ تم استدعاء توزيع المهام (اختباري)")
 
+_monitor = ResourceMonitor()
+
 def should_offload(task_complexity=0):
-    monitor = ResourceMonitor()
-    status = monitor.current_load()
+    status = _monitor.current_load()
 
     if (
         status['average']['cpu'] > 0.6 or
@@ -3,6 +3,14 @@
 # يرسل المهمّة إلى سيرفر RPC خارجي مع تشفير + توقيع، أو يعمل بوضع JSON صافٍ لو لم يكن SecurityManager مفعَّل.
 # ============================================================
 
+from __future__ import annotations
+
+import http_pool
+import wire_format
+import job_client
+import time
+from peer_stats import get_peer_stats, peer_key
+from peer_health import get_peer_health
 import requests
 import json
 import os
@@ -10,6 +18,7 @@ from typing import Any
 
 # عنوان الخادم البعيد (يمكن تعيينه بمتغير بيئي)
 REMOTE_SERVER = os.getenv("REMOTE_SERVER", "http://89.111.171.92:7520/run")
+REMOTE_PEER = peer_key(REMOTE_SERVER)
 
 # محاولة استيراد SecurityManager (اختياري)
 try:
@@ -21,8 +30,29 @@ except ImportError:
     SECURITY_ENABLED = False
 
 
-def execute_remotely(func_name: str, args: list[Any] | None = None, kwargs: dict[str, Any] | None = None):
-    """إرسال استدعاء دالة إلى الخادم البعيد وإرجاع النتيجة."""
+def _post(payload, headers, timeout, job_id):
+    """(الرد، البايتات المنقولة) عبر /jobs إن مُرِّر job_id، وإلا /run"""
+    if job_id is not None:
+        stats = {}
+        try:
+            data = job_client.run_job(job_client.jobs_url(REMOTE_SERVER), payload, headers,
+                                      job_id, timeout, stats=stats)
+            return data, stats["bytes"]
+        except job_client.JobsUnsupported:
+            pass
+    response = http_pool.post(REMOTE_SERVER, headers=headers, data=payload, timeout=timeout)
+    response.raise_for_status()
+    data = wire_format.decode_body(response.content, response.headers.get("Content-Type"))
+    return data, len(payload) + len(response.content)
+
+
+def execute_remotely(func_name: str, args: list[Any] | None = None, kwargs: dict[str, Any] | None = None,
+                     stats: dict | None = None, expected: float | None = None):
+    """إرسال استدعاء دالة إلى الخادم البعيد وإرجاع النتيجة.
+
+    إن مُرِّر stats يُملأ عند النجاح بـ elapsed و bytes و compute (زمن التنفيذ على الخادم).
+    expected: الزمن البعيد المتوقع (من نموذج التكلفة) لحساب المهلة المتكيّفة.
+    """
 
     if args is None:
         args = []
@@ -35,11 +65,15 @@ def execute_remotely(func_name: str, args: list[Any] | None = None, kwargs: dict
         "kwargs": kwargs,
         "sender_id": "client_node"
     }
+    # المهام الطويلة عبر /jobs: المعرّف داخل الحمولة الموقّعة
+    job_id = job_client.new_job_id() if job_client.use_jobs(expected) else None
+    if job_id is not None:
+        task.update(job_id=job_id, expected=expected)
 
     try:
         if SECURITY_ENABLED:
-            # 1) وقّع المهمة ثم شفّرها
-            signed_task = security.sign_task(task)
+            # 1) وقّع المهمة ثم شفّرها (التوقيع يتطلب JSON، فتُحوَّل المصفوفات إلى قوائم)
+            signed_task = security.sign_task(wire_format.jsonable(task))
             encrypted   = security.encrypt_data(json.dumps(signed_task).encode())
 
             headers = {
@@ -48,15 +82,31 @@ def execute_remotely(func_name: str, args: list[Any] | None = None, kwargs: dict
             }
             payload = encrypted  # خام ثنائي
         else:
-            # وضع التطوير: أرسل JSON صريح
-            headers = {"Content-Type": "application/json"}
-            payload = task
-
-        response = requests.post(REMOTE_SERVER, headers=headers, json=payload if not SECURITY_ENABLED else None,
-                                 data=payload if SECURITY_ENABLED else None,
-                                 timeout=15)
-        response.raise_for_status()
-        data = response.json()
+            # وضع التطوير: إطار ثنائي يحمل المصفوفات دون تحويلها إلى JSON
+            headers = {"Content-Type": wire_format.CONTENT_TYPE}
+            payload = wire_format.encode(task)
+        headers["Accept"] = f"{wire_format.CONTENT_TYPE}, {wire_format.JSON_CONTENT_TYPE}"
+
+        health = get_peer_health()
+        if not health.allow(REMOTE_PEER):
+            raise ConnectionError(f"قاطع الدائرة مفتوح لـ {REMOTE_PEER}")
+        timeout = health.timeout_for(REMOTE_PEER, func_name, expected=expected, default=15,
+                                     nbytes=len(payload))
+        start = time.perf_counter()
+        try:
+            data, nbytes = _post(payload, headers, timeout, job_id)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            health.record_error(REMOTE_PEER, e, func_name)
+            raise
+        except (requests.HTTPError, RuntimeError):
+            health.record_success(REMOTE_PEER)  # الخادم يرد؛ الخطأ من المهمة
+            raise
+        health.record_success(REMOTE_PEER)
+        elapsed = time.perf_counter() - start
+        get_peer_stats().observe_latency(REMOTE_PEER, elapsed, func=func_name)
+        compute = get_peer_stats().observe_reply(REMOTE_PEER, elapsed, nbytes, data)
+        if stats is not None:
+            stats.update(elapsed=elapsed, bytes=nbytes, compute=compute)
         return data.get("result", "⚠️ لا يوجد نتيجة")
 
     except Exception as e:
@@ -0,0 +1,256 @@
+# result_store.py
+"""
+مخزن نتائج المهام مفهرس بـ task_id مع مدة صلاحية (TTL) وحدود للحجم.
+
+طبقتان:
+    - الذاكرة: OrderedDict بترتيب الاستخدام، يُطرد منه الأقدم عند تجاوز
+      MAX_ENTRIES أو MAX_BYTES.
+    - القرص (اختياري): النتائج الأكبر من SPILL_THRESHOLD تُكتب إطاراً ثنائياً
+      (wire_format) في SPILL_DIR ولا يبقى في الذاكرة إلا مسارها. ملفات هذه
+      الطبقة تبقى بعد إعادة تشغيل العميل، فيجد من يعيد إرسال مهمة بنفس
+      task_id نتيجتها جاهزة دون إعادة تنفيذها.
+      put(..., durable=True) (أو write_through للمخزن كله) تكتب النتيجة على
+      القرص مهما صغرت، وتبقى الصغيرة في الذاكرة أيضاً للقراءة السريعة؛ تجاوز
+      MAX_BYTES يُسقط نسختها من الذاكرة فقط. الكتابة متزامنة فتُترك للنتائج
+      التي يلزم أن تبقى بعد إعادة التشغيل.
+
+ما يُقرأ من القرص يمر بـ wire_format: الصفوف (tuple) تعود قوائم (list)، والأعداد
+من أنواع NumPy تعود أعداد Python.
+
+get() و wait() تتيحان للمستهلك المتأخر جلب النتيجة بعد اكتمالها.
+"""
+
+import os
+import mmap
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+import wire_format
+
+RESULT_TTL = float(os.getenv("DTS_RESULT_TTL", "600"))          # ثانية
+MAX_ENTRIES = int(os.getenv("DTS_RESULT_MAX_ENTRIES", "10000"))
+MAX_BYTES = int(os.getenv("DTS_RESULT_MAX_BYTES", str(256 * 1024**2)))
+SPILL_THRESHOLD = int(os.getenv("DTS_RESULT_SPILL_THRESHOLD", str(1024**2)))
+SPILL_MAX_BYTES = int(os.getenv("DTS_RESULT_SPILL_MAX_BYTES", str(2 * 1024**3)))
+SPILL_DIR = os.getenv("DTS_RESULT_SPILL_DIR",
+                      os.path.join(os.path.expanduser("~"), ".dts", "results"))
+SPILL_SUFFIX = ".dts"
+
+_MISSING = object()
+
+
+class _Entry:
+    __slots__ = ("value", "path", "size", "expires")
+
+    def __init__(self, value, path, size, expires):
+        self.value = value      # _MISSING إن لم تكن في الذاكرة (على القرص فقط)
+        self.path = path
+        self.size = size
+        self.expires = expires
+
+
+class ResultStore:
+    """مخزن نتائج محدود الحجم بصلاحية زمنية وطبقة قرص اختيارية (آمن للخيوط)"""
+
+    def __init__(self, ttl=RESULT_TTL, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES,
+                 spill_dir=SPILL_DIR, spill_threshold=SPILL_THRESHOLD,
+                 spill_max_bytes=SPILL_MAX_BYTES, write_through=False):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.spill_threshold = spill_threshold
+        self.spill_max_bytes = spill_max_bytes
+        self.write_through = write_through
+        self._entries = OrderedDict()   # task_id -> _Entry (الأقدم استخداماً أولاً)
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+        self._cond = threading.Condition()
+        if spill_dir:
+            self._scan_spill_dir()
+
+    # ------------------------------------------------------------
+    # الواجهة
+    # ------------------------------------------------------------
+    def put(self, task_id, value, ttl=None, durable=None):
+        """حفظ نتيجة مهمة (تستبدل أي نتيجة سابقة بنفس المعرّف)
+
+        durable: اكتبها على القرص مهما صغرت (افتراضياً write_through).
+        """
+        expires = time.time() + (self.ttl if ttl is None else ttl)
+        size = wire_format.estimated_size(value)
+        path = None
+        large = size >= self.spill_threshold
+        durable = self.write_through if durable is None else durable
+        if self.spill_dir and (large or durable):
+            path = self._spill(task_id, value)
+
+        entry = _Entry(_MISSING if path and large else value, path, size, expires)
+        with self._cond:
+            self._remove(task_id, keep_file=path)
+            self._entries[task_id] = entry
+            self._account(entry, +1)
+            self._evict()
+            self._cond.notify_all()
+
+    def get(self, task_id, default=None):
+        """النتيجة إن وُجدت ولم تنتهِ صلاحيتها، وإلا default"""
+        with self._cond:
+            entry = self._lookup(task_id)
+        if entry is None:
+            return default
+        if entry.value is not _MISSING:
+            return entry.value
+        value = self._load(entry.path)
+        if value is _MISSING:
+            with self._cond:
+                if self._entries.get(task_id) is entry:
+                    self._remove(task_id)
+            return default
+        return value
+
+    def wait(self, task_id, timeout=None, default=None):
+        """انتظار وصول نتيجة مهمة (للمستهلك الذي يسبق اكتمالها)"""
+        deadline = time.time() + timeout if timeout is not None else None
+        with self._cond:
+            while self._lookup(task_id) is None:
+                remaining = deadline - time.time() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    return default
+                self._cond.wait(remaining)
+        return self.get(task_id, default)
+
+    def __contains__(self, task_id):
+        with self._cond:
+            return self._lookup(task_id) is not None
+
+    def __len__(self):
+        with self._cond:
+            return len(self._entries)
+
+    def discard(self, task_id):
+        with self._cond:
+            self._remove(task_id)
+
+    def purge_expired(self):
+        """حذف كل النتائج المنتهية (يُستدعى دورياً أو عند الحاجة)"""
+        now = time.time()
+        with self._cond:
+            for task_id in [k for k, e in self._entries.items() if e.expires <= now]:
+                self._remove(task_id)
+
+    def stats(self):
+        with self._cond:
+            return {"entries": len(self._entries), "memory_bytes": self._memory_bytes,
+                    "disk_bytes": self._disk_bytes}
+
+    # ------------------------------------------------------------
+    # الداخلية (تُستدعى والقفل ممسوك ما لم يُذكر غير ذلك)
+    # ------------------------------------------------------------
+    def _lookup(self, task_id):
+        entry = self._entries.get(task_id)
+        if entry is None:
+            return None
+        if entry.expires <= time.time():
+            self._remove(task_id)
+            return None
+        self._entries.move_to_end(task_id)
+        return entry
+
+    def _account(self, entry, sign):
+        if entry.value is not _MISSING:
+            self._memory_bytes += sign * entry.size
+        if entry.path is not None:
+            self._disk_bytes += sign * entry.size
+
+    def _remove(self, task_id, keep_file=None):
+        entry = self._entries.pop(task_id, None)
+        if entry is None:
+            return
+        self._account(entry, -1)
+        if entry.path is not None and entry.path != keep_file:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    def _evict(self):
+        now = time.time()
+        for task_id in [k for k, e in self._entries.items() if e.expires <= now]:
+            self._remove(task_id)
+        # ما له نسخة على القرص يُسقط من الذاكرة فقط (الأقدم أولاً)
+        for entry in self._entries.values():
+            if self._memory_bytes <= self.max_bytes:
+                break
+            if entry.path is not None and entry.value is not _MISSING:
+                self._account(entry, -1)
+                entry.value = _MISSING
+                self._account(entry, +1)
+        while self._entries and (len(self._entries) > self.max_entries
+                                 or self._memory_bytes > self.max_bytes
+                                 or self._disk_bytes > self.spill_max_bytes):
+            self._remove(next(iter(self._entries)))
+
+    def _path_for(self, task_id):
+        digest = hashlib.sha1(str(task_id).encode()).hexdigest()
+        return os.path.join(self.spill_dir, digest + SPILL_SUFFIX)
+
+    def _spill(self, task_id, value):
+        """كتابة النتيجة على القرص (بلا قفل)؛ None إن تعذّر ترميزها أو كتابتها"""
+        path = self._path_for(task_id)
+        try:
+            data = wire_format.encode({"task_id": task_id, "result": value})
+            os.makedirs(self.spill_dir, exist_ok=True)
+            tmp = f"{path}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+            return path
+        except (TypeError, ValueError, OSError) as e:
+            logging.debug(f"تعذّر نقل نتيجة {task_id} إلى القرص: {e}")
+            return None
+
+    @staticmethod
+    def _load(path):
+        try:
+            with open(path, "rb") as f:
+                return wire_format.decode(f.read())["result"]
+        except (OSError, ValueError, KeyError) as e:
+            logging.debug(f"تعذّر قراءة نتيجة من {path}: {e}")
+            return _MISSING
+
+    @staticmethod
+    def _read_task_id(path):
+        # mmap حتى لا تُقرأ إلا صفحات الترويسة من الملفات الكبيرة
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            return wire_format.decode(m)["task_id"]
+
+    def _scan_spill_dir(self):
+        """فهرسة نتائج القرص الباقية من تشغيل سابق (الصلاحية من وقت التعديل)"""
+        try:
+            names = sorted(os.listdir(self.spill_dir),
+                           key=lambda n: os.path.getmtime(os.path.join(self.spill_dir, n)))
+        except OSError:
+            return
+        now = time.time()
+        for name in names:
+            if not name.endswith(SPILL_SUFFIX):
+                continue
+            path = os.path.join(self.spill_dir, name)
+            try:
+                expires = os.path.getmtime(path) + self.ttl
+                if expires <= now:
+                    os.remove(path)
+                    continue
+                task_id = self._read_task_id(path)
+                size = os.path.getsize(path)
+            except (OSError, ValueError, KeyError):
+                continue
+            entry = _Entry(_MISSING, path, size, expires)
+            self._entries[task_id] = entry
+            self._account(entry, +1)
+        with self._cond:
+            self._evict()
@@ -0,0 +1,153 @@
+# single_flight.py
+"""
+دمج الاستدعاءات المتطابقة المتزامنة (single-flight).
+
+إن طُلب الاستدعاء نفسه (الدالة + الوسائط بعد توحيدها، انظر
+memo_cache.call_fingerprint) وهو ما زال قيد التنفيذ، ينتظر الطالب الجديد
+التنفيذ الجاري ويأخذ نتيجته (أو استثناءه) بدلاً من تكرار الاكتشاف والتوزيع
+والحساب. بعد اكتمال التنفيذ يُنسى المفتاح؛ الاحتفاظ بالنتائج من شأن memo_cache.
+
+ملاحظة: المنتظرون يتقاسمون كائن النتيجة نفسه؛ لا يُعدَّل في مكانه.
+
+الدمج للمهام الحتمية فقط (share_rule): المعلنة بـ deterministic (أو cacheable)
+في task_registry. مهمة ذات نتائج عشوائية أو أثر جانبي يُنفَّذ كل استدعاء لها
+على حدة.
+"""
+
+import inspect
+import logging
+import threading
+from functools import wraps
+
+from memo_cache import call_fingerprint
+
+
+class _Call:
+    __slots__ = ("event", "result", "error", "owner", "waiters")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.owner = threading.get_ident()
+        self.waiters = 0
+
+
+class SingleFlight:
+    """مجموعة تنفيذات جارية مفهرسة بالمفتاح (آمنة للخيوط)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.shared = 0   # عدد الاستدعاءات التي خُدمت من تنفيذ جارٍ
+
+    def do(self, key, fn):
+        """تنفيذ fn مرة واحدة لكل المتزامنين على المفتاح نفسه"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                leader = True
+            elif call.owner == threading.get_ident():
+                # استدعاء متداخل من الخيط المنفِّذ نفسه: لا ينتظر نفسه
+                leader = None
+            else:
+                call.waiters += 1
+                self.shared += 1
+                leader = False
+
+        if leader is None:
+            return fn()
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            if call.waiters:
+                logging.debug(f"🔗 نتيجة واحدة خدمت {call.waiters + 1} استدعاءات متطابقة")
+            call.event.set()
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+
+_group = SingleFlight()
+
+
+def get_single_flight():
+    """مجموعة single-flight المشتركة للعملية"""
+    return _group
+
+
+def _signature(fn):
+    try:
+        return inspect.signature(fn)
+    except (TypeError, ValueError):
+        return None
+
+
+def share_rule(fn):
+    """متى يجوز دمج استدعاءات fn: False أو True أو شرط على الوسائط
+
+    من deterministic المعلنة في task_registry (وإلا cacheable)، أو من تفعيل
+    memo_cache للدالة؛ دالة غير معلنة لا تُدمج.
+    """
+    spec = getattr(fn, "task_spec", None)
+    if spec is not None:
+        return spec.shareable
+    policy = getattr(fn, "memo_policy", None)
+    if policy is None:
+        return False
+    return policy.when or True
+
+
+def _holds(when, args, kwargs):
+    try:
+        return bool(when(*args, **kwargs))
+    except Exception:
+        return False
+
+
+def shared_call(fn, args, kwargs, signature=None, compute=None, when=None):
+    """تنفيذ fn(*args, **kwargs) مع دمج الطلبات المتطابقة المتزامنة
+
+    compute: منفِّذ بلا وسائط يحل محل استدعاء fn مباشرة (مثل cached_call في
+    خوادم /run)؛ المفتاح يبقى من fn ووسائطها. الاستدعاءات التي لا يمكن توحيد
+    وسائطها، أو التي لا تحقق الشرط when، تُنفَّذ مباشرة دون دمج.
+    """
+    if compute is None:
+        compute = lambda: fn(*args, **kwargs)
+    if when is not None and not _holds(when, args, kwargs):
+        return compute()
+    name = f"{getattr(fn, '__module__', '')}.{getattr(fn, '__qualname__', fn)}"
+    try:
+        key = call_fingerprint(name, args, kwargs, signature or _signature(fn))
+    except TypeError:
+        return compute()
+    return _group.do(key, compute)
+
+
+def coalesce(func=None, *, when=None):
+    """ديكوراتور: الاستدعاءات المتطابقة المتزامنة تتقاسم تنفيذاً واحداً
+
+    when: شرط على الوسائط؛ الاستدعاءات التي لا تحققه تُنفَّذ دون دمج.
+    """
+    if func is None:
+        return lambda f: coalesce(f, when=when)
+    signature = _signature(func)
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        return shared_call(func, args, kwargs, signature, when=when)
+    return wrapper
@@ -3,14 +3,11 @@ import time
 import logging
 import sys
 from autostart_config import AutoStartManager
-from distributed_executor import DistributedExecutor
 
 PY = sys.executable  # مسار بايثون الحالي
 
 SERVICES = [
-    ("peer_server.py", "Peer‑Server"),
-    ("rpc_server.py", "RPC‑Server"),
-    ("server.py", "REST‑Server"),  # يعمل على 7521 حاليًا
+    ("worker_service.py", "Worker‑Service"),  # /run و /cpu و /multiply ... على 7520
     ("load_balancer.py", "Load‑Balancer"),
 ]
 
@@ -69,10 +66,7 @@ def main():
         # 1) تشغيل الخدمات الخلفيّة
         procs = launch_services()
 
-        # 2) تهيئة نظام التنفيذ الموزع (ليتعرّف على هذا الجهاز كعقدة)
-        executor = DistributedExecutor("my_shared_secret_123")
-        executor.peer_registry.register_service("auto_node", 7520)
-        logging.info("🚀 العقدة auto_node مُسجّلة في الـRegistry على 7520")
+        # 2) خدمة العقدة تعلن هذا الجهاز عبر Zeroconf بنفسها (worker_service)
 
         # 3) حلقة إبقاء حيّة مع فحص العمليات
         while True:
@@ -0,0 +1,232 @@
+# task_registry.py
+"""
+سجل المهام: كل مهمة تعلن خصائصها مرة واحدة عند تعريفها بدلاً من
+getattr(smart_tasks, name) وسلاسل estimate_*_complexity المكررة حسب الاسم.
+
+    @offload
+    @task(cost=lambda n: n / 100, idempotent=True, cacheable=True)
+    def prime_calculation(n): ...
+
+الحقول:
+    cost          دالة بنفس وسائط المهمة تعيد تقدير التعقيد (القاعدة الاحتياطية
+                  قبل أن يجمع نموذج التكلفة عينات كافية)
+    cpu, mem_mb   الأنوية والذاكرة المتاحة (MB) التي تحتاجها المهمة (mem_mb عدد أو
+                  دالة على الوسائط)
+    requires      قدرات يجب أن تعلنها العقدة (مثل "cv2")
+    idempotent    بلا أثر جانبي: يُسمح بالتحوّط (hedge)
+    cacheable     حتمية: True أو شرط على الوسائط (memo_cache)
+    deterministic نفس الوسائط تعطي النتيجة نفسها: تُدمج الاستدعاءات المتطابقة
+                  المتزامنة (single_flight) دون حفظ النتائج؛ افتراضياً تتبع cacheable
+    batchable     صغيرة: تُجمَّع استدعاءاتها في /run_batch (micro_batcher)
+    result_bytes  دالة تقدّر حجم النتيجة (تلميح النقل لقرار التوزيع)
+
+من يقرأ السجل: offload (الافتراضات والتعقيد وحجم النتيجة)، video_offload و
+stream_offload، DistributedExecutor (ملاءمة العقدة والتجميع)، و worker_service
+(المهام المعروضة عبر /run). وحدات المهام (DTS_TASK_MODULES) تُستورد عند أول
+بحث عن اسم غير مسجّل.
+"""
+
+import os
+import sys
+import logging
+import importlib
+import importlib.util
+import threading
+
+TASK_MODULES = tuple(m for m in os.getenv("DTS_TASK_MODULES", "your_tasks").split(",") if m)
+CAPABILITIES = tuple(c for c in os.getenv("DTS_CAPABILITIES", "").split(",") if c)
+DETECTED_CAPABILITIES = ("cv2",)   # قدرات تُكتشف تلقائياً إن أمكن استيراد الوحدة
+
+
+class TaskSpec:
+    """خصائص مهمة واحدة كما أعلنتها"""
+
+    __slots__ = ("name", "func", "cost", "cpu", "mem_mb", "requires",
+                 "idempotent", "cacheable", "deterministic", "batchable", "result_bytes")
+
+    def __init__(self, name, func, cost=None, cpu=1, mem_mb=0, requires=(),
+                 idempotent=False, cacheable=False, deterministic=None, batchable=False,
+                 result_bytes=None):
+        self.name = name
+        self.func = func
+        self.cost = cost
+        self.cpu = cpu
+        self.mem_mb = mem_mb
+        self.requires = frozenset(requires)
+        self.idempotent = idempotent
+        self.cacheable = cacheable
+        self.deterministic = deterministic
+        self.batchable = batchable
+        self.result_bytes = result_bytes
+
+    @property
+    def shareable(self):
+        """متى تُدمج الاستدعاءات المتطابقة المتزامنة: False أو True أو شرط على الوسائط"""
+        return self.cacheable if self.deterministic is None else self.deterministic
+
+    @property
+    def entry(self):
+        """الدالة كما تظهر في وحدتها (بعد offload و memoize)؛ ما يُنفَّذ لطلبات /run"""
+        module = sys.modules.get(self.func.__module__)
+        entry = getattr(module, self.func.__name__, None) if module is not None else None
+        return entry if callable(entry) else self.func
+
+    def complexity(self, args, kwargs, default=1):
+        if self.cost is None:
+            return default
+        try:
+            return self.cost(*args, **kwargs)
+        except Exception as e:
+            logging.debug(f"تعذّر تقدير تعقيد {self.name}: {e}")
+            return default
+
+    def response_bytes(self, args, kwargs):
+        """الحجم المتوقع للنتيجة بالبايت، أو None إن لم يُعلن"""
+        if self.result_bytes is None:
+            return None
+        try:
+            return self.result_bytes(*args, **kwargs)
+        except Exception:
+            return None
+
+    def memory(self, args=(), kwargs=None):
+        """الذاكرة المطلوبة (MB) لهذه الوسائط"""
+        if not callable(self.mem_mb):
+            return self.mem_mb
+        try:
+            return self.mem_mb(*args, **(kwargs or {}))
+        except Exception:
+            return 0
+
+    def fits(self, cores=None, mem_mb=None, capabilities=None, args=(), kwargs=None):
+        """هل تلائم المهمة عقدة بهذه الموارد؟ (المجهول لا يُستبعد)"""
+        if cores is not None and cores < self.cpu:
+            return False
+        if mem_mb is not None and mem_mb < self.memory(args, kwargs):
+            return False
+        if capabilities is not None and not self.requires <= set(capabilities):
+            return False
+        return True
+
+    def as_dict(self):
+        return {"name": self.name, "cpu": self.cpu,
+                "mem_mb": None if callable(self.mem_mb) else self.mem_mb,
+                "requires": sorted(self.requires), "idempotent": self.idempotent,
+                "cacheable": bool(self.cacheable), "deterministic": bool(self.shareable),
+                "batchable": self.batchable}
+
+
+class TaskRegistry:
+    """المهام المسجّلة بأسمائها (آمن للخيوط)"""
+
+    def __init__(self, modules=TASK_MODULES):
+        self.modules = modules
+        self._specs = {}
+        self._lock = threading.RLock()
+        self._loaded = False
+
+    def register(self, spec):
+        with self._lock:
+            self._specs[spec.name] = spec
+        return spec
+
+    def load(self):
+        """استيراد وحدات المهام مرة واحدة (تسجّل مهامها عند الاستيراد)"""
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            for name in self.modules:
+                try:
+                    importlib.import_module(name)
+                except ImportError as e:
+                    logging.warning(f"⚠️ تعذّر تحميل وحدة المهام {name}: {e}")
+
+    def get(self, name):
+        """TaskSpec للاسم، أو None"""
+        spec = self._specs.get(name)
+        if spec is None and not self._loaded:
+            self.load()
+            spec = self._specs.get(name)
+        return spec
+
+    def specs(self):
+        self.load()
+        with self._lock:
+            return list(self._specs.values())
+
+    def __contains__(self, name):
+        return self.get(name) is not None
+
+
+_registry = TaskRegistry()
+
+
+def get_registry():
+    """سجل المهام المشترك للعملية"""
+    return _registry
+
+
+def task(func=None, *, name=None, cost=None, cpu=1, mem_mb=0, requires=(),
+         idempotent=False, cacheable=False, deterministic=None, batchable=False,
+         result_bytes=None):
+    """ديكوراتور: تسجيل المهمة بخصائصها (لا يغلّف الدالة؛ يضيف task_spec)"""
+    if func is None:
+        return lambda f: task(f, name=name, cost=cost, cpu=cpu, mem_mb=mem_mb, requires=requires,
+                              idempotent=idempotent, cacheable=cacheable,
+                              deterministic=deterministic, batchable=batchable,
+                              result_bytes=result_bytes)
+    func.task_spec = _registry.register(TaskSpec(
+        name or func.__name__, func, cost=cost, cpu=cpu, mem_mb=mem_mb, requires=requires,
+        idempotent=idempotent, cacheable=cacheable, deterministic=deterministic,
+        batchable=batchable, result_bytes=result_bytes))
+    return func
+
+
+def get_task_spec(func):
+    """TaskSpec لدالة (من task_spec إن وُجد) أو لاسم مهمة، أو None"""
+    if isinstance(func, str):
+        return _registry.get(func)
+    spec = getattr(func, "task_spec", None)
+    return spec if spec is not None else _registry.get(getattr(func, "__name__", ""))
+
+
+def task_complexity(func, args, kwargs, default=1):
+    """تقدير التعقيد من دالة cost المعلنة، أو default لمهمة غير معلنة"""
+    spec = get_task_spec(func)
+    return spec.complexity(args, kwargs, default) if spec is not None else default
+
+
+# ------------------------------------------------------------
+# قدرات العقدة (تُعلن في TXT وتُطابق مع requires)
+# ------------------------------------------------------------
+_capabilities = None
+
+
+def local_capabilities():
+    """قدرات هذه العقدة: DTS_CAPABILITIES مع ما يُكتشف تلقائياً"""
+    global _capabilities
+    if _capabilities is None:
+        detected = [c for c in DETECTED_CAPABILITIES if importlib.util.find_spec(c) is not None]
+        _capabilities = frozenset(CAPABILITIES) | frozenset(detected)
+    return _capabilities
+
+
+def node_properties():
+    """خصائص TXT الثابتة التي تعلنها العقدة عن مواردها (cores و caps)"""
+    return {b"cores": str(os.cpu_count() or 1).encode(),
+            b"caps": ",".join(sorted(local_capabilities())).encode()}
+
+
+def peer_fits(spec, record, args=(), kwargs=None):
+    """هل تلائم المهمة عقدة من peer_table (من cores و caps و mem المعلنة)؟"""
+    if spec is None:
+        return True
+    props = getattr(record, "properties", {}) or {}
+    try:
+        cores = int(props["cores"]) if "cores" in props else None
+    except ValueError:
+        cores = None
+    caps = props["caps"].split(",") if "caps" in props else None
+    return spec.fits(cores, getattr(record, "mem_mb", None),
+                     [c for c in caps if c] if caps is not None else None, args, kwargs)
@@ -0,0 +1,10 @@
+# tests/conftest.py - قرارات التوزيع حتمية في الاختبارات (لا استكشاف عشوائي)
+
+import pytest
+
+import offload_decision
+
+
+@pytest.fixture(autouse=True)
+def no_exploration(monkeypatch):
+    monkeypatch.setattr(offload_decision, "EXPLORE_RATE", 0.0)
@@ -0,0 +1,85 @@
+import time
+
+import pytest
+import requests
+
+import distributed_executor
+from distributed_executor import DistributedExecutor
+from task_registry import task
+
+
+@pytest.fixture
+def executor(monkeypatch, tmp_path):
+    monkeypatch.setattr(distributed_executor, "Zeroconf", lambda: None)
+    ex = DistributedExecutor("secret", dispatchers=2, batch_window=0, result_dir=str(tmp_path))
+    yield ex
+    ex.shutdown()
+
+
+def slow_local(x):
+    time.sleep(0.5)
+    return x
+
+
+charged = []
+
+
+@task(idempotent=False)
+def charge_card(x):
+    charged.append(x)
+    return x
+
+
+def test_deadline_enforced_while_running_locally(executor, monkeypatch):
+    monkeypatch.setattr(executor, "_choose_peer", lambda spec=None, task=None: None)
+    start = time.monotonic()
+    future = executor.submit(slow_local, 1, deadline=0.1)
+    with pytest.raises(TimeoutError):
+        future.result(timeout=2)
+    assert time.monotonic() - start < 0.4
+
+
+def test_remote_timeout_not_rerun_locally_when_not_idempotent(executor, monkeypatch):
+    class Peer:
+        node_id = "p1"
+        address = "10.0.0.2:8000"
+        ip = "10.0.0.2"
+        port = 8000
+
+    def timed_out(url, task, timeout=10, **kwargs):
+        raise requests.ReadTimeout("no reply")
+
+    monkeypatch.setattr(executor, "_choose_peer", lambda spec=None, task=None: Peer())
+    monkeypatch.setattr(distributed_executor.wire_format, "post_task", timed_out)
+    charged.clear()
+    future = executor.submit(charge_card, 7)
+    with pytest.raises(TimeoutError):
+        future.result(timeout=2)
+    time.sleep(0.05)
+    assert charged == []
+
+
+def square(x):
+    return x * x
+
+
+def test_completed_task_id_found_after_restart(executor, monkeypatch, tmp_path):
+    monkeypatch.setattr(executor, "_choose_peer", lambda spec=None, task=None: None)
+    assert executor.submit(square, 6, task_id="sq-6").result(timeout=2) == 36
+    time.sleep(0.05)   # _store_result تعمل كـ done callback
+    restarted = DistributedExecutor("secret", dispatchers=1, batch_window=0,
+                                    result_dir=str(tmp_path))
+    try:
+        assert restarted.submit(square, 6, task_id="sq-6").result(timeout=0) == 36
+    finally:
+        restarted.shutdown()
+
+
+def test_only_caller_task_ids_are_written_to_disk(executor, monkeypatch, tmp_path):
+    monkeypatch.setattr(executor, "_choose_peer", lambda spec=None, task=None: None)
+    executor.submit(square, 2).result(timeout=2)
+    time.sleep(0.05)
+    assert list(tmp_path.iterdir()) == []
+    executor.submit(square, 3, task_id="sq-3").result(timeout=2)
+    time.sleep(0.05)
+    assert len(list(tmp_path.iterdir())) == 1
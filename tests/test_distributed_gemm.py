@@ -0,0 +1,42 @@
+import threading
+
+import numpy as np
+
+from distributed_gemm import distributed_matmul
+from generator_spec import GeneratorSpec
+from wire_format import decode, encode
+from your_tasks import matmul_block
+
+
+def _remote(sent):
+    """قرين وهمي: يمرّر الحمولة عبر wire_format وينفّذ matmul_block"""
+    def send(peer, payload):
+        payload = decode(encode(payload))
+        sent.append(payload["args"])
+        return {"result": matmul_block(*payload["args"])}
+    return send
+
+
+def test_spec_panels_match_full_product():
+    A = GeneratorSpec(1, (300, 200), block=64)
+    B = GeneratorSpec(2, (200, 150), block=64)
+    sent = []
+    C = distributed_matmul(A, B, peers=["p1:8000"], send=_remote(sent), col_block=64)
+    np.testing.assert_allclose(C, A.materialize() @ B.materialize())
+    # يُرسل وصف النافذة لا المصفوفة
+    assert all(isinstance(arg, GeneratorSpec) for args in sent for arg in args)
+
+
+def test_on_block_streams_without_collecting():
+    A = GeneratorSpec(3, (130, 70), block=32)
+    B = GeneratorSpec(4, (70, 90), block=32)
+    C = np.zeros((130, 90))
+    lock = threading.Lock()
+
+    def on_block(r0, r1, c0, c1, block):
+        with lock:
+            C[r0:r1, c0:c1] += block
+
+    assert distributed_matmul(A, B, peers=["p1:8000"], send=_remote([]),
+                              col_block=32, on_block=on_block) is None
+    np.testing.assert_allclose(C, A.materialize() @ B.materialize())
@@ -0,0 +1,52 @@
+# tests/test_hedged_offload.py - مهلة التحوّط لكل دالة وزمن الفائز وشكل نتيجة offload
+
+import time
+
+import offload_lib
+from peer_stats import get_peer_stats, MIN_LATENCY_SAMPLES
+
+SLOW, FAST = "10.3.0.1:7520", "10.3.0.2:7520"
+
+
+def test_hedge_uses_function_latency_and_reports_winner_time(monkeypatch):
+    stats = get_peer_stats()
+    for _ in range(MIN_LATENCY_SAMPLES):
+        stats.observe_latency(SLOW, 0.05, func="quick_task")
+    for _ in range(MIN_LATENCY_SAMPLES * 10):
+        stats.observe_latency(SLOW, 30.0, func="other_task")   # p95 عام لا يصلح
+
+    def fake_try_offload(peer, payload, stats=None, **kwargs):
+        time.sleep(2.0 if peer == SLOW else 0.05)
+        return {"result": peer}
+
+    monkeypatch.setattr(offload_lib, "try_offload", fake_try_offload)
+    start = time.perf_counter()
+    winner, result, winner_stats = offload_lib.hedged_offload(
+        [SLOW, FAST], {"func": "quick_task", "args": [], "kwargs": {}})
+    assert winner == FAST and result == {"result": FAST}
+    assert time.perf_counter() - start < 1.0
+    assert winner_stats["elapsed"] < 0.09      # لا يشمل انتظار التحوّط (0.05)
+
+
+def test_offload_returns_the_task_result_on_every_path(monkeypatch):
+    from offload_decision import Decision
+
+    def answer_for_shape_test(x):
+        return {"answer": x}
+
+    reply = {"result": {"answer": 7}, "host": "peer", "took": 0.01, "queue": 0}
+    target = {"peer": FAST}
+    monkeypatch.setattr(offload_lib, "ranked_peers", lambda: [FAST])
+    monkeypatch.setattr(offload_lib, "decide",
+                        lambda *a, **k: Decision("test", target["peer"], {}, "test"))
+    monkeypatch.setattr(offload_lib, "try_offload", lambda *a, **k: reply)
+    monkeypatch.setattr(offload_lib, "batched_offload", lambda *a, **k: reply)
+    monkeypatch.setattr(offload_lib, "hedged_offload", lambda *a, **k: (FAST, reply, {}))
+
+    remote = offload_lib.offload(answer_for_shape_test, hedge=False, batch=False)
+    batched = offload_lib.offload(answer_for_shape_test, hedge=False, batch=True)
+    hedged = offload_lib.offload(answer_for_shape_test, hedge=True)
+    assert remote(7) == batched(7) == hedged(7) == {"answer": 7}
+
+    target["peer"] = None
+    assert remote(7) == {"answer": 7}
@@ -0,0 +1,51 @@
+import json
+import os
+
+import pytest
+
+import worker_pool
+from job_manager import DONE, FAILED, JOB_SUFFIX, JobManager
+
+
+class InlinePool:
+    def run(self, fn, args, kwargs):
+        return fn(*args, **kwargs)
+
+
+@pytest.fixture(autouse=True)
+def inline_pool(monkeypatch):
+    monkeypatch.setattr(worker_pool, "get_worker_pool", lambda: InlinePool())
+
+
+def _finish(manager, job_id):
+    while manager.get(job_id).status not in (DONE, FAILED):
+        manager.wait(job_id, 1)
+    return manager.get(job_id)
+
+
+def test_job_status_and_result_survive_restart(tmp_path):
+    calls = []
+
+    def render(x):
+        calls.append(x)
+        return {"frames": x}
+
+    first = JobManager(result_dir=str(tmp_path))
+    first.submit(render, [3], job_id="job-1")
+    assert _finish(first, "job-1").status == DONE
+
+    restarted = JobManager(result_dir=str(tmp_path))
+    state = restarted.snapshot("job-1")
+    assert state["status"] == DONE and state["result"] == {"frames": 3}
+    # إعادة إرسال المعرّف نفسه بعد إعادة التشغيل لا تعيد التنفيذ
+    assert restarted.submit(render, [3], job_id="job-1").status == DONE
+    assert calls == [3]
+
+
+def test_unfinished_job_is_marked_interrupted_after_restart(tmp_path):
+    record = {"id": "job-2", "func": "render", "status": "running", "error": None,
+              "expected": None, "queue": 0, "created": 1.0, "started": 2.0, "finished": None}
+    with open(os.path.join(tmp_path, "x" + JOB_SUFFIX), "w") as f:
+        json.dump(record, f)
+    state = JobManager(result_dir=str(tmp_path)).snapshot("job-2")
+    assert state["status"] == FAILED and state["error"] == "interrupted"
@@ -0,0 +1,61 @@
+# tests/test_load_advertiser.py - نبض إعلان الحمل وانتهاء سجلات peer_table
+
+import time
+import socket
+
+from zeroconf import ServiceInfo
+
+from load_advertiser import LoadAdvertiser
+from peer_table import PeerTable
+
+TYPE = "_tasknode._tcp.local."
+NAME = f"node-a.{TYPE}"
+VALUES = {"cpu": 0.2, "mem": 1024.0, "queue": 0, "inflight": 0}
+
+
+class FakeZeroconf:
+    """يحاكي ذاكرة zeroconf المؤقتة: التحديث يصل للمتصفح فقط إن تغيّر TXT"""
+
+    def __init__(self, table=None):
+        self.table = table
+        self.info = None
+        self.updates = 0
+
+    def update_service(self, info):
+        changed = self.info is None or self.info.properties != info.properties
+        self.info = info
+        if changed and self.table is not None:
+            self.updates += 1
+            self.table.update_service(self, TYPE, info.name)
+
+    def get_service_info(self, type_, name):
+        return self.info
+
+
+def _info(props=None):
+    return ServiceInfo(TYPE, NAME, addresses=[socket.inet_aton("10.0.0.2")], port=7520,
+                       properties=props or {b"node_id": b"node-a", b"cores": b"4"})
+
+
+def test_republish_changes_txt_even_when_load_is_stable():
+    zc = FakeZeroconf()
+    advertiser = LoadAdvertiser(zc, _info(), heartbeat=1.0)
+    advertiser.publish(VALUES)
+    first = zc.info.properties
+    advertiser.publish(VALUES)
+    assert zc.info.properties != first
+    assert zc.info.properties[b"cores"] == b"4"
+
+
+def test_stable_node_is_refreshed_by_heartbeat():
+    table = PeerTable(zeroconf=object())
+    zc = FakeZeroconf(table)
+    advertiser = LoadAdvertiser(zc, _info(), heartbeat=0.05)
+    advertiser.publish(VALUES)
+    record = table.peers()[0]
+    time.sleep(0.2)                       # أكثر من HEARTBEAT_MISSES نبضات
+    assert record.expired(time.time())
+    advertiser.publish(VALUES)            # نبض بالحمل نفسه
+    assert zc.updates == 2
+    assert not record.expired(time.time())
+    assert "seq" not in record.properties
@@ -0,0 +1,100 @@
+import time
+
+import pytest
+
+import micro_batcher
+import wire_format
+from micro_batcher import MicroBatcher
+from peer_stats import get_peer_stats
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, reply):
+        self.content = wire_format.encode(reply)
+        self.headers = {"Content-Type": wire_format.CONTENT_TYPE}
+
+    def raise_for_status(self):
+        pass
+
+
+def _serve(monkeypatch, handler):
+    """خادم /run_batch وهمي: handler(tasks) يعيد قائمة الردود"""
+    def post(url, data=None, timeout=None, headers=None):
+        tasks = wire_format.decode(data)["tasks"]
+        return FakeResponse({"results": handler(tasks), "took": 0.5, "queue": 0})
+    monkeypatch.setattr(micro_batcher.http_pool, "post", post)
+
+
+def _batch(peer, payloads):
+    """إرسال الحمولات دفعة واحدة (نافذة طويلة وحجم أقصى = عددها)"""
+    batcher = MicroBatcher(window=10, max_size=len(payloads))
+    return [batcher.submit(peer, p) for p in payloads]
+
+
+def test_results_follow_submission_order_and_errors_stay_per_item(monkeypatch):
+    def handler(tasks):
+        replies = []
+        for i, t in enumerate(tasks):
+            x = t["args"][0]
+            replies.append({"index": i, "error": "boom"} if x == 2 else
+                           {"index": i, "result": x * 10, "took": 0.1})
+        return list(reversed(replies))   # ترتيب الاكتمال لا ترتيب الإرسال
+    _serve(monkeypatch, handler)
+    futures = _batch("10.0.0.41:8000", [{"func": "sq", "args": [x]} for x in range(4)])
+    assert [f.result(1)["result"] for f in (futures[0], futures[1], futures[3])] == [0, 10, 30]
+    with pytest.raises(RuntimeError, match="boom"):
+        futures[2].result(1)
+
+
+def test_missing_replies_fail_their_futures(monkeypatch):
+    _serve(monkeypatch, lambda tasks: [{"index": 0, "result": "a", "took": 0.1}])
+    futures = _batch("10.0.0.42:8000", [{"func": "sq", "args": [x]} for x in range(3)])
+    assert futures[0].result(1)["result"] == "a"
+    for future in futures[1:]:
+        with pytest.raises(RuntimeError):
+            future.result(1)
+
+
+def test_latency_is_per_item_not_whole_batch(monkeypatch):
+    _serve(monkeypatch, lambda tasks: [{"index": i, "result": i, "took": 0.1}
+                                       for i in range(len(tasks))])
+    peer = "10.0.0.43:8000"
+    for f in _batch(peer, [{"func": "tiny", "args": [x]} for x in range(4)]):
+        f.result(1)
+    samples = get_peer_stats()._record(peer).func_latencies["tiny"]
+    assert len(samples) == 4
+    # took (0.1) + حصة العنصر من الشبكة، لا زمن الدفعة كلها (took الدفعة 0.5)
+    assert all(0.1 <= s < 0.2 for s in samples)
+
+
+class NotFoundResponse(FakeResponse):
+    status_code = 404
+
+    def __init__(self):
+        self.content = b'{"detail":"Not Found"}'
+        self.headers = {"Content-Type": wire_format.JSON_CONTENT_TYPE}
+
+    def raise_for_status(self):
+        raise AssertionError("404 لم يُعامل كـ /run_batch غير مدعوم")
+
+
+def test_fastapi_json_404_means_batch_unsupported(monkeypatch):
+    monkeypatch.setattr(micro_batcher.http_pool, "post", lambda *a, **k: NotFoundResponse())
+    with pytest.raises(micro_batcher.BatchUnsupported):
+        micro_batcher.post_batch("10.0.0.44:8000", [{"func": "sq", "args": [1]}], timeout=1)
+
+
+def test_unsupported_peer_items_are_sent_in_parallel(monkeypatch):
+    monkeypatch.setattr(micro_batcher.http_pool, "post", lambda *a, **k: NotFoundResponse())
+
+    def post_task(url, payload, timeout=None, stats=None):
+        time.sleep(0.2)
+        return {"result": payload["args"][0], "took": 0.2}
+    monkeypatch.setattr(micro_batcher.wire_format, "post_task", post_task)
+
+    start = time.perf_counter()
+    futures = _batch("10.0.0.45:8000", [{"func": "sq", "args": [x]} for x in range(4)])
+    assert [f.result(2)["result"] for f in futures] == [0, 1, 2, 3]
+    assert time.perf_counter() - start < 0.6
@@ -0,0 +1,65 @@
+# tests/test_offload_decision.py - تقديرات نقطة التعادل وسجل القرارات
+
+import json
+import time
+
+import offload_decision
+from cost_model import Prediction
+from offload_decision import decide, remote_estimate
+from peer_stats import get_peer_stats
+
+PEER = "10.2.0.1:7520"
+
+
+def test_learned_transfer_bytes_are_not_double_counted():
+    request, total = 4 * 1024**2, 5 * 1024**2
+    decision = decide("f", Prediction(1.0, 0.5, total, 10), [PEER], 0.0, request, False)
+    link = get_peer_stats().link(PEER)
+    expected = link.rtt + total / link.bandwidth + (link.queue_depth + link.outstanding + 1) * 0.5
+    assert abs(decision.estimates[PEER] - expected) < 1e-9
+    assert decision.estimates[PEER] == remote_estimate(PEER, 0.5, request, total - request)
+
+
+def test_declared_response_size_is_used_until_learned():
+    with_hint = decide("f", Prediction(1.0, 0.5, None, 10), [PEER], 0.0, 100, False,
+                       response_bytes=50 * 1024**2)
+    without = decide("f", Prediction(1.0, 0.5, None, 10), [PEER], 0.0, 100, False)
+    assert with_hint.estimates[PEER] > without.estimates[PEER]
+
+
+def test_decision_log_is_off_by_default_and_written_in_background(tmp_path, monkeypatch):
+    assert offload_decision.DECISION_LOG == ""
+    path = tmp_path / "decisions.jsonl"
+    monkeypatch.setattr(offload_decision, "DECISION_LOG", str(path))
+    decision = decide("f", Prediction(None, None, None, 0), [PEER], 0.0, 100, True)
+    offload_decision.log_outcome(decision, 0.25)
+    deadline = time.time() + 2
+    while time.time() < deadline and (not path.exists() or len(path.read_text().splitlines()) < 2):
+        time.sleep(0.01)
+    events = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [e["event"] for e in events] == ["decision", "outcome"]
+    assert events[0]["target"] == PEER
+
+
+def test_exploration_measures_the_target_the_model_does_not_pick(monkeypatch):
+    remote_slow = Prediction(0.01, 100.0, None, 10)
+    assert decide("f", remote_slow, [PEER], 0.0, 100, False).target is None
+
+    monkeypatch.setattr(offload_decision, "EXPLORE_RATE", 1.0)
+    explored = decide("f", remote_slow, [PEER], 0.0, 100, False)
+    assert explored.target == PEER and explored.reason == "explore"
+    # النموذج لا يعرف الزمن البعيد بعد: الاستكشاف يجلب له عينات
+    assert decide("f", Prediction(0.01, None, None, 10), [PEER], 0.0, 100, False).target == PEER
+    assert decide("f", remote_slow, [], 0.0, 100, False).target is None
+
+
+def test_predictions_wait_for_as_many_samples_as_parameters(tmp_path):
+    from cost_model import CostModel, MAX_FEATURES, MIN_SAMPLES
+
+    assert MIN_SAMPLES >= MAX_FEATURES + 1
+    model = CostModel(path=str(tmp_path / "model.json"))
+    for n in range(1, MIN_SAMPLES):
+        model.record("g", (n,), {}, local_runtime=0.1 * n)
+    assert model.predict("g", (3,), {}).local is None
+    model.record("g", (MIN_SAMPLES,), {}, local_runtime=0.1 * MIN_SAMPLES)
+    assert model.predict("g", (3,), {}).local is not None
@@ -0,0 +1,48 @@
+# tests/test_peer_directory.py - دليل offload يقرأ عقد _tasknode من جدول العقد المشترك
+
+import socket
+
+from zeroconf import ServiceInfo
+
+from peer_directory import PeerDirectory
+from peer_table import SERVICE_TYPE, PeerTable
+
+NAME = f"node-a.{SERVICE_TYPE}"
+
+
+class FakeZeroconf:
+    def __init__(self, props):
+        self.props = props
+
+    def get_service_info(self, type_, name):
+        return ServiceInfo(SERVICE_TYPE, NAME, addresses=[socket.inet_aton("10.0.0.7")],
+                           port=7520, properties=self.props)
+
+
+def test_directory_follows_the_shared_table_with_live_load():
+    table = PeerTable(zeroconf=object())
+    directory = PeerDirectory(table=table).start()
+    try:
+        zc = FakeZeroconf({b"node_id": b"node-a", b"load": b"0.1", b"cpu": b"0.35"})
+        table.add_service(zc, SERVICE_TYPE, NAME)
+        assert directory.peers() == ["10.0.0.7:7520"]
+        assert directory.load_of("10.0.0.7:7520") == 0.35
+
+        zc.props = {b"node_id": b"node-a", b"load": b"0.1", b"cpu": b"0.8"}
+        table.update_service(zc, SERVICE_TYPE, NAME)
+        assert directory.load_of("10.0.0.7:7520") == 0.8
+
+        table.remove_service(zc, SERVICE_TYPE, NAME)
+        assert directory.peers() == []
+    finally:
+        directory.close()
+
+
+def test_directory_picks_up_nodes_already_in_the_table():
+    table = PeerTable(zeroconf=object())
+    table.upsert("node-b", f"node-b.{SERVICE_TYPE}", "10.0.0.8", 7520, load=0.2)
+    directory = PeerDirectory(table=table).start()
+    try:
+        assert directory.peers() == ["10.0.0.8:7520"]
+    finally:
+        directory.close()
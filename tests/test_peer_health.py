@@ -0,0 +1,77 @@
+# tests/test_peer_health.py - حالات قاطع الدائرة والمهلات المتكيّفة
+
+import time
+
+import pytest
+import requests
+
+import peer_health
+from peer_health import PeerHealth, CLOSED, OPEN, HALF_OPEN, FAILURE_THRESHOLD
+from peer_stats import get_peer_stats, MIN_LATENCY_SAMPLES
+
+
+@pytest.fixture
+def health(monkeypatch):
+    monkeypatch.setattr(peer_health, "BASE_COOLDOWN", 0.05)
+    return PeerHealth()
+
+
+def test_breaker_opens_after_threshold_and_recovers_through_half_open(health):
+    peer = "10.9.0.1:7520"
+    for _ in range(FAILURE_THRESHOLD - 1):
+        health.record_failure(peer)
+    assert health.state(peer) == CLOSED
+    health.record_failure(peer)
+    assert health.state(peer) == OPEN
+    assert not health.allow(peer)
+
+    time.sleep(0.06)
+    assert health.allow(peer)              # طلب تجريبي واحد
+    assert health.state(peer) == HALF_OPEN
+    assert not health.allow(peer)
+    health.record_success(peer)
+    assert health.state(peer) == CLOSED
+    assert health.allow(peer)
+
+
+def test_failed_probe_reopens_with_doubled_cooldown(health):
+    peer = "10.9.0.2:7520"
+    for _ in range(FAILURE_THRESHOLD):
+        health.record_failure(peer)
+    time.sleep(0.06)
+    assert health.allow(peer)
+    health.record_failure(peer)
+    assert health.state(peer) == OPEN
+    time.sleep(0.06)
+    assert not health.allow(peer)          # التبريد تضاعف
+    time.sleep(0.06)
+    assert health.allow(peer)
+
+
+def test_timeout_without_samples_is_not_a_failure(health):
+    peer = "10.9.0.3:7520"
+    for _ in range(FAILURE_THRESHOLD + 2):
+        health.record_error(peer, requests.ReadTimeout(), "matmul_block")
+    assert health.state(peer) == CLOSED
+    for _ in range(FAILURE_THRESHOLD):
+        health.record_error(peer, requests.ConnectionError(), "matmul_block")
+    assert health.state(peer) == OPEN
+
+
+def test_timeout_with_samples_counts_as_failure(health):
+    peer = "10.9.0.4:7520"
+    for _ in range(MIN_LATENCY_SAMPLES):
+        get_peer_stats().observe_latency(peer, 0.1, func="f")
+    for _ in range(FAILURE_THRESHOLD):
+        health.record_error(peer, requests.ReadTimeout(), "f")
+    assert health.state(peer) == OPEN
+
+
+def test_timeout_budget_includes_transfer_time(health):
+    peer = "10.9.0.5:7520"
+    bandwidth = get_peer_stats().link(peer).bandwidth
+    small = health.timeout_for(peer, "g", expected=0.01)
+    large = health.timeout_for(peer, "g", expected=0.01, nbytes=int(bandwidth * 20))
+    assert small == peer_health.MIN_TIMEOUT
+    assert large >= 2 * 20
+    assert health.timeout_for(peer, "g", default=10, nbytes=int(bandwidth * 30)) >= 60
@@ -0,0 +1,37 @@
+# tests/test_peer_prober.py - أخطاء الفحص التي تُحتسب على قاطع الدائرة
+
+import pytest
+import requests
+
+import peer_prober
+from peer_health import PeerHealth, FAILURE_THRESHOLD, CLOSED, OPEN
+from peer_prober import PeerProber
+
+
+class BadJson:
+    def json(self):
+        raise ValueError("not json")
+
+
+@pytest.fixture
+def health(monkeypatch):
+    health = PeerHealth()
+    monkeypatch.setattr(peer_prober, "get_peer_health", lambda: health)
+    return health
+
+
+def test_only_unreachable_peers_count_as_failures(health, monkeypatch):
+    prober = PeerProber(lambda: [])
+    peer = "10.8.0.1:7520"
+
+    monkeypatch.setattr(peer_prober.http_pool, "get", lambda *a, **k: BadJson())
+    for _ in range(FAILURE_THRESHOLD + 1):
+        prober._probe(peer)
+    assert health.state(peer) == CLOSED
+
+    def unreachable(*a, **k):
+        raise requests.ConnectTimeout("down")
+    monkeypatch.setattr(peer_prober.http_pool, "get", unreachable)
+    for _ in range(FAILURE_THRESHOLD):
+        prober._probe(peer)
+    assert health.state(peer) == OPEN
@@ -0,0 +1,45 @@
+# tests/test_peer_selection.py - الفئة الأقرب أولاً والسياسة داخلها
+
+import pytest
+
+import offload_lib
+from cost_model import Prediction
+from offload_decision import decide
+from peer_selection import POLICIES
+from peer_stats import get_peer_stats
+
+LAN, WAN = "10.1.0.1:7520", "203.0.113.9:7520"
+
+
+@pytest.fixture
+def measured():
+    stats = get_peer_stats()
+    for _ in range(3):
+        stats.observe_rtt(LAN, 0.001)
+        stats.observe_rtt(WAN, 0.5)
+    # الجهاز البعيد أقل طلبات جارية وأسرع ظاهرياً: لا يجوز أن يتقدّم على فئته
+    stats.observe_latency(LAN, 0.3)
+    stats.observe_latency(WAN, 0.01)
+    return [WAN, LAN]
+
+
+@pytest.mark.parametrize("name", sorted(POLICIES))
+def test_order_by_tier_keeps_nearest_tier_first(measured, name):
+    policy = POLICIES[name]()
+    for _ in range(200):
+        assert policy.order_by_tier(measured)[0] == LAN
+
+
+def test_fallback_decision_targets_nearest_tier(measured, monkeypatch):
+    class Directory:
+        def peers(self):
+            return list(measured)
+
+        def load_of(self, address):
+            return None
+
+    monkeypatch.setattr(offload_lib, "get_peer_directory", lambda: Directory())
+    for _ in range(200):
+        decision = decide("f", Prediction(None, None, None, 0), offload_lib.ranked_peers(), 0.9,
+                          100, fallback_remote=True)
+        assert decision.target == LAN
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from prime_sieve import count_primes, distributed_prime_calculation, primes_up_to
+
+
+def _reference(n):
+    """الأوليات حتى n بالقسمة التجريبية"""
+    return [p for p in range(2, n + 1) if all(p % d for d in range(2, int(p ** 0.5) + 1))]
+
+
+@pytest.mark.parametrize("n", [0, 1, 2, 3, 10, 97, 100, 1000, 4099])
+def test_count_primes_matches_reference(n):
+    assert count_primes(n, segment_size=64) == len(_reference(n))
+    assert primes_up_to(n).tolist() == _reference(n)
+
+
+def test_distributed_bitset_matches_reference():
+    n = 3001
+    result = distributed_prime_calculation(n, mode="bitset", segment_size=256, local_workers=2)
+    bits = np.unpackbits(result["bitset"], count=n + 1)
+    assert np.flatnonzero(bits).tolist() == _reference(n)
+    assert result["count"] == len(_reference(n))
+
+
+def test_bitset_rejects_unaligned_segments():
+    with pytest.raises(ValueError):
+        distributed_prime_calculation(3001, mode="bitset", segment_size=100)
+
+
+def test_prime_calculation_keeps_the_primes_key_above_the_list_limit(monkeypatch):
+    import offload_lib
+
+    monkeypatch.setattr(offload_lib, "PRIMES_LIST_LIMIT", 50)
+    monkeypatch.setattr(offload_lib, "ranked_peers", lambda: [])
+    compute = offload_lib.prime_calculation.__wrapped__   # دون memo_cache (الحد ليس في بصمة الشيفرة)
+    small = compute(50)
+    large = compute(1000)
+    assert small == {"primes_count": 15, "primes": _reference(50), "truncated": False}
+    assert large == {"primes_count": len(_reference(1000)), "primes": None, "truncated": True}
@@ -0,0 +1,49 @@
+import numpy as np
+
+from result_store import ResultStore
+
+
+def test_large_result_spills_and_reloads_after_restart(tmp_path):
+    big = np.arange(1000, dtype=np.float64)
+    store = ResultStore(spill_dir=str(tmp_path), spill_threshold=1024)
+    store.put("big", big)
+    store.put("small", 42)
+    assert store.stats()["disk_bytes"] > 0
+    np.testing.assert_array_equal(store.get("big"), big)
+
+    reloaded = ResultStore(spill_dir=str(tmp_path), spill_threshold=1024)
+    np.testing.assert_array_equal(reloaded.get("big"), big)
+    assert reloaded.get("small") is None   # بلا write_through تبقى الصغيرة في الذاكرة فقط
+
+
+def test_write_through_persists_every_result(tmp_path):
+    store = ResultStore(spill_dir=str(tmp_path), write_through=True)
+    store.put("t1", {"answer": 42})
+    assert store.stats()["memory_bytes"] > 0 and store.stats()["disk_bytes"] > 0
+    assert ResultStore(spill_dir=str(tmp_path)).get("t1") == {"answer": 42}
+
+
+def test_memory_pressure_drops_only_the_memory_copy(tmp_path):
+    store = ResultStore(spill_dir=str(tmp_path), write_through=True, max_bytes=100)
+    for i in range(5):
+        store.put(f"t{i}", list(range(20)))
+    assert len(store) == 5
+    assert store.stats()["memory_bytes"] <= 100
+    assert [store.get(f"t{i}") for i in range(5)] == [list(range(20))] * 5
+
+
+def test_discard_removes_spilled_file(tmp_path):
+    store = ResultStore(spill_dir=str(tmp_path), write_through=True)
+    store.put("t1", 1)
+    store.discard("t1")
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_durable_put_and_tuples_reload_as_lists(tmp_path):
+    store = ResultStore(spill_dir=str(tmp_path))
+    store.put("kept", (1, 2), durable=True)
+    store.put("memory-only", (1, 2))
+    assert store.get("kept") == (1, 2)
+    reloaded = ResultStore(spill_dir=str(tmp_path))
+    assert reloaded.get("kept") == [1, 2]
+    assert reloaded.get("memory-only") is None
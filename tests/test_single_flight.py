@@ -0,0 +1,147 @@
+# tests/test_single_flight.py - دلالات coalesce و memoize ومتى يُسمح بالدمج
+
+import threading
+import time
+
+import worker_pool
+from memo_cache import memoize
+from single_flight import coalesce, share_rule
+from task_registry import task
+
+
+def _concurrently(fn, *args, n=4):
+    results = [None] * n
+
+    def run(i):
+        results[i] = fn(*args)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def _slow_counter():
+    calls = []
+
+    def fn(x):
+        calls.append(x)
+        time.sleep(0.1)
+        return [x]
+    return fn, calls
+
+
+def test_coalesce_shares_one_execution_between_concurrent_callers():
+    fn, calls = _slow_counter()
+    results = _concurrently(coalesce(fn), 3)
+    assert calls == [3]
+    assert all(r is results[0] for r in results)
+
+
+def test_coalesce_skips_calls_that_fail_the_condition():
+    fn, calls = _slow_counter()
+    _concurrently(coalesce(fn, when=lambda x: x > 10), 3)
+    assert len(calls) == 4
+
+
+def test_coalesce_propagates_the_leader_exception_to_waiters():
+    def boom(x):
+        time.sleep(0.05)
+        raise ValueError(x)
+
+    errors = []
+    wrapped = coalesce(boom)
+
+    def run():
+        try:
+            wrapped(1)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(errors) == 3
+
+
+def test_memoize_serves_repeats_and_respects_when():
+    calls = []
+
+    @memoize(when=lambda n: n % 2 == 0)
+    def square_for_memo_test(n):
+        calls.append(n)
+        return n * n
+
+    assert square_for_memo_test(4) == 16
+    assert square_for_memo_test(4) == 16
+    assert square_for_memo_test(3) == 9
+    assert square_for_memo_test(3) == 9
+    assert calls == [4, 3, 3]
+
+
+def test_share_rule_follows_declared_flags():
+    @task(idempotent=True)
+    def random_task_for_share_test(n):
+        return n
+
+    @task(idempotent=True, cacheable=True)
+    def pure_task_for_share_test(n):
+        return n
+
+    def undeclared(n):
+        return n
+
+    assert not share_rule(random_task_for_share_test)
+    assert share_rule(pure_task_for_share_test) is True
+    assert not share_rule(undeclared)
+
+
+def test_worker_pool_does_not_share_non_deterministic_tasks(monkeypatch):
+    class InlinePool:
+        def run(self, fn, args, kwargs):
+            return fn(*args, **kwargs)
+
+    monkeypatch.setattr(worker_pool, "get_worker_pool", lambda: InlinePool())
+    fn, calls = _slow_counter()
+    _concurrently(lambda x: worker_pool.execute(fn, [x], {}), 5)
+    assert len(calls) == 4
+
+    pure, pure_calls = _slow_counter()
+    task(idempotent=True, cacheable=True, name="pure_for_pool_test")(pure)
+    _concurrently(lambda x: worker_pool.execute(pure, [x], {}), time.time())
+    assert len(pure_calls) == 1
+
+
+def test_share_rule_follows_deterministic_flag():
+    @task(idempotent=True, deterministic=True)
+    def deterministic_task_for_share_test(n):
+        return n
+
+    @task(cacheable=True, deterministic=False)
+    def opted_out_task_for_share_test(n):
+        return n
+
+    assert share_rule(deterministic_task_for_share_test) is True
+    assert not share_rule(opted_out_task_for_share_test)
+
+
+def test_concurrent_data_processing_calls_run_once(monkeypatch):
+    import offload_lib
+    from your_tasks import data_processing
+
+    calls = []
+
+    def counting_run_local(func, args, kwargs):
+        calls.append(args)
+        time.sleep(0.1)
+        return func(*args, **kwargs)
+
+    monkeypatch.setattr(offload_lib, "ranked_peers", lambda: [])
+    monkeypatch.setattr(offload_lib, "run_local", counting_run_local)
+    results = _concurrently(data_processing, 100)
+    assert calls == [(100,)]
+    assert all(r == {"processed": 100, "status": "completed"} for r in results)
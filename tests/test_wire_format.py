@@ -0,0 +1,68 @@
+import json
+
+import numpy as np
+import pytest
+
+import wire_format
+from generator_spec import GeneratorSpec
+
+
+def _payload():
+    return {"func": "matmul_block", "kwargs": {"scale": np.float32(2.5)},
+            "args": [np.arange(12, dtype=np.float64).reshape(3, 4),
+                     np.array([[1, 2], [3, 4]], dtype=np.int32),
+                     np.zeros((0, 5), dtype=np.uint8),   # بعد صفري
+                     GeneratorSpec(7, (64, 64), block=32).panel(0, 16, 8, 40),
+                     {"nested": [np.array([True, False]), "text", None, 3]}]}
+
+
+def test_binary_round_trip_preserves_arrays_and_specs():
+    sent = _payload()
+    got = wire_format.decode(wire_format.encode(sent))
+    assert got["func"] == "matmul_block"
+    assert got["kwargs"]["scale"] == pytest.approx(2.5)
+    for before, after in zip(sent["args"][:3], got["args"][:3]):
+        assert after.dtype == before.dtype and after.shape == before.shape
+        np.testing.assert_array_equal(after, before)
+    assert got["args"][3] == sent["args"][3]
+    np.testing.assert_array_equal(got["args"][3].materialize(), sent["args"][3].materialize())
+    nested = got["args"][4]["nested"]
+    np.testing.assert_array_equal(nested[0], [True, False])
+    assert nested[1:] == ["text", None, 3]
+
+
+def test_buffers_are_aligned_and_read_only():
+    frame = wire_format.encode({"a": np.ones(3, dtype=np.int8), "b": np.ones(5)})
+    got = wire_format.decode(frame)
+    for arr in got.values():
+        assert not arr.flags.writeable
+    # الإزاحات من بداية منطقة المخازن مضاعفات ALIGNMENT
+    header_len = wire_format._LEN.unpack_from(frame, len(wire_format.MAGIC))[0]
+    start = len(wire_format.MAGIC) + wire_format._LEN.size
+    header = json.loads(frame[start:start + header_len])
+    assert all(offset % wire_format.ALIGNMENT == 0 for offset, _ in header["buffers"])
+
+
+def test_json_fallback_round_trip():
+    sent = _payload()
+    body, content_type = wire_format.encode_for(sent, accept=wire_format.JSON_CONTENT_TYPE)
+    assert content_type == wire_format.JSON_CONTENT_TYPE
+    got = wire_format.decode_body(body, content_type)
+    assert got["args"][0] == sent["args"][0].tolist()
+    assert got["args"][3] == sent["args"][3]
+
+
+@pytest.mark.parametrize("content_type", [wire_format.STREAM_CONTENT_TYPE,
+                                          wire_format.NDJSON_CONTENT_TYPE])
+def test_stream_round_trip(content_type):
+    items = [{"index": i, "result": np.full(3, i)} for i in range(4)]
+    data = b"".join(wire_format.stream_chunk(item, content_type) for item in items)
+    chunks = [data[i:i + 7] for i in range(0, len(data), 7)]   # كتل لا تتبع حدود الإطارات
+    got = list(wire_format.iter_stream(chunks, content_type))
+    assert [g["index"] for g in got] == [0, 1, 2, 3]
+    assert [list(g["result"]) for g in got] == [[i] * 3 for i in range(4)]
+
+
+def test_rejects_foreign_frame():
+    with pytest.raises(ValueError):
+        wire_format.decode(b"XXXX" + b"\0" * 8)
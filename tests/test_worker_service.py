@@ -0,0 +1,75 @@
+import time
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import job_manager
+import wire_format
+import worker_pool
+import worker_service
+from job_manager import JobManager
+
+
+class InlinePool:
+    def run(self, fn, args, kwargs):
+        return fn(*args, **kwargs)
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setattr(worker_pool, "get_worker_pool", lambda: InlinePool())
+    monkeypatch.setattr(job_manager, "_manager", JobManager(result_dir=str(tmp_path)))
+    return TestClient(worker_service.app)   # بلا with: لا يُسخَّن مجمع العمليات
+
+
+def test_run_json(client):
+    reply = client.post("/run", json={"func": "multiply_task", "args": [6, 7]})
+    assert reply.status_code == 200
+    assert reply.json()["result"] == {"result": 42}
+
+
+def test_run_binary_round_trip(client):
+    A = np.arange(6.0).reshape(2, 3)
+    B = np.ones((3, 2))
+    reply = client.post("/run", content=wire_format.encode(
+        {"func": "matmul_block", "args": [A, B]}), headers={
+        "Content-Type": wire_format.CONTENT_TYPE, "Accept": wire_format.CONTENT_TYPE})
+    assert reply.headers["content-type"] == wire_format.CONTENT_TYPE
+    np.testing.assert_array_equal(wire_format.decode(reply.content)["result"], A @ B)
+
+
+def test_run_rejects_unregistered_function(client):
+    for name in ("no_such_task", "_lines", "materialize"):
+        reply = client.post("/run", json={"func": name, "args": []})
+        assert reply.status_code == 404
+
+
+def test_run_batch_keeps_order_and_per_item_errors(client):
+    tasks = [{"func": "multiply_task", "args": [i, 10]} for i in range(3)]
+    tasks.insert(1, {"func": "no_such_task", "args": []})
+    results = client.post("/run_batch", json={"tasks": tasks}).json()["results"]
+    assert [r["index"] for r in results] == [0, 1, 2, 3]
+    assert results[1]["error"] == "function-not-found"
+    assert [r["result"]["result"] for r in results if "result" in r] == [0, 10, 20]
+
+
+def test_run_batch_stream(client):
+    tasks = [{"func": "multiply_task", "args": [i, 2]} for i in range(4)]
+    reply = client.post("/run_batch?stream=1", json={"tasks": tasks})
+    items = list(wire_format.iter_stream([reply.content], reply.headers["content-type"]))
+    assert sorted(i["result"]["result"] for i in items) == [0, 2, 4, 6]
+
+
+def test_jobs_submit_poll_and_dedup(client):
+    submitted = client.post("/jobs", json={"func": "multiply_task", "args": [3, 4],
+                                           "job_id": "job-a"})
+    assert submitted.status_code == 202 and submitted.json()["job_id"] == "job-a"
+    deadline = time.time() + 5
+    while (state := client.get("/jobs/job-a").json())["status"] not in ("done", "error"):
+        assert time.time() < deadline
+        time.sleep(0.01)
+    assert state["status"] == "done" and state["result"] == {"result": 12}
+    again = client.post("/jobs", json={"func": "multiply_task", "args": [3, 4], "job_id": "job-a"})
+    assert again.json()["status"] == "done"
+    assert client.get("/jobs/unknown").status_code == 404
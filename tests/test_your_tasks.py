@@ -0,0 +1,15 @@
+import pytest
+
+from task_registry import get_task_spec
+from your_tasks import _lines
+
+
+@pytest.mark.parametrize("resolution, lines", [
+    ("1920x1080", 1080), ("1080p", 1080), ("4k", 2160), ("8K", 4320), (720, 720)])
+def test_lines_from_resolution(resolution, lines):
+    assert _lines(resolution) == lines
+
+
+def test_unknown_resolution_falls_back_to_default_cost():
+    spec = get_task_spec("process_game_stream")
+    assert spec.complexity((None, 60, "ultra"), {}, default=7) == 7
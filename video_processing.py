@@ -6,7 +6,13 @@ import time
 import logging
 from functools import wraps
 from processor_manager import should_offload
-from remote_executor import execute_remotely
+from remote_executor import execute_remotely, REMOTE_PEER
+from cost_model import get_cost_model, run_local
+from offload_decision import decide, log_outcome
+from load_sampler import current_load
+from task_registry import task_complexity
+from peer_health import get_peer_health
+import wire_format
 
 logging.basicConfig(level=logging.INFO)
 
@@ -14,29 +20,32 @@ def video_offload(func):
     """ديكوراتور خاص بمعالجة الفيديو"""
     @wraps(func)
     def wrapper(*args, **kwargs):
-        complexity = estimate_video_complexity(func, args, kwargs)
+        complexity = task_complexity(func, args, kwargs, default=50)  # task_registry
+        model = get_cost_model()
+        prediction = model.predict(func.__name__, args, kwargs)
+        decision = decide(func.__name__, prediction, get_peer_health().healthy([REMOTE_PEER]),
+                          current_load().cpu_ewma,
+                          wire_format.estimated_size([args, kwargs]),
+                          fallback_remote=complexity > 80 or should_offload(complexity))
         
-        if complexity > 80 or should_offload(complexity):
+        if decision.target is not None:
             logging.info(f"📹 إرسال مهمة الفيديو {func.__name__} للمعالجة الموزعة")
-            return execute_remotely(func.__name__, args, kwargs)
+            stats = {}
+            result = execute_remotely(func.__name__, args, kwargs, stats=stats,
+                                      expected=prediction.remote)
+            if "compute" in stats:
+                model.record(func.__name__, args, kwargs, remote_runtime=stats["compute"],
+                             transfer_bytes=stats["bytes"])
+            log_outcome(decision, stats.get("elapsed"), ok="compute" in stats)
+            return result
         
         logging.info(f"📹 معالجة الفيديو محلياً: {func.__name__}")
-        return func(*args, **kwargs)
+        start = time.perf_counter()
+        result = run_local(func, args, kwargs)
+        log_outcome(decision, time.perf_counter() - start)
+        return result
     return wrapper
 
-def estimate_video_complexity(func, args, kwargs):
-    """تقدير تعقيد معالجة الفيديو"""
-    if func.__name__ == "video_format_conversion":
-        return args[0] * args[1] / 1000  # الطول × الجودة
-    elif func.__name__ == "video_effects_processing":
-        return args[1] * 15  # عدد التأثيرات × 15
-    elif func.__name__ == "video_compression":
-        return args[0] / 5  # حجم الملف / 5
-    elif func.__name__ == "render_3d_scene":
-        return args[0] * args[1] / 100  # عدد الكائنات × دقة الصورة
-    elif func.__name__ == "physics_simulation":
-        return args[0] * args[1] / 50  # عدد الكائنات × الإطارات
-    return 50  # قيمة افتراضية متوسطة
 
 @video_offload
 def video_format_conversion(duration_seconds, quality_level, input_format="mp4", output_format="avi"):
@@ -0,0 +1,239 @@
+# wire_format.py
+"""
+صيغة نقل ثنائية لوسائط المهام ونتائجها بدلاً من ndarray.tolist() داخل JSON.
+
+الإطار:
+    MAGIC (4 بايت) | طول الترويسة uint32 LE | ترويسة JSON | حشو | المخازن
+
+الترويسة تحمل بنية الحمولة مع عناصر نائبة للمصفوفات
+{"__ndarray__": i, "dtype": "...", "shape": [...]} وجدول إزاحات المخازن.
+أوصاف المولِّدات (GeneratorSpec) تُرسل كـ {"__genspec__": {...}} بالصيغتين.
+كل مخزن يبدأ على حد ALIGNMENT بايت، ويُفك بـ np.frombuffer مباشرة على
+ذاكرة جسم الطلب دون نسخ وسيطة (المصفوفات الناتجة للقراءة فقط).
+
+التفاوض عبر Content-Type / Accept: العميل يرسل CONTENT_TYPE ويقبل الصيغتين،
+والخادم يرد بالثنائي إن طُلب، وإلا بـ JSON بعد تحويل المصفوفات إلى قوائم.
+
+الردود المتدفقة (مثل /run_batch?stream=1) سلسلة إطارات كل منها مسبوق بطوله
+uint32 LE (STREAM_CONTENT_TYPE)، أو سطور JSON (NDJSON_CONTENT_TYPE).
+"""
+
+import json
+import struct
+
+import numpy as np
+
+from generator_spec import GeneratorSpec
+
+CONTENT_TYPE = "application/x-dts-frame"
+JSON_CONTENT_TYPE = "application/json"
+STREAM_CONTENT_TYPE = "application/x-dts-stream"
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+MAGIC = b"DTS1"
+ALIGNMENT = 64
+_LEN = struct.Struct("<I")
+
+
+def is_binary(content_type):
+    return bool(content_type) and content_type.split(";")[0].strip() == CONTENT_TYPE
+
+
+def accepts_binary(accept):
+    return bool(accept) and CONTENT_TYPE in accept
+
+
+# ------------------------------------------------------------
+# الترميز
+# ------------------------------------------------------------
+def _pad(n):
+    return (-n) % ALIGNMENT
+
+
+def _to_tree(obj, arrays):
+    """استبدال المصفوفات بعناصر نائبة وجمعها في arrays"""
+    if isinstance(obj, np.ndarray):
+        if obj.dtype.hasobject:
+            return _to_tree(obj.tolist(), arrays)
+        arr = np.ascontiguousarray(obj)
+        arrays.append(arr)
+        return {"__ndarray__": len(arrays) - 1, "dtype": arr.dtype.str, "shape": list(arr.shape)}
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, GeneratorSpec):
+        return {"__genspec__": obj.to_dict()}
+    if isinstance(obj, dict):
+        return {k: _to_tree(v, arrays) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_to_tree(v, arrays) for v in obj]
+    return obj
+
+
+def encode(obj):
+    """ترميز كائن (قد يحوي ndarray) إلى إطار ثنائي"""
+    arrays = []
+    tree = _to_tree(obj, arrays)
+
+    buffers = []
+    offset = 0
+    for arr in arrays:
+        buffers.append([offset, arr.nbytes])
+        offset += arr.nbytes + _pad(arr.nbytes)
+
+    header = json.dumps({"body": tree, "buffers": buffers}, separators=(",", ":")).encode()
+    prefix_len = len(MAGIC) + _LEN.size + len(header)
+
+    parts = [MAGIC, _LEN.pack(len(header)), header, b"\0" * _pad(prefix_len)]
+    for arr in arrays:
+        # reshape(-1) نافذة لا نسخة؛ cast يرفض الأشكال ذات البعد الصفري
+        parts.append(memoryview(arr.reshape(-1)).cast("B"))
+        parts.append(b"\0" * _pad(arr.nbytes))
+    return b"".join(parts)
+
+
+def jsonable(obj):
+    """تحويل الكائن إلى بنية قابلة لـ JSON (للعملاء الذين لا يقبلون الثنائي)"""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, GeneratorSpec):
+        return {"__genspec__": obj.to_dict()}
+    if isinstance(obj, dict):
+        return {k: jsonable(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [jsonable(v) for v in obj]
+    return obj
+
+
+def estimated_size(obj):
+    """تقدير حجم الإطار الثنائي دون ترميزه (لقرار التوزيع)"""
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes + ALIGNMENT
+    if isinstance(obj, dict):
+        return sum(len(str(k)) + estimated_size(v) for k, v in obj.items()) + 2
+    if isinstance(obj, (list, tuple)):
+        return sum(estimated_size(v) for v in obj) + 2
+    if isinstance(obj, (str, bytes)):
+        return len(obj) + 2
+    return 16
+
+
+# ------------------------------------------------------------
+# فك الترميز
+# ------------------------------------------------------------
+def _from_tree(obj, data, base, buffers):
+    if isinstance(obj, dict):
+        if "__ndarray__" in obj:
+            offset, nbytes = buffers[obj["__ndarray__"]]
+            dtype = np.dtype(obj["dtype"])
+            arr = np.frombuffer(data, dtype=dtype, count=nbytes // dtype.itemsize,
+                                offset=base + offset)
+            return arr.reshape(obj["shape"])
+        if "__genspec__" in obj:
+            return GeneratorSpec.from_dict(obj["__genspec__"])
+        return {k: _from_tree(v, data, base, buffers) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_from_tree(v, data, base, buffers) for v in obj]
+    return obj
+
+
+def decode(data):
+    """فك إطار ثنائي؛ المصفوفات الناتجة نوافذ على data دون نسخ"""
+    view = memoryview(data)
+    if bytes(view[:len(MAGIC)]) != MAGIC:
+        raise ValueError("إطار DTS غير صالح")
+    (header_len,) = _LEN.unpack_from(view, len(MAGIC))
+    start = len(MAGIC) + _LEN.size
+    header = json.loads(bytes(view[start:start + header_len]))
+    base = start + header_len
+    base += _pad(base)
+    return _from_tree(header["body"], view, base, header["buffers"])
+
+
+def decode_body(body, content_type):
+    """فك جسم طلب/رد حسب Content-Type"""
+    if is_binary(content_type):
+        return decode(body)
+    if not body:
+        return {}
+    return json.loads(body, object_hook=_revive_spec)
+
+
+def _revive_spec(obj):
+    if "__genspec__" in obj:
+        return GeneratorSpec.from_dict(obj["__genspec__"])
+    return obj
+
+
+def encode_for(obj, accept):
+    """(bytes, content_type) حسب ما يقبله الطرف الآخر"""
+    if accepts_binary(accept):
+        return encode(obj), CONTENT_TYPE
+    return json.dumps(jsonable(obj)).encode(), JSON_CONTENT_TYPE
+
+
+# ------------------------------------------------------------
+# الردود المتدفقة
+# ------------------------------------------------------------
+def stream_content_type(accept):
+    """نوع المحتوى للرد المتدفق حسب ما يقبله العميل"""
+    return STREAM_CONTENT_TYPE if accept and STREAM_CONTENT_TYPE in accept else NDJSON_CONTENT_TYPE
+
+
+def stream_chunk(obj, content_type):
+    """عنصر واحد من رد متدفق"""
+    if content_type == STREAM_CONTENT_TYPE:
+        frame = encode(obj)
+        return _LEN.pack(len(frame)) + frame
+    return json.dumps(jsonable(obj)).encode() + b"\n"
+
+
+def iter_stream(chunks, content_type):
+    """فك رد متدفق من مكرِّر كتل بايتات (مثل response.iter_content)"""
+    if not is_stream(content_type):
+        pending = b""
+        for chunk in chunks:
+            *lines, pending = (pending + chunk).split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield json.loads(line, object_hook=_revive_spec)
+        if pending.strip():
+            yield json.loads(pending, object_hook=_revive_spec)
+        return
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer += chunk
+        while len(buffer) >= _LEN.size:
+            (size,) = _LEN.unpack_from(buffer)
+            if len(buffer) < _LEN.size + size:
+                break
+            yield decode(bytes(buffer[_LEN.size:_LEN.size + size]))
+            del buffer[:_LEN.size + size]
+
+
+def is_stream(content_type):
+    return bool(content_type) and content_type.split(";")[0].strip() == STREAM_CONTENT_TYPE
+
+
+# ------------------------------------------------------------
+# مساعدات العميل
+# ------------------------------------------------------------
+def post_task(url, payload, timeout=10, headers=None, session=None, stats=None):
+    """إرسال حمولة مهمة بالصيغة الثنائية وفك الرد أياً كانت صيغته
+
+    إن مُرِّر stats (قاموس) يُضاف إليه bytes = حجم الطلب + حجم الرد.
+    """
+    if session is None:
+        import http_pool
+        session = http_pool.get_pool()
+    all_headers = {"Content-Type": CONTENT_TYPE,
+                   "Accept": f"{CONTENT_TYPE}, {JSON_CONTENT_TYPE}"}
+    if headers:
+        all_headers.update(headers)
+    body = encode(payload)
+    response = session.post(url, data=body, headers=all_headers, timeout=timeout)
+    response.raise_for_status()
+    if stats is not None:
+        stats["bytes"] = len(body) + len(response.content)
+    return decode_body(response.content, response.headers.get("Content-Type"))
+
@@ -0,0 +1,186 @@
+# worker_pool.py
+"""
+محرك التنفيذ على جانب الخادم: مجمع عمليات دافئة بعدد الأنوية.
+
+معالجات /run كانت تستدعي دالة المهمة في خيط الطلب نفسه، فيسلسل الـ GIL
+المهام الحسابية تحت خادم Flask متعدد الخيوط، ويجمّد الاستدعاء الحاجب حلقة
+أحداث FastAPI كلها. هنا تُنفَّذ المهمة في عملية عاملة منفصلة وينتظر المعالج
+نتيجتها، فتعمل N مهام بالتوازي فعلاً ويبقى /health و /cpu مستجيبين.
+
+الدالة تُرسل للعامل كـ (الوحدة، الاسم) وتُحَل هناك، ثم تُفك أغلفتها
+(__wrapped__) فلا يعيد العامل توزيع مهمة وصلته موزّعة أصلاً. ذاكرة النتائج
+ودمج الطلبات المتطابقة يبقيان في العملية الأم (انظر execute).
+"""
+
+import os
+import time
+import asyncio
+import inspect
+import logging
+import importlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from memo_cache import cached_call
+from single_flight import shared_call, share_rule
+from load_sampler import track_task
+
+WORKER_PROCESSES = int(os.getenv("DTS_WORKER_PROCESSES", str(os.cpu_count() or 1)))
+PRELOAD_MODULES = tuple(m for m in os.getenv("DTS_WORKER_PRELOAD", "numpy").split(",") if m)
+BATCH_THREADS = int(os.getenv("DTS_BATCH_THREADS", str(2 * WORKER_PROCESSES)))
+
+_resolved = {}   # داخل العامل: (الوحدة، الاسم) -> الدالة المفكوكة
+
+
+def _init_worker(preload):
+    """تهيئة العامل: استيراد الوحدات الثقيلة مرة واحدة"""
+    for name in preload:
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            logging.debug(f"تعذّر التحميل المسبق لـ {name}: {e}")
+
+
+def _ping():
+    return os.getpid()
+
+
+def _call(module, qualname, args, kwargs):
+    """يُنفَّذ داخل العامل"""
+    fn = _resolved.get((module, qualname))
+    if fn is None:
+        target = importlib.import_module(module)
+        for part in qualname.split("."):
+            target = getattr(target, part)
+        fn = _resolved[(module, qualname)] = inspect.unwrap(target)
+    return fn(*args, **kwargs)
+
+
+def _address(fn):
+    """(الوحدة، الاسم) إن أمكن حل الدالة من عملية أخرى، وإلا None"""
+    module = getattr(fn, "__module__", None)
+    qualname = getattr(fn, "__qualname__", "")
+    if not module or module == "__main__" or "<" in qualname:
+        return None
+    return module, qualname
+
+
+class WorkerPool:
+    """مجمع عمليات دافئ يُعاد إنشاؤه تلقائياً إن انهار"""
+
+    def __init__(self, processes=WORKER_PROCESSES, preload=PRELOAD_MODULES):
+        self.processes = max(1, processes)
+        self.preload = preload
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn: لا نرث خيوط الأم (zeroconf والمُعايِن) في العمال
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker, initargs=(self.preload,))
+            return self._executor
+
+    def warm(self):
+        """تشغيل كل العمال مسبقاً حتى لا يدفع أول طلب كلفة الإقلاع"""
+        pool = self._pool()
+        pids = {f.result() for f in [pool.submit(_ping) for _ in range(self.processes)]}
+        logging.info(f"🔥 {len(pids)} عملية عاملة جاهزة")
+        return self
+
+    def submit(self, fn, args=(), kwargs=None):
+        """Future لنتيجة fn(*args, **kwargs) في عملية عاملة"""
+        address = _address(fn)
+        if address is None:
+            raise ValueError(f"لا يمكن تنفيذ {fn!r} في عملية عاملة")
+        try:
+            return self._pool().submit(_call, *address, list(args), dict(kwargs or {}))
+        except BrokenProcessPool:
+            self._reset()
+            return self._pool().submit(_call, *address, list(args), dict(kwargs or {}))
+
+    def run(self, fn, args=(), kwargs=None):
+        """تنفيذ حاجب للخيط المستدعي فقط (ليس للعملية)"""
+        if _address(fn) is None:
+            return inspect.unwrap(fn)(*args, **(kwargs or {}))
+        try:
+            return self.submit(fn, args, kwargs).result()
+        except BrokenProcessPool:
+            self._reset()
+            raise
+
+    def _reset(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            logging.warning("⚠️ انهار مجمع العمليات - إعادة إنشائه")
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_batch_pool = ThreadPoolExecutor(max_workers=max(1, BATCH_THREADS), thread_name_prefix="batch")
+
+
+def get_worker_pool():
+    """مجمع العمليات المشترك للعملية (يُنشأ عند أول استخدام)"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = WorkerPool()
+    return _pool
+
+
+def execute(fn, args, kwargs):
+    """تنفيذ مهمة واردة: دمج المتطابقات ← ذاكرة النتائج ← عملية عاملة
+
+    الدمج للمهام الحتمية فقط (single_flight.share_rule).
+    """
+    pool = get_worker_pool()
+    compute = lambda: cached_call(fn, args, kwargs, compute=lambda *a, **k: pool.run(fn, a, k))
+    rule = share_rule(fn)
+    if not rule:
+        return compute()
+    return shared_call(fn, args, kwargs, compute=compute,
+                       when=rule if callable(rule) else None)
+
+
+async def execute_async(fn, args, kwargs):
+    """مثل execute لمعالجات asyncio: الانتظار في خيط فلا تتجمّد حلقة الأحداث"""
+    return await asyncio.to_thread(execute, fn, args, kwargs)
+
+
+def _execute_item(index, fn, args, kwargs):
+    if fn is None:
+        return {"index": index, "error": "function-not-found"}
+    start = time.time()
+    try:
+        with track_task():
+            result = execute(fn, args, kwargs)
+    except Exception as e:
+        return {"index": index, "error": str(e)}
+    return {"index": index, "result": result, "took": round(time.time() - start, 3)}
+
+
+def execute_batch(calls, ordered=True):
+    """تنفيذ دفعة [(fn, args, kwargs)] بالتوازي عبر execute
+
+    يعيد مكرِّراً لردود العناصر: {"index", "result", "took"} أو {"index", "error"}
+    (فشل عنصر لا يُفشل الدفعة). ordered=False يعيدها بترتيب اكتمالها.
+    """
+    futures = [_batch_pool.submit(_execute_item, i, fn, args, kwargs)
+               for i, (fn, args, kwargs) in enumerate(calls)]
+    return (f.result() for f in (futures if ordered else as_completed(futures)))
+
@@ -0,0 +1,280 @@
+# worker_service.py
+"""
+خدمة العقدة الموحّدة: تطبيق ASGI واحد على المنفذ 7520.
+
+كانت أربعة تطبيقات (rpc_server و peer_server و server و main) تتنافس على
+المنفذ نفسه بدلالات /run متداخلة، وتُشغَّل كعمليات منفصلة تستورد كل منها
+numpy و cv2 و cryptography. هنا مسارات الجميع في تطبيق واحد، بمصدر واحد
+لدوال المهام (task_registry) ومجمع تنفيذ واحد (worker_pool):
+
+    POST /run              مهمة واحدة (JSON أو wire_format أو حمولة مشفّرة موقّعة)
+    POST /run_batch        دفعة مهام (انظر micro_batcher)
+    POST /jobs ...         المهام الطويلة غير المتزامنة (انظر job_manager)
+    POST /multiply         {"a", "b"} ← multiply_task
+    GET  /tasks            المهام المعلنة في task_registry وخصائصها
+    GET  /cpu  /health  /project_info
+
+الملفات القديمة (peer_server و rpc_server و server) صارت واجهات تشغّل هذه
+الخدمة. SecurityManager (cryptography) لا يُحمَّل إلا عند وصول أول حمولة مشفّرة.
+"""
+
+import os
+import json
+import time
+import socket
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request, Response
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+
+import wire_format
+from project_identifier import get_project_info
+from load_sampler import current_load, track_task, inflight_tasks
+from worker_pool import execute_async, execute_batch, get_worker_pool
+from job_manager import get_job_manager, submit_payload
+from task_registry import get_registry, local_capabilities
+
+HOST = os.getenv("DTS_WORKER_HOST", "0.0.0.0")
+PORT = int(os.getenv("DTS_WORKER_PORT", "7520"))
+ADVERTISE = os.getenv("DTS_ADVERTISE", "1") == "1"
+SHARED_SECRET = os.getenv("SHARED_SECRET", "my_shared_secret_123")
+
+
+# ------------------------------------------------------------
+# دوال المهام
+# ------------------------------------------------------------
+def resolve_task(name):
+    """دالة المهمة باسمها من سجل المهام (task_registry)، أو None
+
+    تُقبل المهام المعلنة بـ @task فقط، لا ما تستورده وحدات المهام (مثل
+    offload أو materialize)، ولا ما يتطلب قدرة لا تملكها هذه العقدة.
+    """
+    if not name or name.startswith("_"):
+        return None
+    spec = get_registry().get(name)
+    if spec is None or not spec.requires <= local_capabilities():
+        return None
+    return spec.entry
+
+
+# ------------------------------------------------------------
+# قراءة حمولة المهمة
+# ------------------------------------------------------------
+class TaskRejected(Exception):
+    def __init__(self, status, error):
+        super().__init__(error)
+        self.status = status
+        self.error = error
+
+
+_security = None
+
+
+def _security_manager():
+    global _security
+    if _security is None:
+        from security_layer import SecurityManager
+        _security = SecurityManager(SHARED_SECRET)
+    return _security
+
+
+def decode_task(body, content_type):
+    """الحمولة من جسم الطلب: wire_format أو JSON (وضع التطوير) أو مشفّرة (الإنتاج)"""
+    if wire_format.is_binary(content_type) or wire_format.JSON_CONTENT_TYPE in (content_type or ""):
+        data = wire_format.decode_body(body, content_type)
+    else:
+        try:
+            data = json.loads(_security_manager().decrypt_data(body).decode())
+        except Exception as e:
+            logging.error(f"⚠️ فشل فك التشفير: {e}")
+            raise TaskRejected(400, "Decryption failed")
+
+    # التحقّق من التوقيع إن وُجد، ثم إزالة عناصره
+    if "_signature" in data:
+        if not _security_manager().verify_task(data):
+            logging.warning("❌ توقيع غير صالح")
+            raise TaskRejected(403, "Invalid signature")
+        data = {k: v for k, v in data.items() if k not in ("_signature", "sender_id")}
+    return data
+
+
+async def _read_task(request):
+    return decode_task(await request.body(), request.headers.get("content-type"))
+
+
+def _reply(obj, request, status_code=200):
+    body, content_type = wire_format.encode_for(obj, request.headers.get("accept"))
+    return Response(content=body, media_type=content_type, status_code=status_code)
+
+
+def _error(status, error):
+    return JSONResponse({"error": error}, status_code=status)
+
+
+# ------------------------------------------------------------
+# التطبيق
+# ------------------------------------------------------------
+@asynccontextmanager
+async def lifespan(app):
+    current_load()            # تشغيل مُعايِن الحمل قبل أول /cpu
+    await asyncio.to_thread(get_worker_pool().warm)
+    yield
+    get_worker_pool().shutdown()
+
+
+app = FastAPI(title="DTS Worker Service", lifespan=lifespan)
+app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+
+
+@app.exception_handler(TaskRejected)
+async def task_rejected(request: Request, exc: TaskRejected):
+    return _error(exc.status, exc.error)
+
+
+@app.get("/health")
+def health():
+    return {"status": "ok", "port": PORT}
+
+
+@app.get("/project_info")
+def project_info():
+    return get_project_info()
+
+
+@app.get("/tasks")
+def tasks():
+    """المهام المعلنة وخصائصها (task_registry)"""
+    return {"tasks": [spec.as_dict() for spec in get_registry().specs()],
+            "capabilities": sorted(local_capabilities())}
+
+
+@app.get("/cpu")
+def cpu():
+    """نسبة استخدام المعالج من لقطة المُعايِن المشترك (بلا حجب)"""
+    load = current_load()
+    return {
+        "usage": round(load.cpu * 100, 1),
+        "ewma": round(load.cpu_ewma * 100, 1),
+        "window": round(load.cpu_window * 100, 1),
+        "mem_available_mb": round(load.mem_available_mb, 1),
+        "load_avg": load.load_avg,
+        "per_core": [round(c * 100, 1) for c in load.per_core],
+        "queue": inflight_tasks(),
+    }
+
+
+@app.post("/run")
+async def run(request: Request):
+    data = await _read_task(request)
+    fn = resolve_task(data.get("func"))
+    if fn is None:
+        logging.warning(f"❌ لم يتم العثور على الدالة: {data.get('func')}")
+        return _error(404, "function-not-found")
+    try:
+        with track_task():
+            queue = inflight_tasks() - 1  # المهام الأخرى الجارية لحظة الاستلام
+            start = time.time()
+            result = await execute_async(fn, data.get("args", []), data.get("kwargs", {}))
+    except Exception as e:
+        logging.error(f"🔥 خطأ أثناء تنفيذ المهمة: {e}")
+        return _error(500, str(e))
+    return _reply({"result": result, "host": socket.gethostname(),
+                   "took": round(time.time() - start, 3), "queue": queue}, request)
+
+
+@app.post("/run_batch")
+async def run_batch(request: Request):
+    """دفعة مهام: النتائج بالترتيب، أو متدفقة عند اكتمالها مع stream"""
+    data = await _read_task(request)
+    calls = [(resolve_task(t.get("func")), t.get("args", []), t.get("kwargs", {}))
+             for t in data.get("tasks", [])]
+    if data.get("stream") or request.query_params.get("stream") == "1":
+        content_type = wire_format.stream_content_type(request.headers.get("accept"))
+        items = (wire_format.stream_chunk(item, content_type)
+                 for item in execute_batch(calls, ordered=False))
+        return StreamingResponse(items, media_type=content_type)
+    queue = inflight_tasks()  # كل عنصر يُحتسب ضمن المهام الجارية أثناء تنفيذه
+    start = time.time()
+    results = await asyncio.to_thread(lambda: list(execute_batch(calls)))
+    return _reply({"results": results, "host": socket.gethostname(),
+                   "took": round(time.time() - start, 3), "queue": queue}, request)
+
+
+@app.post("/multiply")
+async def multiply(request: Request):
+    data = await request.json()
+    fn = resolve_task("multiply_task")
+    try:
+        result = await execute_async(fn, [data.get("a", 0), data.get("b", 0)], {})
+    except Exception as e:
+        return _error(500, str(e))
+    return {"result": result["result"]}
+
+
+# ---- المهام غير المتزامنة (job_manager) ------------------------------------
+@app.post("/jobs", status_code=202)
+async def submit_job(request: Request):
+    """مثل /run لكن يعود بمعرّف المهمة فوراً؛ المتابعة عبر /jobs/{id}"""
+    data = await _read_task(request)
+    fn = resolve_task(data.get("func"))
+    if fn is None:
+        return _error(404, "function-not-found")
+    return submit_payload(fn, data).as_dict()
+
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str, request: Request):
+    state = get_job_manager().snapshot(job_id)
+    if state is None:
+        return _error(404, "job-not-found")
+    return _reply(state, request)
+
+
+@app.get("/jobs/{job_id}/events")
+def job_events(job_id: str, inline: int = 1):
+    """بث SSE: أحداث progress ثم done"""
+    return StreamingResponse(get_job_manager().sse(job_id, bool(inline)),
+                             media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+
+# ------------------------------------------------------------
+# التشغيل
+# ------------------------------------------------------------
+def _local_ip():
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        s.connect(('10.255.255.255', 1))
+        return s.getsockname()[0]
+    except Exception:
+        return '127.0.0.1'
+    finally:
+        s.close()
+
+
+def serve(host=HOST, port=PORT, advertise=ADVERTISE):
+    """تشغيل الخدمة (حاجب)؛ advertise يعلن العقدة عبر Zeroconf (_tasknode)"""
+    zc = None
+    if advertise:
+        from peer_registry import register_service
+        zc = register_service(_local_ip(), port)
+    import uvicorn
+    try:
+        uvicorn.run(app, host=host, port=port, log_level="warning")
+    finally:
+        if zc is not None:
+            zc.load_advertiser.stop()
+            zc.close()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    logging.info(f"🚀 خدمة العقدة على المنفذ {PORT}")
+    serve()
+
+
+if __name__ == "__main__":
+    main()
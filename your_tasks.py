@@ -1,31 +1,63 @@
 import math
 import numpy as np
+from prime_sieve import count_primes, primes_up_to, sieve_segment
+from generator_spec import GeneratorSpec, materialize, seeded_inputs
+from task_registry import task
 
 def prime_calculation(n: int):
     """ترجع قائمة الأعداد الأوليّة حتى n مع عددها"""
-    primes = []
-    for num in range(2, n + 1):
-        if all(num % p != 0 for p in range(2, int(math.sqrt(num)) + 1)):
-            primes.append(num)
+    primes = primes_up_to(n).tolist()
     return {"count": len(primes), "primes": primes}
 
-def matrix_multiply(size: int):
-    """ضرب مصفوفات عشوائيّة (size × size)"""
-    A = np.random.rand(size, size)
-    B = np.random.rand(size, size)
+@task(cost=lambda lo, hi, mode="count": (hi - lo) / 100, idempotent=True, cacheable=True,
+      result_bytes=lambda lo, hi, mode="count": (hi - lo) // 8 if mode != "count" else 64)
+def prime_segment(lo: int, hi: int, mode: str = "count"):
+    """غربلة مقطع [lo, hi) من الغربال الموزّع (عدد أو خريطة بتات)"""
+    return sieve_segment(lo, hi, mode)
+
+def matrix_multiply(size: int, A=None, B=None):
+    """ضرب مصفوفات عشوائيّة (size × size) أو مصفوفات/أوصاف مولِّدات ممرَّرة"""
+    A = materialize(A) if A is not None else np.random.rand(size, size)
+    B = materialize(B) if B is not None else np.random.rand(size, size)
     result = np.dot(A, B)  # يمكن أيضًا: A @ B
     return {"result": result.tolist()}
 
-def data_processing(data_size: int):
-    """تنفيذ معالجة بيانات بسيطة كتجربة"""
-    data = np.random.rand(data_size)
+def _shape(x):
+    return x.view_shape if isinstance(x, GeneratorSpec) else np.shape(x)
+
+@task(cost=lambda A_panel, B_panel: _shape(A_panel)[0] * _shape(B_panel)[1] / 1000, idempotent=True,
+      result_bytes=lambda A_panel, B_panel: _shape(A_panel)[0] * _shape(B_panel)[1] * 8)
+def matmul_block(A_panel, B_panel):
+    """كتلة من الضرب الموزّع: A[r0:r1, :] @ B[:, c0:c1] (مصفوفتان أو وصفا نافذتين)"""
+    return materialize(A_panel) @ materialize(B_panel)
+
+def data_processing(data_size: int, data=None):
+    """تنفيذ معالجة بيانات بسيطة كتجربة (data مصفوفة أو GeneratorSpec)"""
+    data = materialize(data) if data is not None else np.random.rand(data_size)
     mean = np.mean(data)
     std_dev = np.std(data)
     return {"mean": mean, "std_dev": std_dev}
 
 from offload_lib import offload
 
+_K_LINES = {"2k": 1440, "4k": 2160, "5k": 2880, "8k": 4320}   # "4k" عرض تقريبي لا عدد أسطر
+
+def _lines(resolution):
+    """عدد الأسطر من الدقة ("1920x1080" أو "1080p" أو "4k" أو عدد)
+
+    صيغة غير معروفة ترفع ValueError فيعود TaskSpec.complexity للتكلفة الافتراضية.
+    """
+    if not isinstance(resolution, str):
+        return resolution
+    value = resolution.strip().lower()
+    if value in _K_LINES:
+        return _K_LINES[value]
+    return int(value.split("x")[-1].removesuffix("p"))
+
+# خصائص كل مهمة تُعلن بـ @task (task_registry) وتقرأها offload وخدمة العقدة
+
 @offload
+@task(cost=lambda x: x, idempotent=True, cacheable=True)
 def complex_operation(x):
     """مهمة معقدة قابلة للتوزيع"""
     result = 0
@@ -34,6 +66,13 @@ def complex_operation(x):
     return result
 
 @offload
+@task(idempotent=True, batchable=True)
+def multiply_task(a, b):
+    """ضرب عددين (مهمة صغيرة: استدعاءاتها البعيدة تُجمَّع في دفعات)"""
+    return {"result": a * b}
+
+@offload
+@task(cost=lambda size: size / 10, idempotent=True, deterministic=True, batchable=True)
 def data_processing(size):
     """معالجة بيانات كبيرة"""
     import time
@@ -41,51 +80,66 @@ def data_processing(size):
     return {"processed": size, "status": "completed"}
 
 @offload
-def matrix_multiply(size):
-    """ضرب المصفوفات"""
+@task(cost=lambda size, A=None, B=None: size ** 2, idempotent=True, cacheable=seeded_inputs,
+      mem_mb=lambda size, A=None, B=None: 3 * size * size * 8 / 2 ** 20,
+      result_bytes=lambda size, A=None, B=None: size * size * 8)
+def matrix_multiply(size, A=None, B=None):
+    """ضرب المصفوفات (A و B اختياريتان: مصفوفات أو GeneratorSpec)"""
     import numpy as np
-    A = np.random.rand(size, size)
-    B = np.random.rand(size, size)
+    A = materialize(A) if A is not None else np.random.rand(size, size)
+    B = materialize(B) if B is not None else np.random.rand(size, size)
     return np.dot(A, B)
 
 @offload
+@task(cost=lambda n: n / 100, idempotent=True, cacheable=True)
 def prime_calculation(n):
-    """حساب الأعداد الأولية"""
-    primes = []
-    for num in range(2, n + 1):
-        for i in range(2, int(num**0.5) + 1):
-            if num % i == 0:
-                break
-        else:
-            primes.append(num)
-    return len(primes)
+    """حساب الأعداد الأولية (غربال مقطّع بذاكرة ثابتة)"""
+    return count_primes(n)
 
 # مهام معالجة الفيديو والألعاب ثلاثية الأبعاد
 @offload
+@task(cost=lambda duration_seconds, quality_level, *a, **k: duration_seconds * quality_level / 1000,
+      requires=("cv2",), deterministic=True)
 def video_format_conversion(duration_seconds, quality_level, input_format="mp4", output_format="avi"):
     """تحويل صيغة الفيديو - مهمة قابلة للتوزيع"""
     from video_processing import video_format_conversion as vfc
     return vfc(duration_seconds, quality_level, input_format, output_format)
 
 @offload
+@task(cost=lambda video_length, effects_count, *a, **k: effects_count * 15,
+      requires=("cv2",), deterministic=True)
 def video_effects_processing(video_length, effects_count, resolution="1080p"):
     """معالجة تأثيرات الفيديو - مهمة قابلة للتوزيع"""
     from video_processing import video_effects_processing as vep
     return vep(video_length, effects_count, resolution)
 
 @offload
+@task(cost=lambda file_size_mb, *a, **k: file_size_mb / 5, mem_mb=lambda file_size_mb, *a, **k: file_size_mb,
+      requires=("cv2",), deterministic=True)
+def video_compression(file_size_mb, compression_ratio=0.5, quality="high"):
+    """ضغط الفيديو - مهمة قابلة للتوزيع"""
+    from video_processing import video_compression as vc
+    return vc(file_size_mb, compression_ratio, quality)
+
+@offload
+@task(cost=lambda objects_count, resolution_width, *a, **k: objects_count * resolution_width / 100,
+      requires=("cv2",), deterministic=True)
 def render_3d_scene(objects_count, resolution_width, resolution_height, lighting_quality="medium", texture_quality="high"):
     """رندر مشهد ثلاثي الأبعاد - مهمة قابلة للتوزيع"""
     from video_processing import render_3d_scene as r3d
     return r3d(objects_count, resolution_width, resolution_height, lighting_quality, texture_quality)
 
 @offload
+@task(cost=lambda objects_count, frames_count, *a, **k: objects_count * frames_count / 50,
+      requires=("cv2",), deterministic=True)
 def physics_simulation(objects_count, frames_count, physics_quality="medium"):
     """محاكاة الفيزياء - مهمة قابلة للتوزيع"""
     from video_processing import physics_simulation as ps
     return ps(objects_count, frames_count, physics_quality)
 
 @offload
+@task(cost=lambda ai_agents_count, decision_complexity, game_state_size:
+      ai_agents_count * decision_complexity * game_state_size / 100000)
 def game_ai_processing(ai_agents_count, decision_complexity, game_state_size):
     """معالجة ذكاء اصطناعي للألعاب"""
     import time
@@ -107,30 +161,37 @@ def game_ai_processing(ai_agents_count, decision_complexity, game_state_size):
 
 # مهام البث المباشر
 @offload
+@task(cost=lambda stream_data, fps, resolution, enhancements=None: fps * _lines(resolution) / 10000,
+      requires=("cv2",))
 def process_game_stream(stream_data, fps, resolution, enhancements=None):
     """معالجة بث الألعاب في الوقت الفعلي"""
     from live_streaming import process_game_stream as pgs
     return pgs(stream_data, fps, resolution, enhancements)
 
 @offload
+@task(cost=lambda enhancement_types, *a, **k: len(enhancement_types) * 20, requires=("cv2",))
 def real_time_video_enhancement(enhancement_types, video_quality="1080p", target_fps=60):
     """تحسين الفيديو في الوقت الفعلي"""
     from live_streaming import real_time_video_enhancement as rtve
     return rtve(enhancement_types, video_quality, target_fps)
 
 @offload
+@task(cost=lambda streams_data, *a, **k: len(streams_data) * 25, requires=("cv2",))
 def multi_stream_processing(streams_data, processing_mode="parallel"):
     """معالجة عدة بثوث في نفس الوقت"""
     from live_streaming import multi_stream_processing as msp
     return msp(streams_data, processing_mode)
 
 @offload
+@task(cost=lambda game_events, commentary_length, *a, **k: commentary_length * 15,
+      requires=("cv2",))
 def ai_commentary_generation(game_events, commentary_length, language="ar"):
     """توليد تعليق ذكي للألعاب"""
     from live_streaming import ai_commentary_generation as acg
     return acg(game_events, commentary_length, language)
 
 @offload
+@task(requires=("cv2",))
 def stream_quality_optimization(stream_metadata, target_bandwidth, viewer_count):
     """تحسين جودة البث حسب النطاق الترددي وعدد المشاهدين"""
     from live_streaming import stream_quality_optimization as sqo